@@ -0,0 +1,50 @@
+""" Measures the Python-side overhead of a call through c_api, with the prototype cache and without it.
+
+advapi32.dll, and the other dlls, are replaced by stubs, so this runs on any platform:
+the stub builds a real ctypes prototype, like WINFUNCTYPE does on Windows, but does not call into any library.
+
+    python benchmarks/c_api_overhead.py [calls]
+"""
+
+import sys
+import timeit
+from ctypes import CFUNCTYPE
+from infi.registry import c_api, funcs
+
+def stub_wrap_advapi32_function(name, return_value, parameters=()):
+    args = funcs._build_args_for_winfunctype(return_value, parameters)
+    prototype = CFUNCTYPE(*args)
+    paramflags = funcs._build_paramflags_for_prototype(parameters)
+    outputs = tuple(None for parameter in parameters if parameter[1] & 2)
+
+    def _function(*args, **kwargs):
+        return outputs
+    return _function
+
+def stub_wrap_last_error_function(dll_name, name, return_value, parameters=(), errcheck=None):
+    return stub_wrap_advapi32_function(name, return_value, parameters)
+
+def call_uncached(cls, *args, **kwargs):
+    """ calls the function the way c_api did before bindings were cached:
+    fresh buffers, a new prototype and a new binding on every call """
+    parameters = tuple(parameter[:3] + (c_api.FreshDefault.get(parameter[3]),)
+                       if len(parameter) > 3 and isinstance(parameter[3], c_api.FreshDefault) else parameter
+                       for parameter in cls._get_parameters())
+    function = funcs.wrap_advapi32_function(cls.__name__, cls._return_value, parameters)
+    return function(*args, **kwargs)
+
+def main(calls):
+    funcs.wrap_advapi32_function = stub_wrap_advapi32_function
+    funcs.wrap_last_error_function = stub_wrap_last_error_function
+    c_api.warm_up()
+    print('%-20s %15s %15s' % ('function', 'uncached [us]', 'cached [us]'))
+    for cls, kwargs in ((c_api.RegEnumKeyExW, dict(key=1, index=0)),
+                        (c_api.RegEnumValueW, dict(key=1, index=0)),
+                        (c_api.RegQueryInfoKeyW, dict(key=1)),
+                        (c_api.RegOpenKeyExW, dict(key=1, subKey=u'SOFTWARE'))):
+        uncached = timeit.timeit(lambda: call_uncached(cls, **kwargs), number=calls)
+        cached = timeit.timeit(lambda: cls(**kwargs), number=calls)
+        print('%-20s %15.2f %15.2f' % (cls.__name__, uncached * 1e6 / calls, cached * 1e6 / calls))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
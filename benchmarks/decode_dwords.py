@@ -0,0 +1,34 @@
+""" Compares decoding many REG_DWORD values one by one, through RegistryValue objects,
+with decoding their raw data together by RegistryValueFactory.decode_many, like a key of counters is read.
+
+    python benchmarks/decode_dwords.py [values]
+"""
+
+import sys
+import time
+from infi.registry import LocalComputer, constants
+from infi.registry.value import RegistryValueFactory
+from infi.registry.interface.memory import InMemoryBackend
+
+def decode_one_by_one(values_store):
+    return [value.to_python_object() for name, value in values_store.iteritems()]
+
+def decode_many(values_store):
+    payloads = [data for name, value_type, data in values_store.iterraw()]
+    return RegistryValueFactory().decode_many(constants.REG_DWORD, payloads)
+
+def main(values):
+    backend = InMemoryBackend()
+    backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor\Counters',
+                     dict((u'Counter%d' % index, index) for index in range(values)))
+    values_store = LocalComputer(sam=constants.KEY_READ, backend=backend).local_machine[
+        r'SOFTWARE\Vendor\Counters'].values_store
+    print('%-20s %8s %12s %15s' % ('route', 'values', 'total [ms]', 'per value [us]'))
+    for function in (decode_one_by_one, decode_many):
+        start = time.time()
+        function(values_store)
+        elapsed = time.time() - start
+        print('%-20s %8d %12.2f %15.2f' % (function.__name__, values, elapsed * 1e3, elapsed * 1e6 / values))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,47 @@
+""" Compares looking up values that exist with looking up values that do not, through ValueStore.get,
+the in operator and indexing, which raises KeyError for the missing ones.
+
+The registry is an in-memory one, so the numbers show the Python-side cost of a hit and of a miss,
+not the cost of the system calls.
+
+    python benchmarks/lookup.py [lookups]
+"""
+
+import sys
+import time
+from infi.registry import LocalComputer, constants
+from infi.registry.interface.memory import InMemoryBackend
+
+def get(values_store, names):
+    for name in names:
+        values_store.get(name)
+
+def contains(values_store, names):
+    for name in names:
+        name in values_store
+
+def getitem(values_store, names):
+    for name in names:
+        try:
+            values_store[name]
+        except KeyError:
+            pass
+
+def main(lookups):
+    backend = InMemoryBackend()
+    backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor\Product',
+                     dict((u'Value%d' % index, index) for index in range(16)))
+    values_store = LocalComputer(sam=constants.KEY_READ, backend=backend).local_machine[
+        r'SOFTWARE\Vendor\Product'].values_store
+    hits = [u'Value%d' % (index % 16) for index in range(lookups)]
+    misses = [u'Missing%d' % (index % 16) for index in range(lookups)]
+    print('%-10s %-6s %12s %18s' % ('route', 'kind', 'total [ms]', 'lookups per sec'))
+    for function in (get, contains, getitem):
+        for kind, names in (('hit', hits), ('miss', misses)):
+            start = time.time()
+            function(values_store, names)
+            elapsed = time.time() - start
+            print('%-10s %-6s %12.2f %18.0f' % (function.__name__, kind, elapsed * 1e3, lookups / elapsed))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,56 @@
+""" Compares KeyStore.walk with parallel_walk over a backend that sleeps on every call,
+like a remote registry does while waiting for the network, and releases the GIL meanwhile, like ctypes does.
+
+    python benchmarks/parallel_walk.py [latency-ms] [fanout] [depth]
+"""
+
+import sys
+import time
+from infi.registry import LocalComputer, constants
+from infi.registry.interface.memory import InMemoryBackend
+from infi.registry.parallel import parallel_walk
+
+class LatencyBackend(InMemoryBackend):
+    def __init__(self, latency):
+        super(LatencyBackend, self).__init__()
+        self.latency = latency
+
+def _add_latency(name):
+    function = getattr(InMemoryBackend, name)
+
+    def wrapper(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return function(self, *args, **kwargs)
+    wrapper.__name__ = name
+    setattr(LatencyBackend, name, wrapper)
+
+for name in ('RegCloseKey', 'RegEnumKeyEx', 'RegOpenKeyEx', 'RegQueryInfoKey'):
+    _add_latency(name)
+
+def populate(backend, fanout, depth, path=r'SOFTWARE\Synthetic'):
+    if depth == 0:
+        backend.populate(constants.HKEY_LOCAL_MACHINE, path, {u'Name': path})
+        return
+    for index in range(fanout):
+        populate(backend, fanout, depth - 1, u'%s\\Key%d' % (path, index))
+
+def main(latency, fanout, depth):
+    backend = LatencyBackend(0)
+    populate(backend, fanout, depth)
+    backend.latency = latency
+    key = LocalComputer(sam=constants.KEY_READ, backend=backend).local_machine[r'SOFTWARE\Synthetic']
+    print('%-10s %8s %8s %12s %10s' % ('walk', 'workers', 'keys', 'total [s]', 'speedup'))
+    start = time.time()
+    keys = sum(1 for item in key.walk())
+    baseline = time.time() - start
+    print('%-10s %8d %8d %12.2f %10.2f' % ('walk', 1, keys, baseline, 1))
+    for workers in (1, 2, 4, 8, 16, 32):
+        start = time.time()
+        keys = sum(1 for item in parallel_walk(key, workers=workers))
+        elapsed = time.time() - start
+        print('%-10s %8d %8d %12.2f %10.2f' % ('parallel', workers, keys, elapsed, baseline / elapsed))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.001,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 2)
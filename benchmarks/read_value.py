@@ -0,0 +1,54 @@
+""" Compares reading known values through KeyStore objects with RegistryHive.read_value and read_values,
+and with read_value through a cache.ValueCache, before and after the cache is filled.
+
+The registry is an in-memory one, so the numbers show the Python-side cost of each route,
+not the cost of the system calls it saves.
+
+    python benchmarks/read_value.py [keys] [values-per-key]
+"""
+
+import sys
+import time
+from infi.registry import LocalComputer, constants
+from infi.registry.cache import ValueCache
+from infi.registry.interface.memory import InMemoryBackend
+
+def populate(backend, keys, values_per_key):
+    items = []
+    for key_index in range(keys):
+        path = r'SOFTWARE\Vendor\Product%d\Settings' % key_index
+        values = dict((u'Value%d' % index, index) for index in range(values_per_key))
+        backend.populate(constants.HKEY_LOCAL_MACHINE, path, values)
+        items.extend((path, name) for name in values)
+    return items
+
+def read_through_key_store(hive, items):
+    return [hive[path].values_store[name] for path, name in items]
+
+def read_value(hive, items):
+    return [hive.read_value(path, name) for path, name in items]
+
+def read_values(hive, items):
+    return hive.read_values(items)
+
+def main(keys, values_per_key):
+    backend = InMemoryBackend()
+    items = populate(backend, keys, values_per_key)
+    hive = LocalComputer(sam=constants.KEY_READ, backend=backend).local_machine
+    print('%-25s %12s %15s' % ('route', 'total [ms]', 'per value [us]'))
+    for function in (read_through_key_store, read_value, read_values):
+        start = time.time()
+        function(hive, items)
+        elapsed = time.time() - start
+        print('%-25s %12.2f %15.2f' % (function.__name__, elapsed * 1e3, elapsed * 1e6 / len(items)))
+    value_cache = ValueCache(maxsize=len(items), ttl=60)
+    hive = LocalComputer(sam=constants.KEY_READ, backend=backend, value_cache=value_cache).local_machine
+    for route in ('read_value, cold cache', 'read_value, warm cache'):
+        start = time.time()
+        read_value(hive, items)
+        elapsed = time.time() - start
+        print('%-25s %12.2f %15.2f' % (route, elapsed * 1e3, elapsed * 1e6 / len(items)))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
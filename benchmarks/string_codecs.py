@@ -0,0 +1,37 @@
+""" Measures how fast REG_SZ and REG_MULTI_SZ values are decoded from, and encoded to, the byte arrays
+that the registry functions return and take, for strings of 10 bytes to 1 MB.
+
+    python benchmarks/string_codecs.py [repeats]
+"""
+
+import sys
+import time
+from infi.registry import constants
+from infi.registry.value import INTERVAL, RegistryValueFactory
+
+SIZES = (10, 1000, 100 * 1000, 1000 * 1000)
+
+def measure(function, repeats):
+    start = time.time()
+    for _ in range(repeats):
+        function()
+    return (time.time() - start) / repeats
+
+def main(repeats):
+    factory = RegistryValueFactory()
+    print('%-14s %10s %14s %14s %14s' % ('type', 'size [B]', 'decode [us]', 'encode [us]', 'decode [MB/s]'))
+    for size in SIZES:
+        # REG_MULTI_SZ values like PendingFileRenameOperations are lists of many short paths
+        path = u'\\??\\C:\\Temp\\file'
+        for registry_type, python_object in ((constants.REG_SZ, u'x' * (size // INTERVAL)),
+                                             (constants.REG_MULTI_SZ, [path] * max(1, size // INTERVAL // 18))):
+            cls = factory.by_type(registry_type)
+            byte_array = cls(python_object).to_byte_array()
+            # values are decoded lazily, by to_python_object
+            decode = measure(lambda: cls(byte_array).to_python_object(), repeats)
+            encode = measure(lambda: cls(python_object).to_byte_array(), repeats)
+            print('%-14s %10d %14.2f %14.2f %14.1f' % (cls.__name__, len(byte_array), decode * 1e6, encode * 1e6,
+                                                       len(byte_array) / decode / 1e6))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,51 @@
+""" Compares writing values one by one, each flushed to disk, with writing them in a single transaction,
+which is flushed once, when it is committed.
+
+The registry is an in-memory one, where flushing a key or committing a transaction sleeps for flush-ms,
+like waiting for the disk does.
+
+    python benchmarks/transaction.py [writes] [flush-ms]
+"""
+
+import sys
+import time
+from infi.registry import LocalComputer, constants
+from infi.registry.interface.memory import InMemoryBackend
+
+class FlushingBackend(InMemoryBackend):
+    def __init__(self, flush):
+        super(FlushingBackend, self).__init__()
+        self.flush = flush
+
+    def RegFlushKey(self, key):
+        time.sleep(self.flush)
+        return super(FlushingBackend, self).RegFlushKey(key)
+
+    def CommitTransaction(self, transaction):
+        time.sleep(self.flush)
+        return super(FlushingBackend, self).CommitTransaction(transaction)
+
+def write_values(hive, writes):
+    for index in range(writes):
+        values_store = hive[u'SOFTWARE\\Synthetic\\Key%d' % (index % 16)].values_store
+        values_store.update({u'Value%d' % index: index})
+
+def main(writes, flush):
+    backend = FlushingBackend(flush)
+    for index in range(16):
+        backend.populate(constants.HKEY_LOCAL_MACHINE, u'SOFTWARE\\Synthetic\\Key%d' % index)
+    hive = LocalComputer(backend=backend).local_machine
+    print('%-14s %8s %12s %16s' % ('mode', 'writes', 'total [s]', 'writes per sec'))
+    start = time.time()
+    write_values(hive, writes)
+    elapsed = time.time() - start
+    print('%-14s %8d %12.3f %16.0f' % ('individual', writes, elapsed, writes / elapsed))
+    start = time.time()
+    with hive.transaction():
+        write_values(hive, writes)
+    elapsed = time.time() - start
+    print('%-14s %8d %12.3f %16.0f' % ('transaction', writes, elapsed, writes / elapsed))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.001)
@@ -0,0 +1,38 @@
+""" Measures the throughput of KeyStore.walk over a synthetic tree, by default of a million keys,
+with a couple of values in every leaf key.
+
+The registry is an in-memory one, so the numbers show the Python-side cost of the walk,
+not the cost of the system calls it makes.
+
+    python benchmarks/walk.py [fanout] [depth]
+"""
+
+import sys
+import time
+from infi.registry import LocalComputer, constants
+from infi.registry.interface.memory import InMemoryBackend
+
+def populate(backend, fanout, depth, path=r'SOFTWARE\Synthetic'):
+    if depth == 0:
+        backend.populate(constants.HKEY_LOCAL_MACHINE, path, {u'Name': path, u'Depth': len(path.split('\\'))})
+        return
+    for index in range(fanout):
+        populate(backend, fanout, depth - 1, u'%s\\Key%d' % (path, index))
+
+def main(fanout, depth):
+    backend = InMemoryBackend()
+    start = time.time()
+    populate(backend, fanout, depth)
+    print('populated in %.2f s' % (time.time() - start))
+    computer = LocalComputer(sam=constants.KEY_READ, backend=backend)
+    print('%-12s %10s %12s %14s' % ('order', 'keys', 'total [s]', 'keys per sec'))
+    for topdown in (True, False):
+        key = computer.local_machine[r'SOFTWARE\Synthetic']
+        start = time.time()
+        keys = sum(1 for item in key.walk(topdown=topdown))
+        elapsed = time.time() - start
+        print('%-12s %10d %12.2f %14.0f' % ('top-down' if topdown else 'bottom-up', keys, elapsed, keys / elapsed))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -69,6 +69,29 @@ If you wish to manually define the type, you can:
 
 That's the basics.
 
+To make several changes to a hive all at once, or not at all, make them in a transaction:
+The transaction covers the keys that are reached through the same hive object:
+>>> hive = local_computer.local_machine
+>>> with hive.transaction():
+...     hive[r'SOFTWARE\\Vendor'].values_store.update(Version=u'2.0', Build=1234)
+...     del hive[r'SOFTWARE\\Vendor\\Obsolete']
+
+Instead of polling a key for changes, watch it:
+>>> for change in local_computer.local_machine[r'SOFTWARE\\Vendor'].watch():
+...     print(change.path, 'changed')
+
+BACKENDS
+By default, the registry is accessed through advapi32.dll.
+For tests and benchmarks on any platform, an in-memory registry can be used instead:
+>>> from infi.registry.interface.memory import InMemoryBackend
+>>> local_computer = LocalComputer(backend=InMemoryBackend())
+
+To keep unreachable computers from blocking the caller, wrap the backend with deadlines:
+>>> from infi.registry.interface.deadlines import DeadlineBackend
+>>> backend = DeadlineBackend(timeout=10)
+>>> with backend.deadline(2):
+...     RegistryComputer(r'\\\\remote', KEY_READ, backend).local_machine[r'SOFTWARE'].keys()
+
 EXCEPTIONS
 Besides the obvious KeyError/ValueError/TypeError exceptions usually thrown by dict objects,
 the module may throw registry-specific exceptions.
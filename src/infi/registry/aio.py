@@ -0,0 +1,237 @@
+""" An asyncio facade over RegistryComputer, KeyStore and ValueStore, for Python 3.6 and newer.
+
+Every call into the registry runs on an executor with a limited number of threads, so remote registries that take
+seconds to answer do not block the event loop:
+>>> async with AsyncRegistryComputer(RegistryComputer(r'\\\\host', constants.KEY_READ)) as computer:
+...     hive = await computer.local_machine
+...     key = await hive[r'SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion']
+...     async for name, value in key.values_store:
+...         print(name, value.to_python_object())
+
+When a call is cancelled, the handles of the keys that it opens are closed once it returns.
+The handles of the keys that are returned or yielded are closed on the executor too, when the keys are collected.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from .key import KeyStore
+
+_ITERATION_CHUNK_SIZE = 64
+
+def _close(result):
+    if isinstance(result, KeyStore):
+        result.close()
+    elif isinstance(result, (list, tuple)):
+        for item in result:
+            _close(item)
+
+def _close_result(future):
+    if not future.cancelled() and future.exception() is None:
+        _close(future.result())
+
+def _iterate_result(function):
+    return iter(function())
+
+def _next_chunk(iterator):
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) == _ITERATION_CHUNK_SIZE:
+            break
+    return chunk
+
+class _AsyncWrapper(object):
+    def __init__(self, executor):
+        self._executor = executor
+
+    async def _call(self, function, *args, **kwargs):
+        future = self._executor.submit(functools.partial(function, *args, **kwargs))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # the call may still be running, and nobody will get the keys it opens
+            future.add_done_callback(_close_result)
+            raise
+
+    async def _iterate(self, function):
+        # the function runs on the executor too, since it may open the key or enumerate it eagerly
+        iterator = await self._call(_iterate_result, function)
+        while True:
+            chunk = await self._call(_next_chunk, iterator)
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+
+class AsyncValueStore(_AsyncWrapper):
+    """ Awaitable counterparts of the ValueStore methods.
+    Iterating it asynchronously yields (name, RegistryValue) tuples, like iterating a ValueStore does.
+    """
+
+    def __init__(self, value_store, executor):
+        super(AsyncValueStore, self).__init__(executor)
+        self._value_store = value_store
+
+    def __getitem__(self, name):
+        return self._call(self._value_store.__getitem__, name)
+
+    async def get(self, name, default=None):
+        return await self._call(self._value_store.get, name, default)
+
+    async def set(self, name, value):
+        await self._call(self._value_store.__setitem__, name, value)
+
+    async def delete(self, name):
+        await self._call(self._value_store.__delitem__, name)
+
+    async def count(self):
+        return await self._call(len, self._value_store)
+
+    async def keys(self):
+        return await self._call(self._value_store.keys)
+
+    async def values(self):
+        return await self._call(self._value_store.values)
+
+    async def items(self):
+        return await self._call(self._value_store.items)
+
+    def __aiter__(self):
+        return self.iteritems()
+
+    def iteritems(self):
+        return self._iterate(self._value_store.iteritems)
+
+    async def iterkeys(self):
+        async for name, value in self.iteritems():
+            yield name
+
+    async def itervalues(self):
+        async for name, value in self.iteritems():
+            yield value
+
+class AsyncKeyStore(_AsyncWrapper):
+    """ Awaitable counterparts of the KeyStore methods.
+    Iterating it asynchronously yields (name, AsyncKeyStore) tuples, like iterating a KeyStore does.
+    """
+
+    def __init__(self, key_store, executor, owns_key_store=False):
+        super(AsyncKeyStore, self).__init__(executor)
+        self._key_store = key_store
+        self._owns_key_store = owns_key_store
+
+    def __del__(self):
+        # otherwise the key store closes its handle when it is collected, which may happen on the event loop
+        if getattr(self, '_owns_key_store', False):
+            try:
+                self._executor.submit(self._key_store.close)
+            except RuntimeError:
+                pass    # the executor is shut down
+
+    @property
+    def key_store(self):
+        """ The KeyStore that this object wraps
+        """
+        return self._key_store
+
+    @property
+    def values_store(self):
+        return AsyncValueStore(self._key_store.values_store, self._executor)
+
+    def _wrap(self, key_store):
+        return AsyncKeyStore(key_store, self._executor, owns_key_store=True)
+
+    async def __getitem__(self, item):
+        return self._wrap(await self._call(self._key_store.__getitem__, item))
+
+    async def get(self, item, default=None):
+        try:
+            return await self[item]
+        except KeyError:
+            return default
+
+    async def create(self, item):
+        await self._call(self._key_store.__setitem__, item)
+
+    async def delete(self, item):
+        await self._call(self._key_store.__delitem__, item)
+
+    async def exists(self):
+        return await self._call(self._key_store.exists)
+
+    async def count(self):
+        return await self._call(len, self._key_store)
+
+    async def keys(self):
+        return await self._call(self._key_store.keys)
+
+    async def close(self):
+        await self._call(self._key_store.close)
+
+    def __aiter__(self):
+        return self.iteritems()
+
+    async def iteritems(self):
+        async for name, key_store in self._iterate(self._key_store.iteritems):
+            yield name, self._wrap(key_store)
+
+    def iterkeys(self):
+        return self._iterate(self._key_store.iterkeys)
+
+    async def itervalues(self):
+        async for name, key_store in self.iteritems():
+            yield key_store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+class AsyncRegistryComputer(_AsyncWrapper):
+    """ Awaitable hives of a RegistryComputer or a LocalComputer.
+    The calls run on the executor that is passed, or on one with max_workers threads that is shut down on close.
+    """
+
+    def __init__(self, computer, max_workers=8, executor=None):
+        super(AsyncRegistryComputer, self).__init__(executor or ThreadPoolExecutor(max_workers))
+        self._computer = computer
+        self._owns_executor = executor is None
+
+    async def _get_registry_hive(self, name):
+        return AsyncKeyStore(await self._call(getattr, self._computer, name), self._executor)
+
+    @property
+    def local_machine(self):
+        return self._get_registry_hive('local_machine')
+
+    @property
+    def users(self):
+        return self._get_registry_hive('users')
+
+    @property
+    def current_user(self):
+        return self._get_registry_hive('current_user')
+
+    @property
+    def classes_root(self):
+        return self._get_registry_hive('classes_root')
+
+    @property
+    def current_config(self):
+        return self._get_registry_hive('current_config')
+
+    def close(self):
+        """ Shuts down the executor, if it was created by this object, after the calls on it return
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+__all__ = ('AsyncRegistryComputer', 'AsyncKeyStore', 'AsyncValueStore')
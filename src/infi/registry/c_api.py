@@ -1,26 +1,81 @@
-
+import threading
 from .constants import MAX_KEYNAME_LENGTH, MAX_VALUENAME_LENGTH
 from .dtypes import create_unicode_buffer
-from .dtypes  import BYTE, LPVOID, DWORD, LONG, LPCWSTR, HKEY, LPWSTR, POINTER
+from .dtypes  import BYTE, BOOL, LPVOID, DWORD, LONG, LPCWSTR, HANDLE, HKEY, LPWSTR, POINTER
 from .dtypes import SECURITY_ATTRIBUTES, FILETIME
-from .funcs import wrap_advapi32_function
+from . import funcs
+
+class FreshDefault(object):
+    """ A default value of a parameter that is created on every call, for small values the function modifies
+    """
+    def __init__(self, factory, *args):
+        self._factory = factory
+        self._args = args
+
+    def get(self):
+        return self._factory(*self._args)
+
+class ScratchDefault(FreshDefault):
+    """ A default value of a parameter that is created once per thread and reused by the following calls,
+    for large output buffers. The caller must copy what it needs out of the buffer before the next call.
+    """
+    def __init__(self, factory, *args):
+        super(ScratchDefault, self).__init__(factory, *args)
+        self._local = threading.local()
+
+    def get(self):
+        value = getattr(self._local, 'value', None)
+        if value is None:
+            value = self._local.value = FreshDefault.get(self)
+        return value
 
 class WrappedFunction(object):
+    """ Calls the advapi32 function by the name of the sub-class.
+    The ctypes prototype is built and bound to the dll once, on the first call or by warm_up().
+    Defaults that are FreshDefault or ScratchDefault instances are handed to the function on every call,
+    since defaults that are baked into the prototype are shared between calls and threads.
+    """
+    _dll = 'advapi32'
+    _errcheck = 'raise_last_error_if_failed'
     _return_value = LONG
     _parameters = ()
 
     @classmethod
     def __new__(cls, *args, **kwargs):
-        function = cls._get_function()
+        function, defaults = cls._get_binding()
+        for position, name, default in defaults:
+            if position >= len(args) - 1 and name not in kwargs:
+                kwargs[name] = default.get()
         return_value = function(*args[1:], **kwargs)
         return return_value
 
+    @classmethod
+    def _get_binding(cls):
+        binding = cls.__dict__.get('_binding')
+        if binding is None:
+            binding = cls._binding = cls._bind()
+        return binding
+
+    @classmethod
+    def _bind(cls):
+        parameters, defaults, position = (), [], 0
+        for parameter in cls._get_parameters():
+            if len(parameter) > 3 and isinstance(parameter[3], FreshDefault):
+                defaults.append((position, parameter[2], parameter[3]))
+                parameter = parameter[:3]
+            parameters += (parameter,)
+            if parameter[1] != 2:  # output-only parameters are not part of the arguments
+                position += 1
+        if cls._dll == 'advapi32':
+            function = funcs.wrap_advapi32_function(cls.__name__, cls._return_value, parameters)
+        else:
+            function = funcs.wrap_last_error_function(cls._dll, cls.__name__, cls._return_value, parameters,
+                                                      getattr(funcs, cls._errcheck))
+        return function, tuple(defaults)
+
     @classmethod
     def _get_function(cls):
-        name = cls.__name__
-        return_value = cls._return_value
-        parameters = cls._get_parameters()
-        function = wrap_advapi32_function(name, return_value, parameters)
+        function, defaults = cls._get_binding()
         return function
 
     @classmethod
@@ -28,10 +83,18 @@ class WrappedFunction(object):
         try:
             function = cls._get_function()
             return True
-        except AttributeError:
+        except (AttributeError, ImportError, OSError):
+            # the dll, or the function in it, is missing, or ctypes cannot load dlls on this platform
             return False
         return True # pragma: no cover
 
+def warm_up():
+    """ Binds all the functions in advance, instead of on their first call.
+    Functions that are not available on this platform are skipped.
+    """
+    for cls in WrappedFunction.__subclasses__():
+        cls.is_available_on_this_platform()
+
 class RegCloseKey(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
@@ -55,11 +118,31 @@ class RegCreateKeyExW(WrappedFunction):
             (POINTER(HKEY), 2, 'result',), \
             (POINTER(DWORD), 2, 'disposition',),
 
+class RegCreateKeyTransactedW(WrappedFunction):
+    @classmethod
+    def _get_parameters(cls):
+        return (HKEY, 1, 'key',), (LPCWSTR, 1, 'subKey',), \
+            (DWORD, 1, 'reserved',), (LPCWSTR, 1, 'classType',), \
+            (DWORD, 1, 'options',), (DWORD, 1, 'samDesired',), \
+            (POINTER(SECURITY_ATTRIBUTES), 1, 'securityAttributes',), \
+            (POINTER(HKEY), 2, 'result',), \
+            (POINTER(DWORD), 2, 'disposition',), \
+            (HANDLE, 1, 'transaction',), \
+            (LPVOID, 1, 'extendedParameter', None),
+
 class RegDeleteKeyW(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
         return (HKEY, 1, 'key',), (LPWSTR, 1, 'subKey',),
 
+class RegDeleteKeyTransactedW(WrappedFunction):
+    @classmethod
+    def _get_parameters(cls):
+        return (HKEY, 1, 'key',), (LPCWSTR, 1, 'subKey',), \
+            (DWORD, 1, 'samDesired', 0), (DWORD, 1, 'reserved', 0), \
+            (HANDLE, 1, 'transaction',), \
+            (LPVOID, 1, 'extendedParameter', None),
+
 class RegDeleteValueW(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
@@ -69,24 +152,24 @@ class RegEnumKeyExW(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
         return (HKEY, 1, 'key',), (DWORD, 1, "index"), \
-            (LPWSTR, 2, 'name', create_unicode_buffer(MAX_KEYNAME_LENGTH)), \
-            (POINTER(DWORD), 3, 'nameSize', DWORD(MAX_KEYNAME_LENGTH)), \
+            (LPWSTR, 3, 'name', ScratchDefault(create_unicode_buffer, MAX_KEYNAME_LENGTH)), \
+            (POINTER(DWORD), 3, 'nameSize', FreshDefault(DWORD, MAX_KEYNAME_LENGTH)), \
             (POINTER(DWORD), 0, 'reserved', None), \
-            (LPWSTR, 3, 'classType', create_unicode_buffer(MAX_KEYNAME_LENGTH)), \
-            (POINTER(DWORD), 3, 'classTypeSize', DWORD(MAX_KEYNAME_LENGTH)), \
-            (POINTER(FILETIME), 3, 'lastWriteTime', FILETIME())
+            (LPWSTR, 3, 'classType', ScratchDefault(create_unicode_buffer, MAX_KEYNAME_LENGTH)), \
+            (POINTER(DWORD), 3, 'classTypeSize', FreshDefault(DWORD, MAX_KEYNAME_LENGTH)), \
+            (POINTER(FILETIME), 3, 'lastWriteTime', ScratchDefault(FILETIME))
 
 class RegEnumValueW(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
         return (HKEY, 1, 'key',), \
             (DWORD, 1, 'index',), \
-            (LPWSTR, 2, 'name', create_unicode_buffer(MAX_VALUENAME_LENGTH)), \
-            (POINTER(DWORD), 3, 'nameLength', DWORD(MAX_VALUENAME_LENGTH)), \
+            (LPWSTR, 3, 'name', ScratchDefault(create_unicode_buffer, MAX_VALUENAME_LENGTH)), \
+            (POINTER(DWORD), 3, 'nameLength', FreshDefault(DWORD, MAX_VALUENAME_LENGTH)), \
             (POINTER(DWORD), 0, 'reserved', None), \
-            (POINTER(DWORD), 2, 'dataType', DWORD()), \
+            (POINTER(DWORD), 2, 'dataType',), \
             (POINTER(BYTE), 3, 'data', (BYTE * 0).from_address(0)), \
-            (POINTER(DWORD), 3, 'dataLength', DWORD())
+            (POINTER(DWORD), 3, 'dataLength', FreshDefault(DWORD))
 
 class RegFlushKey(WrappedFunction):
     @classmethod
@@ -98,9 +181,18 @@ class RegGetValueW(WrappedFunction):
     def _get_parameters(cls):
         return (HKEY, 1, 'key',), (LPCWSTR, 1, 'subKey',), \
             (LPCWSTR, 1, 'valueName',), (DWORD, 1, 'flags', 0), \
-            (POINTER(DWORD), 2, 'dataType', DWORD()), \
+            (POINTER(DWORD), 2, 'dataType',), \
             (POINTER(BYTE), 3, 'data', (BYTE * 0).from_address(0)), \
-            (POINTER(DWORD), 3, 'dataLength', DWORD()),
+            (POINTER(DWORD), 3, 'dataLength', FreshDefault(DWORD)),
+
+class RegNotifyChangeKeyValue(WrappedFunction):
+    @classmethod
+    def _get_parameters(cls):
+        return (HKEY, 1, 'key',), \
+            (BOOL, 1, 'watchSubtree',), \
+            (DWORD, 1, 'notifyFilter',), \
+            (HANDLE, 1, 'event',), \
+            (BOOL, 1, 'asynchronous', True),
 
 class RegOpenKeyExW(WrappedFunction):
     @classmethod
@@ -110,12 +202,22 @@ class RegOpenKeyExW(WrappedFunction):
             (DWORD, 1, 'options', 0), (DWORD, 1, 'samDesired', 0), \
             (POINTER(HKEY), 2, 'result')
 
+class RegOpenKeyTransactedW(WrappedFunction):
+    @classmethod
+    def _get_parameters(cls):
+        return (HKEY, 1, 'key',), \
+            (LPCWSTR, 1, 'subKey',), \
+            (DWORD, 1, 'options', 0), (DWORD, 1, 'samDesired', 0), \
+            (POINTER(HKEY), 2, 'result'), \
+            (HANDLE, 1, 'transaction',), \
+            (LPVOID, 1, 'extendedParameter', None),
+
 class RegQueryInfoKeyW(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
         return (HKEY, 1, 'key',), \
-                  (LPWSTR, 2, 'classType', create_unicode_buffer(MAX_KEYNAME_LENGTH)), \
-                  (POINTER(DWORD), 3, 'classTypeLength', DWORD(MAX_KEYNAME_LENGTH)), \
+                  (LPWSTR, 3, 'classType', ScratchDefault(create_unicode_buffer, MAX_KEYNAME_LENGTH)), \
+                  (POINTER(DWORD), 3, 'classTypeLength', FreshDefault(DWORD, MAX_KEYNAME_LENGTH)), \
                   (POINTER(DWORD), 0, 'reserved', None), \
                   (POINTER(DWORD), 2, 'subKeys',), \
                   (POINTER(DWORD), 2, 'maxSubKeyLength',), \
@@ -132,15 +234,15 @@ class RegQueryValueExW(WrappedFunction):
         return (HKEY, 1, 'key',), \
             (LPCWSTR, 1, 'name',), \
             (POINTER(DWORD), 0, 'reserved', None), \
-            (POINTER(DWORD), 2, 'dataType', DWORD()), \
+            (POINTER(DWORD), 2, 'dataType',), \
             (POINTER(BYTE), 3, 'data', (BYTE * 0).from_address(0)), \
-            (POINTER(DWORD), 3, 'dataLength', DWORD())
+            (POINTER(DWORD), 3, 'dataLength', FreshDefault(DWORD))
 
 class RegSetKeyValueW(WrappedFunction):
     @classmethod
     def _get_parameters(cls):
         return (HKEY, 1, 'key',), \
-            (LPCWSTR, 1, 'subKey,',), \
+            (LPCWSTR, 1, 'subKey',), \
             (LPCWSTR, 1, 'valueName',), \
             (DWORD, 1, 'dataType',), \
             (POINTER(BYTE), 1, 'data',), \
@@ -155,3 +257,72 @@ class RegSetValueExW(WrappedFunction):
             (DWORD, 1, 'dataType',), \
             (POINTER(BYTE), 1, 'data',), \
             (DWORD, 1, 'dataLength',)
+
+class CreateTransaction(WrappedFunction):
+    _dll = 'ktmw32'
+    _return_value = HANDLE
+
+    @classmethod
+    def _get_parameters(cls):
+        return (LPVOID, 1, 'transactionAttributes', None), \
+            (LPVOID, 1, 'uow', None), \
+            (DWORD, 1, 'createOptions', 0), \
+            (DWORD, 1, 'isolationLevel', 0), \
+            (DWORD, 1, 'isolationFlags', 0), \
+            (DWORD, 1, 'timeout', 0), \
+            (LPWSTR, 1, 'description', None),
+
+class CommitTransaction(WrappedFunction):
+    _dll = 'ktmw32'
+    _return_value = BOOL
+
+    @classmethod
+    def _get_parameters(cls):
+        return (HANDLE, 1, 'transaction',),
+
+class RollbackTransaction(WrappedFunction):
+    _dll = 'ktmw32'
+    _return_value = BOOL
+
+    @classmethod
+    def _get_parameters(cls):
+        return (HANDLE, 1, 'transaction',),
+
+class CloseHandle(WrappedFunction):
+    _dll = 'kernel32'
+    _return_value = BOOL
+
+    @classmethod
+    def _get_parameters(cls):
+        return (HANDLE, 1, 'handle',),
+
+class CreateEventW(WrappedFunction):
+    _dll = 'kernel32'
+    _return_value = HANDLE
+
+    @classmethod
+    def _get_parameters(cls):
+        return (LPVOID, 1, 'eventAttributes', None), \
+            (BOOL, 1, 'manualReset', False), \
+            (BOOL, 1, 'initialState', False), \
+            (LPCWSTR, 1, 'name', None),
+
+class SetEvent(WrappedFunction):
+    _dll = 'kernel32'
+    _return_value = BOOL
+
+    @classmethod
+    def _get_parameters(cls):
+        return (HANDLE, 1, 'event',),
+
+class WaitForMultipleObjects(WrappedFunction):
+    _dll = 'kernel32'
+    _errcheck = 'raise_last_error_if_wait_failed'
+    _return_value = DWORD
+
+    @classmethod
+    def _get_parameters(cls):
+        return (DWORD, 1, 'count',), \
+            (POINTER(HANDLE), 1, 'handles',), \
+            (BOOL, 1, 'waitAll', False), \
+            (DWORD, 1, 'milliseconds',),
@@ -0,0 +1,397 @@
+""" Caches that can be handed to LocalComputer and RegistryComputer to save calls into the registry.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from . import errors
+
+class CachedHandle(object):
+    __slots__ = ('key', 'handle', 'backend', 'users', 'cached')
+
+    def __init__(self, key, handle, backend):
+        self.key = key
+        self.handle = handle
+        self.backend = backend
+        self.users = 0
+        self.cached = True
+
+class HandleCache(object):
+    """ A bounded cache of open key handles, shared by all the KeyStore objects of the same key.
+
+    Handles are cached by (computer name, predefined key, absolute path, sam).
+    When the cache is full, the least-recently-used handle is evicted.
+    Handles that are evicted or invalidated while KeyStore objects still use them are closed when they are released.
+    Handles to a key, and to its subkeys, are invalidated when the key is deleted or its permissions are changed
+    through this library. Changes made by other processes are not tracked.
+    """
+
+    _entry_class = CachedHandle
+
+    def __init__(self, maxsize=128):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._entries_by_handle = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def acquire(self, key, opener, backend):
+        """ Returns a handle for the key, opening it by calling opener() if it is not cached.
+        Every handle that is acquired must be released.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = self._entries.pop(key)
+                entry.users += 1
+                self.hits += 1
+                return entry.handle
+            self.misses += 1
+        handle = opener()
+        with self._lock:
+            entry = self._new_entry(key, handle, backend)
+            entry.users += 1
+            self._entries_by_handle[handle] = entry
+            to_close = self._uncache(self._entries.pop(key, None))
+            self._entries[key] = entry
+            while len(self._entries) > self._maxsize:
+                key, evicted = self._entries.popitem(last=False)
+                self.evictions += 1
+                to_close.extend(self._uncache(evicted))
+        self._close(to_close)
+        return handle
+
+    def lookup(self, key):
+        """ Returns the handle for the key if it is cached, like acquire does, or None if it is not.
+        Lookups are not counted as hits or misses.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.users += 1
+            return entry.handle
+
+    def release(self, handle):
+        """ Returns a handle that was acquired to the cache, or closes it if it is not cached anymore
+        """
+        with self._lock:
+            entry = self._entries_by_handle[handle]
+            entry.users -= 1
+            to_close = self._close_if_unused(entry)
+        self._close(to_close)
+
+    def discard(self, handle):
+        """ Evicts the handle, which will be closed when it is released by all of its users
+        """
+        to_close = []
+        with self._lock:
+            entry = self._entries_by_handle.get(handle)
+            if entry is not None and entry.cached:
+                to_close = self._uncache(self._entries.pop(entry.key))
+        self._close(to_close)
+
+    def invalidate(self, computer_name, predefined_key, path):
+        """ Evicts the handles of the key in path, and of all its subkeys, regardless of their sam
+        """
+        path = path.lower()
+        to_close = []
+        with self._lock:
+            for key in list(self._entries):
+                key_computer_name, key_predefined_key, key_path, sam = key
+                if (key_computer_name, key_predefined_key) != (computer_name, predefined_key):
+                    continue
+                if key_path == path or key_path.startswith(path + '\\') or not path:
+                    to_close.extend(self._uncache(self._entries.pop(key)))
+        self._close(to_close)
+
+    def clear(self):
+        """ Evicts all the handles
+        """
+        to_close = []
+        with self._lock:
+            while self._entries:
+                key, entry = self._entries.popitem()
+                to_close.extend(self._uncache(entry))
+        self._close(to_close)
+
+    def _new_entry(self, key, handle, backend):
+        # called with the lock held, before the entry can be seen by other threads
+        return self._entry_class(key, handle, backend)
+
+    def _uncache(self, entry):
+        if entry is None:
+            return []
+        entry.cached = False
+        return self._close_if_unused(entry)
+
+    def _close_if_unused(self, entry):
+        if entry.users or entry.cached:
+            return []
+        del self._entries_by_handle[entry.handle]
+        return [entry]
+
+    def _close(self, entries):
+        for entry in entries:
+            entry.backend.RegCloseKey(entry.handle)
+
+class PooledConnection(CachedHandle):
+    __slots__ = ('last_used', 'last_checked')
+
+    def __init__(self, key, handle, backend, now):
+        super(PooledConnection, self).__init__(key, handle, backend)
+        self.last_used = self.last_checked = now
+
+class _GuardedBackend(object):
+    """ Forwards the calls to a backend, and discards the pooled connection that a call was made on if it failed
+    because the connection is broken, so the pool does not hand it out again.
+    """
+
+    def __init__(self, backend, pool):
+        self.backend = backend
+        self._pool = pool
+
+    def __getattr__(self, name):
+        if not name.startswith('Reg'):
+            return getattr(self.backend, name)
+
+        def call(key, *args, **kwargs):
+            try:
+                return getattr(self.backend, name)(key, *args, **kwargs)
+            except (errors.RemoteRegistryConnectionFailed, errors.InvalidHandleException):
+                self._pool.discard(key)
+                raise
+        setattr(self, name, call)
+        return call
+
+class ConnectionPool(HandleCache):
+    """ A pool of open handles to the hives of local and remote computers, which RegistryComputer objects can share,
+    so accessing a hive does not cost a connection to the remote registry every time.
+
+    Connections are pooled by (computer name, predefined key, sam), and should only be shared by computers that use
+    the same backend. Connections that were not used for idle_timeout seconds are closed.
+    A connection that was not checked for health_check_interval seconds is checked before it is handed out,
+    and is reconnected if the remote registry cannot be reached through it anymore. A connection that a call fails
+    on, because the remote registry cannot be reached or the handle is invalid, is not handed out again.
+    The idle connections are looked for at most once every expire_interval seconds, a tenth of idle_timeout
+    by default.
+    When the pool holds more than maxsize connections, the least-recently-used connection is evicted.
+    """
+
+    _entry_class = PooledConnection
+
+    def __init__(self, maxsize=1024, idle_timeout=300, health_check_interval=60, connect_retries=1, clock=None,
+                 expire_interval=None):
+        super(ConnectionPool, self).__init__(maxsize)
+        self._connect_retries = connect_retries
+        self._idle_timeout = idle_timeout
+        self._health_check_interval = health_check_interval
+        self._expire_interval = idle_timeout / 10.0 if expire_interval is None else expire_interval
+        self._clock = clock or getattr(time, 'monotonic', time.time)
+        self._next_expiration = None
+        self.reconnects = 0
+        self.expirations = 0
+
+    def guard(self, backend):
+        """ Returns a backend that forwards the calls to backend, and discards the pooled connections that
+        calls fail on because the connection is broken.
+        """
+        return _GuardedBackend(backend, self)
+
+    def acquire(self, key, opener, backend):
+        now = self._clock()
+        if self._next_expiration is None or now >= self._next_expiration:
+            self.expire_idle()
+        with self._lock:
+            entry = self._entries.get(key)
+            needs_check = entry is not None and now - entry.last_checked >= self._health_check_interval
+            if needs_check:
+                entry.users += 1
+        if needs_check:
+            healthy = self._is_healthy(entry)
+            self.release(entry.handle)
+            if healthy:
+                entry.last_checked = now
+            else:
+                self.discard(entry.handle)
+                self.reconnects += 1
+        handle = super(ConnectionPool, self).acquire(key, lambda: self._connect(opener), backend)
+        with self._lock:
+            self._entries_by_handle[handle].last_used = now
+        return handle
+
+    def release(self, handle):
+        with self._lock:
+            self._entries_by_handle[handle].last_used = self._clock()
+        super(ConnectionPool, self).release(handle)
+
+    def expire_idle(self):
+        """ Closes the connections that are not in use and were not used for idle_timeout seconds
+        """
+        now = self._clock()
+        to_close = []
+        with self._lock:
+            self._next_expiration = now + self._expire_interval
+            for key, entry in list(self._entries.items()):
+                if entry.users or now - entry.last_used < self._idle_timeout:
+                    continue
+                self.expirations += 1
+                to_close.extend(self._uncache(self._entries.pop(key)))
+        self._close(to_close)
+
+    def _new_entry(self, key, handle, backend):
+        # the connection was just made, so it is not checked until health_check_interval passes
+        return self._entry_class(key, handle, backend, self._clock())
+
+    def _connect(self, opener):
+        # the remote registry service is started on demand, so the first connection to a computer may fail
+        for attempt in range(self._connect_retries + 1):
+            try:
+                return opener()
+            except errors.RemoteRegistryConnectionFailed:
+                if attempt == self._connect_retries:
+                    raise
+                self.reconnects += 1
+
+    def _is_healthy(self, entry):
+        try:
+            entry.backend.RegQueryInfoKey(entry.handle)
+        except (errors.RemoteRegistryConnectionFailed, errors.InvalidHandleException):
+            return False
+        except errors.RegistryBaseException:
+            pass
+        return True
+
+class _Missing(object):
+    def __repr__(self):
+        return 'MISSING'
+
+MISSING = _Missing()
+
+class ValueCache(object):
+    """ A read-through cache of registry values, which LocalComputer and RegistryComputer objects can share,
+    so reading the same values over and over does not cost calls into the registry.
+
+    Values are cached by (computer name, predefined key, path, value name), for ttl seconds.
+    Values and keys that do not exist are cached as well, as MISSING, for negative_ttl seconds,
+    which default to ttl. When the cache holds more than maxsize entries, the least-recently-used one is evicted.
+    Values, and keys with their subkeys, are invalidated when they are written or deleted through this library,
+    and the whole hive is invalidated when a transaction on it is committed.
+    Changes made by other processes are only noticed when the entries expire.
+    """
+
+    def __init__(self, maxsize=4096, ttl=5, negative_ttl=None, clock=None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._clock = clock or getattr(time, 'monotonic', time.time)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self):
+        """ The part of the lookups that were answered by the cache, including the ones answered with MISSING
+        """
+        lookups = self.hits + self.negative_hits + self.misses
+        return float(self.hits + self.negative_hits) / lookups if lookups else 0.0
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires <= now:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries[key] = self._entries.pop(key)
+        return value
+
+    def lookup(self, key):
+        """ Returns the cached RegistryValue for the key, a (computer name, predefined key, path, name) tuple,
+        MISSING if the value or its key are known not to exist, or None if the cache does not know.
+        """
+        computer_name, predefined_key, path, name = key
+        now = self._clock()
+        with self._lock:
+            value = self._get(key, now)
+            if value is None:
+                value = self._get((computer_name, predefined_key, path, None), now)
+            if value is None:
+                self.misses += 1
+            elif value is MISSING:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def is_missing(self, key):
+        """ Returns True if the key, a (computer name, predefined key, path, None) tuple, is known not to exist.
+        Only the keys that are known not to exist are cached, so the other lookups are not counted as misses.
+        """
+        with self._lock:
+            if self._get(key, self._clock()) is not MISSING:
+                return False
+            self.negative_hits += 1
+            return True
+
+    def store(self, key, value, ttl=None):
+        """ Caches the value, a RegistryValue or MISSING, of the key, for ttl seconds if given.
+        Only keys can be cached as MISSING under the name None.
+        """
+        if ttl is None:
+            ttl = self._negative_ttl if value is MISSING else self._ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, self._clock() + ttl)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _pop_missing_ancestors(self, computer_name, predefined_key, path):
+        # the keys that lead to a key that was written exist now
+        names = path.split('\\') if path else []
+        for depth in range(len(names) + 1):
+            self._entries.pop((computer_name, predefined_key, '\\'.join(names[:depth]), None), None)
+
+    def invalidate_value(self, computer_name, predefined_key, path, name):
+        """ Evicts the value name of the key in path, after it was written or deleted
+        """
+        path = path.lower()
+        with self._lock:
+            self._entries.pop((computer_name, predefined_key, path, name), None)
+            self._pop_missing_ancestors(computer_name, predefined_key, path)
+
+    def invalidate(self, computer_name, predefined_key, path):
+        """ Evicts the values of the key in path, and of all its subkeys, after it was created or deleted
+        """
+        path = path.lower()
+        with self._lock:
+            for key in list(self._entries):
+                key_computer_name, key_predefined_key, key_path, name = key
+                if (key_computer_name, key_predefined_key) != (computer_name, predefined_key):
+                    continue
+                if key_path == path or key_path.startswith(path + '\\') or not path:
+                    del self._entries[key]
+            self._pop_missing_ancestors(computer_name, predefined_key, path)
+
+    def clear(self):
+        """ Evicts all the values
+        """
+        with self._lock:
+            self._entries.clear()
+
+__all__ = ('HandleCache', 'ConnectionPool', 'ValueCache', 'MISSING')
@@ -30,7 +30,9 @@ REG_FULL_RESOURCE_DESCRIPTOR = 9
 REG_LINK = 6
 REG_MULTI_SZ = 7
 REG_NONE = 0
+REG_NOTIFY_CHANGE_NAME = 1
 REG_NOTIFY_CHANGE_ATTRIBUTES = 2
+REG_NOTIFY_CHANGE_LAST_SET = 4
 REG_NOTIFY_CHANGE_SECURITY = 8
 REG_QWORD = 11
 REG_QWORD_LITTLE_ENDIAN = 11
@@ -45,6 +47,7 @@ HKEY_PERFORMANCE_DATA = -2147483644
 HKEY_USERS = -2147483645
 KEY_ALL_ACCESS = 983103
 KEY_CREATE_LINK = 32
+KEY_CREATE_SUB_KEY = 4
 KEY_ENUMERATE_SUB_KEYS = 8
 KEY_EXECUTE = 131097
 KEY_NOTIFY = 16
@@ -55,6 +58,8 @@ KEY_WOW64_32KEY = 512
 KEY_WOW64_64KEY = 256
 KEY_WOW64_RES = 768
 KEY_WRITE = 131078
+RRF_RT_ANY = 65535
+RRF_NOEXPAND = 268435456
 
 ERROR_SUCCESS = 0
 ERROR_BAD_NETPATH = 53
@@ -63,6 +68,15 @@ ERROR_ACCESS_DENIED = 5
 ERROR_INVALID_HANDLE = 6
 ERROR_INVALID_PARAMETER = 87
 ERROR_FILE_NOT_FOUND = 2
+ERROR_KEY_DELETED = 1018
+ERROR_MORE_DATA = 234
+ERROR_TIMEOUT = 1460
+ERROR_TRANSACTION_NOT_ACTIVE = 6701
+WAIT_OBJECT_0 = 0
+WAIT_TIMEOUT = 258
+WAIT_FAILED = 4294967295
+INFINITE = 4294967295
+MAXIMUM_WAIT_OBJECTS = 64
 
 MAX_KEYNAME_LENGTH = 256
 ERROR_NO_MORE_ITEMS = 259
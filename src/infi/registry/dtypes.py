@@ -3,6 +3,7 @@ from ctypes import POINTER
 from ctypes import c_byte as BYTE
 from ctypes import c_void_p as LPVOID
 from ctypes import c_void_p as HKEY
+from ctypes import c_void_p as HANDLE
 from ctypes import c_wchar_p as LPCWSTR
 from ctypes import c_wchar_p as LPWSTR
 from ctypes import c_long as BOOL
@@ -7,6 +7,12 @@ if os.name == 'nt':
 else:
     WindowsError = OSError
 
+try:
+    from six.moves.builtins import TimeoutError
+except ImportError:
+    class TimeoutError(OSError):
+        pass
+
 class RegistryBaseException(Exception):
     pass
 
@@ -49,6 +55,25 @@ class OpenKeyFailed(RegistryBaseException):
 class QueryInfoKeyFailed(RegistryBaseException):
     pass
 
+class TransactionFailed(RegistryBaseException):
+    pass
+
+class NotifyChangeFailed(RegistryBaseException):
+    pass
+
+class EventFailed(RegistryBaseException):
+    pass
+
+class TimeoutException(RegistryBaseException, TimeoutError):
+    pass
+
+class BufferTooSmallException(RegistryBaseException, ValueError):
+    def __init__(self, required_size, size):
+        super(BufferTooSmallException, self).__init__(
+            constants.ERROR_MORE_DATA, 'The value needs %d bytes, but the buffer has %d bytes' % (required_size, size))
+        self.required_size = required_size
+        self.size = size
+
 def is_invalid_handle(exception):
     return exception.winerror == constants.ERROR_INVALID_HANDLE
 
@@ -67,16 +92,28 @@ def is_subkey_not_found(exception):
 def is_no_more_items(exception):
     return exception.winerror == constants.ERROR_NO_MORE_ITEMS
 
+# the errors that mean the same to every function, and the exceptions that they are raised as
+GENERAL_ERRORS = {
+    constants.ERROR_INVALID_HANDLE: InvalidHandleException,
+    constants.ERROR_BAD_NETPATH: RemoteRegistryConnectionFailed,
+    constants.RPC_S_INVALID_NET_ADDR: RemoteRegistryConnectionFailed,
+    constants.ERROR_ACCESS_DENIED: AccessDeniedException,
+    constants.ERROR_INVALID_PARAMETER: InvalidParameterException,
+    constants.ERROR_FILE_NOT_FOUND: KeyError,
+    constants.ERROR_NO_MORE_ITEMS: IndexError,
+}
+
+def windows_error(winerror):
+    """ Returns a WindowsError of winerror, without looking up its message, for the errors that are never shown
+    """
+    exception = WindowsError(None, None, None, winerror)
+    exception.winerror = winerror
+    return exception
+
 def catch_and_raise_general_errors(exception):
-    if is_invalid_handle(exception):
-        raise InvalidHandleException(exception)
-    if is_connection_failed(exception):
-        raise RemoteRegistryConnectionFailed(exception)
-    if is_access_defined(exception):
-        raise AccessDeniedException(exception)
-    if is_invalid_parameter(exception):
-        raise InvalidParameterException(exception)
-    if is_subkey_not_found(exception):
-        raise KeyError
-    if is_no_more_items(exception):
-        raise IndexError
+    exception_class = GENERAL_ERRORS.get(exception.winerror)
+    if exception_class is None:
+        return
+    if issubclass(exception_class, RegistryBaseException):
+        raise exception_class(exception)
+    raise exception_class
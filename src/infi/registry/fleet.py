@@ -0,0 +1,128 @@
+""" Querying the same keys and values on many computers at once.
+
+>>> queries = [Query(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion',
+...                  [u'CurrentVersion', u'CurrentBuild'])]
+>>> for result in query_fleet([r'\\\\host1', r'\\\\host2'], queries):
+...     print(result.computer_name, result.values, result.errors)
+
+Every computer gets a HostResult as soon as all of its queries are done, in the order the computers finish.
+A computer that cannot be reached, or that denies access to a key, only fails its own queries.
+"""
+
+import threading
+from collections import namedtuple
+from six.moves import queue
+from . import constants, errors
+from .key import RegistryComputer
+
+class Query(namedtuple('Query', ('hive', 'path', 'value_names'))):
+    """ The values to read from the key in path, under the predefined key in hive.
+    If value_names is None, all the values of the key are read.
+    """
+    __slots__ = ()
+
+    def __new__(cls, hive, path, value_names=None):
+        return super(Query, cls).__new__(cls, hive, path, value_names)
+
+class HostResult(object):
+    """ The outcome of the queries on one computer.
+    values is a dict of {(hive, path, name): RegistryValue}, with None for the values that do not exist,
+    and errors is a dict of {(hive, path): exception} for the queries that failed.
+    """
+    __slots__ = ('computer_name', 'values', 'errors')
+
+    def __init__(self, computer_name):
+        self.computer_name = computer_name
+        self.values = {}
+        self.errors = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return '<HostResult %s: %d values, %d errors>' % (self.computer_name, len(self.values), len(self.errors))
+
+class _Host(object):
+    def __init__(self, computer, lanes):
+        self.computer = computer
+        self.result = HostResult(computer._computer_name)
+        self.lock = threading.Lock()
+        self.lanes_left = lanes
+        self.connection_error = None
+
+def _run_query(host, hives, query):
+    if host.connection_error is not None:
+        raise host.connection_error
+    if query.hive not in hives:
+        hives[query.hive] = host.computer._get_registry_hive(query.hive)
+    hive = hives[query.hive]
+    if query.value_names is None:
+        values = hive[query.path].values_store.items()
+    else:
+        values = zip(query.value_names, hive.read_values((query.path, name) for name in query.value_names))
+    return [((query.hive, query.path, name), value) for name, value in values]
+
+def _run_lane(host, queries, stopped):
+    hives = {}
+    for query in queries:
+        if stopped.is_set():
+            return False
+        try:
+            values = _run_query(host, hives, query)
+        except Exception as error:
+            if isinstance(error, errors.RemoteRegistryConnectionFailed):
+                # the other queries of the computer fail the same way, without waiting for it again
+                host.connection_error = error
+            with host.lock:
+                host.result.errors[(query.hive, query.path)] = error
+            continue
+        with host.lock:
+            host.result.values.update(values)
+    with host.lock:
+        host.lanes_left -= 1
+        return host.lanes_left == 0
+
+def _worker(lanes, results, stopped):
+    while not stopped.is_set():
+        try:
+            host, queries = lanes.get_nowait()
+        except queue.Empty:
+            return
+        if _run_lane(host, queries, stopped):
+            results.put(host.result)
+
+def query_fleet(computer_names, queries, sam=constants.KEY_READ, max_workers=64, max_per_host=2, backend=None,
+                connection_pool=None):
+    """ Runs the queries, a list of Query objects, on every computer in computer_names, and yields a HostResult
+    for every computer as soon as all of its queries are done.
+    At most max_workers queries run at the same time, and at most max_per_host of them on the same computer.
+    The computers are accessed with sam, through the backend and the cache.ConnectionPool that are passed, if any.
+    Closing the generator stops the queries that did not start yet, without waiting for the ones that are running,
+    which finish on their own, on daemon threads.
+    """
+    queries = list(queries)
+    lanes = queue.Queue()
+    hosts = 0
+    for computer_name in computer_names:
+        computer = RegistryComputer(computer_name, sam, backend, connection_pool=connection_pool)
+        lane_count = max(1, min(max_per_host, len(queries)))
+        host = _Host(computer, lane_count)
+        for index in range(lane_count):
+            lanes.put((host, queries[index::lane_count]))
+        hosts += 1
+    results = queue.Queue()
+    stopped = threading.Event()
+    threads = [threading.Thread(target=_worker, args=(lanes, results, stopped))
+               for _ in range(min(max_workers, lanes.qsize()))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        for _ in range(hosts):
+            yield results.get()
+    finally:
+        # a running query may wait on an unreachable computer for a long time, so the threads are not joined
+        stopped.set()
+
+__all__ = ('Query', 'HostResult', 'query_fleet')
@@ -1,11 +1,14 @@
 
 import logging
-from . import constants
+from . import constants, errors
 from .dtypes import LONG, BYTE, LPCWSTR
 
 def raise_exception_if_necessary(result, func, args):
-    from ctypes import WinError
     if result != constants.ERROR_SUCCESS:
+        if result in errors.GENERAL_ERRORS:
+            # these are turned into other exceptions, so formatting their messages is a waste
+            raise errors.windows_error(result)
+        from ctypes import WinError
         raise WinError(result)
     return args
 
@@ -37,6 +40,33 @@ def wrap_advapi32_function(name, return_value=LONG, parameters=()):
     _function.errcheck = raise_exception_if_necessary
     return _function
 
+def raise_last_error_if_failed(result, func, args):
+    from ctypes import WinError, c_void_p
+    if not result or result == c_void_p(-1).value:
+        raise WinError()
+    return args
+
+def raise_last_error_if_wait_failed(result, func, args):
+    from ctypes import WinError
+    if result == constants.WAIT_FAILED:
+        raise WinError()
+    return args
+
+def wrap_last_error_function(dll_name, name, return_value, parameters=(), errcheck=raise_last_error_if_failed):
+    """ this function wraps functions from dlls other than advapi32.dll,
+    which return a zero or an invalid handle on failure, and set the error code by SetLastError.
+    The parameters are of the same form as wrap_advapi32_function's.
+    Functions that report failures differently are wrapped with another errcheck function.
+    """
+    from ctypes import WinDLL, WINFUNCTYPE
+
+    args = _build_args_for_winfunctype(return_value, parameters)
+    _prototype = WINFUNCTYPE(*args)
+    _paramflags = _build_paramflags_for_prototype(parameters)
+    _function = _prototype((name, WinDLL(dll_name)), _paramflags)
+    _function.errcheck = errcheck
+    return _function
+
 def item_to_unicode(item):
     from six import text_type
     try:
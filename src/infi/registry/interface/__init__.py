@@ -2,7 +2,30 @@ __import__("pkg_resources").declare_namespace(__name__)
 
 import logging
 from .. import constants, c_api, errors, dtypes
-from ..value import RegistryValueFactory
+from ..value import RegistryValueFactory, RegistryValue
+
+class _NoDefault(object):
+    def __repr__(self):
+        return 'NO_DEFAULT'
+
+# passed as the default of the functions that take one, when a missing value should raise KeyError
+NO_DEFAULT = _NoDefault()
+
+# makes the values that are read when no value_factory is passed, with binary values as tuples of ints
+_DEFAULT_VALUE_FACTORY = RegistryValueFactory()
+
+# RegGetValue reads values into a buffer of this size first, so small values take a single call
+_GET_VALUE_INITIAL_BUFFER_SIZE = 512
+
+def get_registry_value(valueData, valueDataType=None):
+    """ Returns valueData as a RegistryValue object, converting it by valueDataType if given, or by its value.
+    RegistryValue objects are returned as they are.
+    """
+    if isinstance(valueData, RegistryValue):
+        return valueData
+    if valueDataType is not None:
+        return RegistryValueFactory().by_type(valueDataType)(valueData)
+    return RegistryValueFactory().by_value(valueData)
 
 def RegCloseKey(key):
     """ Closes a handle to the specified registry key
@@ -25,6 +48,18 @@ def RegCloseKey(key):
         logging.exception(exception)
         raise errors.CloseKeyFailed
 
+ALLOWED_KEYS_REMOTE = [constants.HKEY_LOCAL_MACHINE, constants.HKEY_USERS]
+ALLOWED_KEYS_LOCAL = ALLOWED_KEYS_REMOTE + [constants.HKEY_CURRENT_USER, constants.HKEY_CLASSES_ROOT,
+                                            constants.HKEY_CURRENT_CONFIG]
+
+def check_predefined_key(machineName, key):
+    """ Raises ValueError if the predefined registry handle cannot be connected to on the given computer.
+    """
+    if machineName is None and key not in ALLOWED_KEYS_LOCAL:
+        raise ValueError
+    if machineName is not None and key not in ALLOWED_KEYS_REMOTE:
+        raise ValueError
+
 def RegConnectRegistry(machineName, key):
     """ Establishes a connection to a predefined registry handle on another computer.
 
@@ -42,14 +77,7 @@ def RegConnectRegistry(machineName, key):
     Notes
     This function does not support the additional predefined handles added in Windows Vista
     """
-    ALLOWED_KEYS_REMOTE = [constants.HKEY_LOCAL_MACHINE, constants.HKEY_USERS]
-    ALLOWED_KEYS_LOCAL = ALLOWED_KEYS_REMOTE + [constants.HKEY_CURRENT_USER, constants.HKEY_CLASSES_ROOT,
-                                                constants.HKEY_CURRENT_CONFIG]
-    if machineName is None and key not in ALLOWED_KEYS_LOCAL:
-        raise ValueError
-    if machineName is not None and key not in ALLOWED_KEYS_REMOTE:
-        raise ValueError
-
+    check_predefined_key(machineName, key)
     try:
         return c_api.RegConnectRegistryW(machineName, key)
     except errors.WindowsError as exception:
@@ -85,8 +113,29 @@ def RegCreateKeyEx(key, subKey, samDesired=constants.KEY_ALL_ACCESS):
         logging.exception(exception)
         raise errors.CreateKeyFailed(exception.winerror, exception.strerror)
 
-def RegCreateKeyTransacted():
-    raise NotImplementedError # pragma: no cover
+def RegCreateKeyTransacted(key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+    """ Creates the specified key as part of a transaction, or opens the key if it already exists.
+
+    Parameters
+    key            An already open key. The calling process must have KEY_CREATE_SUB_KEY access to the key.
+    subKey         The name of a key that this method opens or creates.
+    transaction    A handle to an active transaction, as returned by CreateTransaction.
+
+    Return Value
+    The return value is the handle of the opened key. Operations on the handle are part of the transaction.
+    If the function fails, a CreateKeyFailed exception is raised, unless:
+    In case of bad permissions, an AccessDeniedException is raised
+    If the key is not open, an InvalidHandleException is raised
+
+    Notes
+    This function does not support the options and securityAttributes arguments.
+    """
+    try:
+        return c_api.RegCreateKeyTransactedW(key, subKey, 0, None, 0, samDesired, None, transaction)[0]
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.CreateKeyFailed(exception.winerror, exception.strerror)
 
 def RegDeleteKey(key, subKey):
     """ Deletes the specified key.  The calling process must have KEY_DELETE access rights.
@@ -119,9 +168,24 @@ def RegDeleteKeyEx():
     # TODO Implement RegDeleteKeyEx
     raise NotImplementedError #pragma: no cover
 
-def RegDeleteKeyTransacted():
-    # TODO Implement RegDeleteKeyTransacted
-    raise NotImplementedError #pragma: no cover
+def RegDeleteKeyTransacted(key, subKey, transaction):
+    """ Deletes the specified key as part of a transaction. This method can not delete keys with subkeys.
+
+    Parameters
+    key            An already open key.
+    subKey         The name of the key to delete. This value must not be None, and the key cannot have subkeys.
+    transaction    A handle to an active transaction, as returned by CreateTransaction.
+
+    Return Value
+    If the function succeeds, it returns None
+    If the function fails, it raises the exceptions RegDeleteKey raises.
+    """
+    try:
+        c_api.RegDeleteKeyTransactedW(key, subKey, 0, 0, transaction)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.DeleteKeyFailed(exception.winerror, exception.strerror)
 
 def RegDeleteKeyValue():
     # TODO Implement RegDeleteKeyValue
@@ -187,7 +251,7 @@ def RegEnumKeyEx(key, index):
         logging.exception(exception)
         raise errors.RegistryBaseException(exception.winerror, exception.strerror)
 
-def RegEnumValue(key, index):
+def RegEnumValue(key, index, value_factory=None):
     """ Enumerates the values for the specified open registry key.
     The function copies one indexed value name and data block for the key each time it is called.
 
@@ -199,6 +263,8 @@ def RegEnumValue(key, index):
                 RegEnumKeyEx function and then incremented for subsequent calls.
                 Because subkeys are not ordered, any new subkey will have an arbitrary index.
                 This means that the function may return subkeys in any order.
+    value_factory   The RegistryValueFactory that makes the RegistryValue object, which decides how binary
+                    values are represented. it is optional.
 
     Return Value
     If the function succeeds, the return a tuple of the value's name and RegistryValue object data.
@@ -212,12 +278,80 @@ def RegEnumValue(key, index):
         data = (dtypes.BYTE * dataLength.value)()
         (name, nameSize, dataType, data, dataLength) = c_api.RegEnumValueW(key=key, index=index,
                                                                     data=data, dataLength=dataLength)
-        return name.value, RegistryValueFactory().by_type(dataType)(data)
+        return name.value, (value_factory or _DEFAULT_VALUE_FACTORY).by_type(dataType)(data)
     except errors.WindowsError as exception:
         errors.catch_and_raise_general_errors(exception)
         logging.exception(exception)
         raise errors.RegistryBaseException(exception.winerror, exception.strerror)
 
+def RegEnumValues(key, value_factory=None):
+    """ Enumerates all the values of the specified open registry key.
+    Unlike RegEnumValue, which queries the size of each value before fetching it,
+    this generator sizes one name buffer and one data buffer by calling RegQueryInfoKey once,
+    and reuses them for all the values of the key, so each value takes a single call.
+    The buffers are only grown if a value changes while the key is being enumerated.
+
+    Parameters
+    key         A handle to an open registry key.
+                The key must have been opened with the KEY_QUERY_VALUE access right
+    value_factory   The RegistryValueFactory that makes the RegistryValue object, which decides how binary
+                    values are represented. it is optional.
+
+    Return Value
+    A generator of tuples of the value's name and RegistryValue object data.
+    If the function fails, a RegistryBaseException exception is raised, unless:
+    If the key is not open, an InvalidHandleException is raised
+    If access is denied, an AccesDeniedException isRaised
+    """
+    value_factory = value_factory or _DEFAULT_VALUE_FACTORY
+    for name, dataType, data, dataLength in _enum_values(key):
+        yield name, value_factory.by_type(dataType)((dtypes.BYTE * dataLength).from_buffer_copy(data))
+
+def RegEnumValuesRaw(key):
+    """ Enumerates all the values of the specified open registry key, like RegEnumValues does,
+    without converting them into RegistryValue objects.
+
+    Parameters
+    key         A handle to an open registry key.
+                The key must have been opened with the KEY_QUERY_VALUE access right
+
+    Return Value
+    A generator of tuples of the value's name, type and data, as bytes.
+    If the function fails, a RegistryBaseException exception is raised, unless:
+    If the key is not open, an InvalidHandleException is raised
+    If access is denied, an AccesDeniedException isRaised
+    """
+    for name, dataType, data, dataLength in _enum_values(key):
+        yield name, dataType, bytes(memoryview(data)[:dataLength])
+
+def _enum_values(key):
+    # yields the name, type and length of each value, with the buffer that it was read into, which is reused
+    from ctypes import sizeof
+    (subKeys, maxSubKeyLength, maxClassTypeLength,
+     values, maxValueNameLength, maxValueLength) = RegQueryInfoKey(key)
+    name = dtypes.create_unicode_buffer(maxValueNameLength + 1)
+    data = (dtypes.BYTE * maxValueLength)()
+    index = 0
+    while index < values:
+        nameLength, dataLength = dtypes.DWORD(len(name)), dtypes.DWORD(sizeof(data))
+        try:
+            (_, _, dataType, _, _) = c_api.RegEnumValueW(key=key, index=index, name=name, nameLength=nameLength,
+                                                          data=data, dataLength=dataLength)
+        except errors.WindowsError as exception:
+            if exception.winerror == constants.ERROR_MORE_DATA and len(name) <= constants.MAX_VALUENAME_LENGTH:
+                if dataLength.value > sizeof(data):
+                    data = (dtypes.BYTE * dataLength.value)()
+                else:
+                    name = dtypes.create_unicode_buffer(min(len(name) * 2, constants.MAX_VALUENAME_LENGTH + 1))
+                continue
+            if errors.is_no_more_items(exception):
+                return
+            errors.catch_and_raise_general_errors(exception)
+            logging.exception(exception)
+            raise errors.RegistryBaseException(exception.winerror, exception.strerror)
+        yield name.value, dataType, data, dataLength.value
+        index += 1
+
 def RegFlushKey(key):
     """ Writes all the attributes of the specified open registry key into the registry
 
@@ -236,6 +370,46 @@ def RegFlushKey(key):
         logging.exception(exception)
         raise errors.FlushKeyError
 
+def RegGetValue(key, subKey, valueName=None, value_factory=None):
+    """ Retrieves the type and data for the specified registry value, without opening a handle to its key.
+
+    Parameters
+    key         A handle to an open registry key.
+                The key must have been opened with the KEY_QUERY_VALUE access right
+    subKey      The path of a subkey of key, from which the value will be retrieved. If None, the value is
+                retrieved from key itself.
+    valueName   The name of the registry value. it is optional.
+    value_factory   The RegistryValueFactory that makes the RegistryValue object, which decides how binary
+                    values are represented. it is optional.
+
+    Return Value
+    If the function succeeds, it returns a RegistryValue object.
+    If the function fails, a RegistryBaseException exception is raised, unless:
+    If the key is not open, an InvalidHandleException is raised
+    If access is denied, an AccesDeniedException isRaised
+    If the subkey or the value does not exist, the function raises KeyError
+
+    Notes
+    Unlike RegQueryValueEx, the value is first fetched into a small buffer,
+    so small values take a single call. REG_EXPAND_SZ values are not expanded.
+    """
+    flags = constants.RRF_RT_ANY | constants.RRF_NOEXPAND
+    data = (dtypes.BYTE * _GET_VALUE_INITIAL_BUFFER_SIZE)()
+    while True:
+        dataLength = dtypes.DWORD(len(data))
+        try:
+            (dataType, _, _) = c_api.RegGetValueW(key, subKey, valueName, flags, data=data, dataLength=dataLength)
+            break
+        except errors.WindowsError as exception:
+            if exception.winerror == constants.ERROR_MORE_DATA and dataLength.value > len(data):
+                data = (dtypes.BYTE * dataLength.value)()
+                continue
+            errors.catch_and_raise_general_errors(exception)
+            logging.exception(exception)
+            raise errors.RegistryBaseException(exception.winerror, exception.strerror)
+    value_data = (dtypes.BYTE * dataLength.value).from_buffer_copy(data)
+    return (value_factory or _DEFAULT_VALUE_FACTORY).by_type(dataType)(value_data)
+
 def RegGetKeySecurity():
     raise NotImplementedError #pragma: no cover
 
@@ -243,6 +417,30 @@ def RegLoadKey():
     # TODO Implement RegLoadKey
     raise NotImplementedError #pragma: no cover
 
+def RegNotifyChangeKeyValue(key, watchSubtree, notifyFilter, event):
+    """ Asks for the event to be signaled once, when the key changes.
+
+    Parameters
+    key             An already open key. The calling process must have KEY_NOTIFY access to the key.
+    watchSubtree    If True, changes to the subkeys of the key, and their subkeys, are reported as well.
+    notifyFilter    A combination of the REG_NOTIFY_CHANGE_* constants, which selects the changes to report.
+    event           A handle to an event, as returned by CreateEvent.
+
+    Return Value
+    If the function succeeds, it returns None. The event is signaled when the key changes, or when its handle is
+    closed, and the function should then be called again for the next change.
+    The notification is tied to the calling thread, which has to stay alive until the event is signaled.
+    If the function fails, a NotifyChangeFailed exception is raised, unless:
+    In case of bad permissions, an AccessDeniedException is raised
+    If the key is not open, an InvalidHandleException is raised
+    """
+    try:
+        c_api.RegNotifyChangeKeyValue(key, watchSubtree, notifyFilter, event)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.NotifyChangeFailed(exception.winerror, exception.strerror)
+
 def RegOpenKeyEx(key, subKey=None, samDesired=constants.KEY_ALL_ACCESS):
     """ Opens the specifics registry key.
 
@@ -292,28 +490,71 @@ def RegQueryInfoKey(key):
         logging.exception(exception)
         raise errors.QueryInfoKeyFailed(exception.winerror, exception.strerror)
 
-def RegQueryValueEx(key, valueName=None):
+def RegQueryValueEx(key, valueName=None, default=NO_DEFAULT, value_factory=None):
     """ Retrieves the type and data for the specified registry value.
 
     Parameters
     key         A handle to an open registry key.
                 The key must have been opened with the KEY_QUERY_VALUE access right
     valueName   The name of the registry value. it is optional.
+    default     Returned if the value does not exist. it is optional.
+    value_factory   The RegistryValueFactory that makes the RegistryValue object, which decides how binary
+                    values are represented. it is optional.
 
     Return Value
     If the function succeeds, the return a tuple of the value's name and RegistryValue object data.
     If the function fails, a RegistryBaseException exception is raised, unless:
     If the key is not open, an InvalidHandleException is raised
     If access is denied, an AccesDeniedException isRaised
-    If the value does not exist, the function raises KeyError
+    If the value does not exist, the function returns default, or raises KeyError if there is none
     """
     try:
         (dataType, data, dataLength) = c_api.RegQueryValueExW(key=key, name=valueName)
         data = (dtypes.BYTE * dataLength.value)()
         (dataType, data, dataLength) = c_api.RegQueryValueExW(key=key, name=valueName,
                                                             data=data, dataLength=dataLength)
-        return RegistryValueFactory().by_type(dataType)(data)
+        return (value_factory or _DEFAULT_VALUE_FACTORY).by_type(dataType)(data)
+    except errors.WindowsError as exception:
+        if default is not NO_DEFAULT and errors.is_subkey_not_found(exception):
+            return default
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.RegistryBaseException(exception.winerror, exception.strerror)
+
+def get_writable_byte_array(buffer):
+    """ Returns a ctypes byte array that shares the memory of buffer, which must be writable and contiguous
+    """
+    view = memoryview(buffer)
+    if view.readonly:
+        raise TypeError('the buffer must be writable')
+    return (dtypes.BYTE * view.nbytes).from_buffer(view)
+
+def RegQueryValueInto(key, valueName, buffer):
+    """ Reads the data of the specified registry value directly into buffer, without copying it.
+
+    Parameters
+    key         A handle to an open registry key.
+                The key must have been opened with the KEY_QUERY_VALUE access right
+    valueName   The name of the registry value, or None for the default value.
+    buffer      A writable object that supports the buffer protocol, such as bytearray, mmap or a numpy array.
+
+    Return Value
+    If the function succeeds, it returns a tuple of the value's type and the number of bytes written to buffer.
+    If the function fails, a RegistryBaseException exception is raised, unless:
+    If the buffer is too small, a BufferTooSmallException is raised, with the size that is needed
+    If the key is not open, an InvalidHandleException is raised
+    If access is denied, an AccesDeniedException isRaised
+    If the value does not exist, the function raises KeyError
+    """
+    data = get_writable_byte_array(buffer)
+    dataLength = dtypes.DWORD(len(data))
+    try:
+        (dataType, _, dataLength) = c_api.RegQueryValueExW(key=key, name=valueName, data=data,
+                                                           dataLength=dataLength)
+        return dataType, dataLength.value
     except errors.WindowsError as exception:
+        if exception.winerror == constants.ERROR_MORE_DATA:
+            raise errors.BufferTooSmallException(dataLength.value, len(data))
         errors.catch_and_raise_general_errors(exception)
         logging.exception(exception)
         raise errors.RegistryBaseException(exception.winerror, exception.strerror)
@@ -334,8 +575,37 @@ def RegSaveKeyEx():
     # TODO Implement RegSaveKeyEx
     raise NotImplementedError #pragma: no cover
 
-def RegSetKeyValue():
-    raise NotImplementedError #pragma: no cover
+def RegSetKeyValue(key, subKey, valueName, valueData, valueDataType=None):
+    """ Sets the data and type of a specified value under a registry key and subkey,
+    without opening a handle to the subkey.
+
+    Parameters
+    key             A handle to an open registry key.
+                    The key must have been opened with the KEY_SET_VALUE access right.
+    subKey          The path of a subkey of key. If it does not exist, it is created.
+                    If it is None, the value is set in key itself.
+    valueName       The name of the value to be set.
+                    If it is None or an empty string, the function sets the type and data
+                    for the key's unnamed or default value.
+    valueData       The value data, or a RegistryValue object.
+    valueDataType   The type of data.
+
+    Return Value
+    If the function succeeds, it returns None.
+    If the function fails, a RegistryBaseException exception is raised, unless:
+    If the key is not open, an InvalidHandleException is raised
+    If access is denied, an AccesDeniedException isRaised
+    """
+    from ctypes import sizeof
+    try:
+        regvalue = get_registry_value(valueData, valueDataType)
+        data, dataType = regvalue.to_byte_array(), regvalue.registry_type
+        result = c_api.RegSetKeyValueW(key=key, subKey=subKey, valueName=valueName, dataType=dataType,
+                                       data=data, dataLength=sizeof(data))
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.RegistryBaseException(exception.winerror, exception.strerror)
 
 def RegSetValueEx(key, valueName, valueData, valueDataType=None):
     """ Sets the data and type of a specified value under a registry key
@@ -346,7 +616,7 @@ def RegSetValueEx(key, valueName, valueData, valueDataType=None):
     valueName       The name of the value to be set.
                     If it is None or an empty string, the function sets the type and data
                     for the key's unnamed or default value.
-    valueData       The value data.
+    valueData       The value data, or a RegistryValue object.
     valueDataType   The type of data.
 
     Return Value
@@ -358,10 +628,7 @@ def RegSetValueEx(key, valueName, valueData, valueDataType=None):
     """
     from ctypes import sizeof
     try:
-        if valueDataType is not None:
-            regvalue = RegistryValueFactory().by_type(valueDataType)(valueData)
-        else:
-            regvalue = RegistryValueFactory().by_value(valueData)
+        regvalue = get_registry_value(valueData, valueDataType)
         data, dataType = regvalue.to_byte_array(), regvalue.registry_type
         result = c_api.RegSetValueExW(key=key, name=valueName, dataType=dataType,
                                       data=data, dataLength=sizeof(data))
@@ -382,9 +649,133 @@ def RegQueryReflectionKey():
     # TODO Implement RegQueryReflectionKey
     raise NotImplementedError #pragma: no cover
 
-def RegOpenKeyTransacted():
-    #TODO Implement RegOpenKeyTransacted
-    raise NotImplementedError #pragma: no cover
+def RegOpenKeyTransacted(key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+    """ Opens the specified registry key as part of a transaction.
+
+    Parameters
+    key            A handle to an open registry key.
+    subKey         The name of the registry subkey to be opened. It is optional.
+    transaction    A handle to an active transaction, as returned by CreateTransaction.
+    samDesired     A mask that specifics the desired access rights to the key to be opened.
+
+    Return Value
+    If the function succeeds, it returns a handle to the opened key. Operations on the handle are part of the
+    transaction.
+    If the function fails, it raises the exceptions RegOpenKeyEx raises.
+    """
+    try:
+        return c_api.RegOpenKeyTransactedW(key, subKey, 0, samDesired, transaction)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.OpenKeyFailed(exception.winerror, exception.strerror)
+
+def CreateTransaction(description=None, timeout=0):
+    """ Creates a kernel transaction, for the Reg*Transacted functions.
+
+    Parameters
+    description    A description of the transaction. It is optional.
+    timeout        The number of milliseconds after which the transaction is rolled back, or 0 for no timeout.
+
+    Return Value
+    If the function succeeds, it returns a handle to the transaction, which should be closed by CloseTransaction.
+    If the function fails, a TransactionFailed exception is raised.
+    """
+    try:
+        return c_api.CreateTransaction(None, None, 0, 0, 0, timeout, description)
+    except errors.WindowsError as exception:
+        logging.exception(exception)
+        raise errors.TransactionFailed(exception.winerror, exception.strerror)
+
+def CommitTransaction(transaction):
+    """ Commits the changes made as part of the transaction.
+    If the function fails, a TransactionFailed exception is raised, and the changes are rolled back.
+    """
+    try:
+        c_api.CommitTransaction(transaction)
+    except errors.WindowsError as exception:
+        logging.exception(exception)
+        raise errors.TransactionFailed(exception.winerror, exception.strerror)
+
+def RollbackTransaction(transaction):
+    """ Rolls back the changes made as part of the transaction.
+    If the function fails, a TransactionFailed exception is raised.
+    """
+    try:
+        c_api.RollbackTransaction(transaction)
+    except errors.WindowsError as exception:
+        logging.exception(exception)
+        raise errors.TransactionFailed(exception.winerror, exception.strerror)
 
+def CloseTransaction(transaction):
+    """ Closes the handle to the transaction. A transaction that was not committed is rolled back.
+    If the function fails, a TransactionFailed exception is raised, unless:
+    The handle is invalid, and an InvalidHandleException is raised
+    """
+    try:
+        c_api.CloseHandle(transaction)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.TransactionFailed(exception.winerror, exception.strerror)
+
+def CreateEvent():
+    """ Creates an auto-reset event, for RegNotifyChangeKeyValue and WaitForMultipleObjects.
+    If the function succeeds, it returns a handle to the event, which should be closed by CloseEvent.
+    If the function fails, an EventFailed exception is raised.
+    """
+    try:
+        return c_api.CreateEventW()
+    except errors.WindowsError as exception:
+        logging.exception(exception)
+        raise errors.EventFailed(exception.winerror, exception.strerror)
+
+def SetEvent(event):
+    """ Signals the event.
+    If the function fails, an EventFailed exception is raised, unless:
+    The handle is invalid, and an InvalidHandleException is raised
+    """
+    try:
+        c_api.SetEvent(event)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.EventFailed(exception.winerror, exception.strerror)
+
+def WaitForMultipleObjects(events, timeout=None):
+    """ Waits until one of the events is signaled, and resets it.
+
+    Parameters
+    events     A list of up to MAXIMUM_WAIT_OBJECTS event handles.
+    timeout    The number of milliseconds to wait, or None to wait as long as it takes.
+
+    Return Value
+    The index of the event that was signaled, the lowest one if several were, or None if the timeout passed.
+    If the function fails, an EventFailed exception is raised, unless:
+    One of the handles is invalid, and an InvalidHandleException is raised
+    """
+    handles = (dtypes.HANDLE * len(events))(*events)
+    try:
+        result = c_api.WaitForMultipleObjects(len(events), handles, False,
+                                              constants.INFINITE if timeout is None else timeout)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.EventFailed(exception.winerror, exception.strerror)
+    if result == constants.WAIT_TIMEOUT:
+        return None
+    return result - constants.WAIT_OBJECT_0
+
+def CloseEvent(event):
+    """ Closes the handle to the event.
+    If the function fails, an EventFailed exception is raised, unless:
+    The handle is invalid, and an InvalidHandleException is raised
+    """
+    try:
+        c_api.CloseHandle(event)
+    except errors.WindowsError as exception:
+        errors.catch_and_raise_general_errors(exception)
+        logging.exception(exception)
+        raise errors.EventFailed(exception.winerror, exception.strerror)
 
 # TODO add performance/memory-leaks tests
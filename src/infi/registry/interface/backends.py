@@ -0,0 +1,205 @@
+""" Registry backends are the engines that KeyStore and ValueStore run on.
+
+A backend exposes the same functions as the interface module, with the same arguments, return values and exceptions.
+Advapi32Backend, the default, is a thin forwarder to the interface module, and thus to advapi32.dll.
+Other backends, such as the in-memory one in the memory module, can be handed to LocalComputer or RegistryComputer.
+"""
+
+from .. import constants, interface
+from ..value import RegistryValueFactory
+
+class RegistryBackend(object):
+    """ The base class for registry backends. See the interface module for the documentation of each function.
+    """
+
+    def RegCloseKey(self, key):
+        raise NotImplementedError # pragma: no cover
+
+    def RegConnectRegistry(self, machineName, key):
+        raise NotImplementedError # pragma: no cover
+
+    def RegCreateKeyEx(self, key, subKey, samDesired=constants.KEY_ALL_ACCESS):
+        raise NotImplementedError # pragma: no cover
+
+    def RegCreateKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        raise NotImplementedError # pragma: no cover
+
+    def RegDeleteKey(self, key, subKey):
+        raise NotImplementedError # pragma: no cover
+
+    def RegDeleteKeyTransacted(self, key, subKey, transaction):
+        raise NotImplementedError # pragma: no cover
+
+    def RegDeleteValue(self, key, valueName=None):
+        raise NotImplementedError # pragma: no cover
+
+    def RegEnumKeyEx(self, key, index):
+        raise NotImplementedError # pragma: no cover
+
+    def RegEnumValue(self, key, index):
+        raise NotImplementedError # pragma: no cover
+
+    def RegEnumValues(self, key):
+        raise NotImplementedError # pragma: no cover
+
+    def RegEnumValuesRaw(self, key):
+        raise NotImplementedError # pragma: no cover
+
+    def RegFlushKey(self, key):
+        raise NotImplementedError # pragma: no cover
+
+    def RegGetValue(self, key, subKey, valueName=None):
+        raise NotImplementedError # pragma: no cover
+
+    def RegNotifyChangeKeyValue(self, key, watchSubtree, notifyFilter, event):
+        raise NotImplementedError # pragma: no cover
+
+    def RegOpenKeyEx(self, key, subKey=None, samDesired=constants.KEY_ALL_ACCESS):
+        raise NotImplementedError # pragma: no cover
+
+    def RegOpenKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        raise NotImplementedError # pragma: no cover
+
+    def RegQueryInfoKey(self, key):
+        raise NotImplementedError # pragma: no cover
+
+    def RegQueryValueEx(self, key, valueName=None, default=interface.NO_DEFAULT):
+        raise NotImplementedError # pragma: no cover
+
+    def RegQueryValueInto(self, key, valueName, buffer):
+        raise NotImplementedError # pragma: no cover
+
+    def RegSetKeyValue(self, key, subKey, valueName, valueData, valueDataType=None):
+        raise NotImplementedError # pragma: no cover
+
+    def RegSetValueEx(self, key, valueName, valueData, valueDataType=None):
+        raise NotImplementedError # pragma: no cover
+
+    def CreateTransaction(self, description=None, timeout=0):
+        raise NotImplementedError # pragma: no cover
+
+    def CommitTransaction(self, transaction):
+        raise NotImplementedError # pragma: no cover
+
+    def RollbackTransaction(self, transaction):
+        raise NotImplementedError # pragma: no cover
+
+    def CloseTransaction(self, transaction):
+        raise NotImplementedError # pragma: no cover
+
+    def CreateEvent(self):
+        raise NotImplementedError # pragma: no cover
+
+    def SetEvent(self, event):
+        raise NotImplementedError # pragma: no cover
+
+    def WaitForMultipleObjects(self, events, timeout=None):
+        raise NotImplementedError # pragma: no cover
+
+    def CloseEvent(self, event):
+        raise NotImplementedError # pragma: no cover
+
+class Advapi32Backend(RegistryBackend):
+    """ The default backend, which calls the Windows Registry through the interface module.
+    The functions are looked up on every call, so patching the interface module affects this backend as well.
+    binary_type is how the binary values that are read are represented, see RegistryValueFactory.
+    """
+
+    def __init__(self, binary_type=tuple):
+        self._value_factory = RegistryValueFactory(binary_type)
+
+    def RegCloseKey(self, key):
+        return interface.RegCloseKey(key)
+
+    def RegConnectRegistry(self, machineName, key):
+        return interface.RegConnectRegistry(machineName, key)
+
+    def RegCreateKeyEx(self, key, subKey, samDesired=constants.KEY_ALL_ACCESS):
+        return interface.RegCreateKeyEx(key, subKey, samDesired)
+
+    def RegCreateKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        return interface.RegCreateKeyTransacted(key, subKey, transaction, samDesired)
+
+    def RegDeleteKey(self, key, subKey):
+        return interface.RegDeleteKey(key, subKey)
+
+    def RegDeleteKeyTransacted(self, key, subKey, transaction):
+        return interface.RegDeleteKeyTransacted(key, subKey, transaction)
+
+    def RegDeleteValue(self, key, valueName=None):
+        return interface.RegDeleteValue(key, valueName)
+
+    def RegEnumKeyEx(self, key, index):
+        return interface.RegEnumKeyEx(key, index)
+
+    def RegEnumValue(self, key, index):
+        return interface.RegEnumValue(key, index, self._value_factory)
+
+    def RegEnumValues(self, key):
+        return interface.RegEnumValues(key, self._value_factory)
+
+    def RegEnumValuesRaw(self, key):
+        return interface.RegEnumValuesRaw(key)
+
+    def RegFlushKey(self, key):
+        return interface.RegFlushKey(key)
+
+    def RegGetValue(self, key, subKey, valueName=None):
+        return interface.RegGetValue(key, subKey, valueName, self._value_factory)
+
+    def RegNotifyChangeKeyValue(self, key, watchSubtree, notifyFilter, event):
+        return interface.RegNotifyChangeKeyValue(key, watchSubtree, notifyFilter, event)
+
+    def RegOpenKeyEx(self, key, subKey=None, samDesired=constants.KEY_ALL_ACCESS):
+        return interface.RegOpenKeyEx(key, subKey, samDesired)
+
+    def RegOpenKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        return interface.RegOpenKeyTransacted(key, subKey, transaction, samDesired)
+
+    def RegQueryInfoKey(self, key):
+        return interface.RegQueryInfoKey(key)
+
+    def RegQueryValueEx(self, key, valueName=None, default=interface.NO_DEFAULT):
+        return interface.RegQueryValueEx(key, valueName, default, self._value_factory)
+
+    def RegQueryValueInto(self, key, valueName, buffer):
+        return interface.RegQueryValueInto(key, valueName, buffer)
+
+    def RegSetKeyValue(self, key, subKey, valueName, valueData, valueDataType=None):
+        return interface.RegSetKeyValue(key, subKey, valueName, valueData, valueDataType)
+
+    def RegSetValueEx(self, key, valueName, valueData, valueDataType=None):
+        return interface.RegSetValueEx(key, valueName, valueData, valueDataType)
+
+    def CreateTransaction(self, description=None, timeout=0):
+        return interface.CreateTransaction(description, timeout)
+
+    def CommitTransaction(self, transaction):
+        return interface.CommitTransaction(transaction)
+
+    def RollbackTransaction(self, transaction):
+        return interface.RollbackTransaction(transaction)
+
+    def CloseTransaction(self, transaction):
+        return interface.CloseTransaction(transaction)
+
+    def CreateEvent(self):
+        return interface.CreateEvent()
+
+    def SetEvent(self, event):
+        return interface.SetEvent(event)
+
+    def WaitForMultipleObjects(self, events, timeout=None):
+        return interface.WaitForMultipleObjects(events, timeout)
+
+    def CloseEvent(self, event):
+        return interface.CloseEvent(event)
+
+_DEFAULT_BACKEND = Advapi32Backend()
+
+def get_default_backend():
+    """ Returns the backend that is used when none is passed to LocalComputer or RegistryComputer
+    """
+    return _DEFAULT_BACKEND
+
+__all__ = ('RegistryBackend', 'Advapi32Backend', 'get_default_backend')
@@ -0,0 +1,230 @@
+""" A backend that puts deadlines on the calls of another backend.
+
+A call to an unreachable computer blocks until the RPC layer gives up on it, which can take a long time.
+DeadlineBackend runs the calls on worker threads, and the caller waits for them until the deadline passes,
+and then gets TimeoutException, which is also a TimeoutError.
+A worker that is stuck in a late call is replaced by a new one, and when the late call returns,
+the handle it opened, if any, is closed.
+"""
+
+import contextlib
+import threading
+import time
+from six.moves import queue
+from .. import constants, errors
+from . import NO_DEFAULT
+from .backends import RegistryBackend, get_default_backend
+
+_clock = getattr(time, 'monotonic', time.time)
+
+class _Call(object):
+    __slots__ = ('function', 'args', 'closer', 'done', 'lock', 'started', 'abandoned', 'result', 'error')
+
+    def __init__(self, function, args, closer):
+        self.function = function
+        self.args = args
+        self.closer = closer
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.started = False
+        self.abandoned = False
+        self.result = None
+        self.error = None
+
+class DeadlineBackend(RegistryBackend):
+    """ Wraps a backend, the default one if none is passed, and limits how long its calls may take.
+    Every call may take up to timeout seconds, or up to the deadline set by the deadline context manager;
+    If both are None, the calls are made directly on the calling thread.
+    At most max_workers calls run at the same time, not counting calls that passed their deadline.
+    """
+
+    def __init__(self, backend=None, timeout=None, max_workers=4):
+        self._backend = backend if backend is not None else get_default_backend()
+        self._timeout = timeout
+        self._max_workers = max_workers
+        self._calls = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._local = threading.local()
+        self.timeouts = 0
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """ All the calls made by this thread inside the block must finish within seconds from now.
+        Nested blocks cannot extend the deadline of the blocks around them.
+        """
+        previous = getattr(self._local, 'deadline', None)
+        deadline = _clock() + seconds
+        self._local.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def close(self):
+        """ Stops the idle workers. The workers that are stuck in late calls stop once the calls return.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, 0
+        for _ in range(workers):
+            self._calls.put(None)
+
+    def _get_timeout(self):
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is None:
+            return self._timeout
+        timeout = deadline - _clock()
+        return timeout if self._timeout is None else min(timeout, self._timeout)
+
+    def _start_workers(self):
+        with self._lock:
+            while self._workers < self._max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._workers += 1
+
+    def _work(self):
+        while True:
+            call = self._calls.get()
+            if call is None:
+                return
+            with call.lock:
+                if call.abandoned:
+                    continue
+                call.started = True
+            try:
+                call.result = call.function(*call.args)
+            except Exception as error:
+                call.error = error
+            with call.lock:
+                call.done.set()
+                abandoned = call.abandoned
+            if abandoned:
+                # the caller gave up on this call, and a new worker took the place of this one
+                if call.closer is not None and call.error is None:
+                    call.closer(call.result)
+                return
+
+    def _call(self, function, args, closer=None):
+        timeout = self._get_timeout()
+        if timeout is None:
+            return function(*args)
+        call = _Call(function, args, closer)
+        if timeout > 0:
+            self._start_workers()
+            self._calls.put(call)
+            call.done.wait(timeout)
+        with call.lock:
+            if not call.done.is_set():
+                call.abandoned = True
+        if call.abandoned:
+            self.timeouts += 1
+            if call.started:
+                with self._lock:
+                    self._workers -= 1
+            raise errors.TimeoutException(constants.ERROR_TIMEOUT, 'The call did not finish before its deadline')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _enum_values(self, key):
+        return list(self._backend.RegEnumValues(key))
+
+    def _enum_values_raw(self, key):
+        return list(self._backend.RegEnumValuesRaw(key))
+
+    def RegCloseKey(self, key):
+        return self._call(self._backend.RegCloseKey, (key,))
+
+    def RegConnectRegistry(self, machineName, key):
+        return self._call(self._backend.RegConnectRegistry, (machineName, key), self._backend.RegCloseKey)
+
+    def RegCreateKeyEx(self, key, subKey, samDesired=constants.KEY_ALL_ACCESS):
+        return self._call(self._backend.RegCreateKeyEx, (key, subKey, samDesired), self._backend.RegCloseKey)
+
+    def RegCreateKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        return self._call(self._backend.RegCreateKeyTransacted, (key, subKey, transaction, samDesired),
+                          self._backend.RegCloseKey)
+
+    def RegDeleteKey(self, key, subKey):
+        return self._call(self._backend.RegDeleteKey, (key, subKey))
+
+    def RegDeleteKeyTransacted(self, key, subKey, transaction):
+        return self._call(self._backend.RegDeleteKeyTransacted, (key, subKey, transaction))
+
+    def RegDeleteValue(self, key, valueName=None):
+        return self._call(self._backend.RegDeleteValue, (key, valueName))
+
+    def RegEnumKeyEx(self, key, index):
+        return self._call(self._backend.RegEnumKeyEx, (key, index))
+
+    def RegEnumValue(self, key, index):
+        return self._call(self._backend.RegEnumValue, (key, index))
+
+    def RegEnumValues(self, key):
+        # the values are read by a single call, so the whole enumeration is under the deadline
+        return iter(self._call(self._enum_values, (key,)))
+
+    def RegEnumValuesRaw(self, key):
+        return iter(self._call(self._enum_values_raw, (key,)))
+
+    def RegFlushKey(self, key):
+        return self._call(self._backend.RegFlushKey, (key,))
+
+    def RegGetValue(self, key, subKey, valueName=None):
+        return self._call(self._backend.RegGetValue, (key, subKey, valueName))
+
+    def RegNotifyChangeKeyValue(self, key, watchSubtree, notifyFilter, event):
+        # the notification ends with the thread that asked for it, so it cannot be asked for by a worker
+        return self._backend.RegNotifyChangeKeyValue(key, watchSubtree, notifyFilter, event)
+
+    def RegOpenKeyEx(self, key, subKey=None, samDesired=constants.KEY_ALL_ACCESS):
+        return self._call(self._backend.RegOpenKeyEx, (key, subKey, samDesired), self._backend.RegCloseKey)
+
+    def RegOpenKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        return self._call(self._backend.RegOpenKeyTransacted, (key, subKey, transaction, samDesired),
+                          self._backend.RegCloseKey)
+
+    def RegQueryInfoKey(self, key):
+        return self._call(self._backend.RegQueryInfoKey, (key,))
+
+    def RegQueryValueEx(self, key, valueName=None, default=NO_DEFAULT):
+        return self._call(self._backend.RegQueryValueEx, (key, valueName, default))
+
+    def RegQueryValueInto(self, key, valueName, buffer):
+        # a late call still fills the buffer, after the caller got TimeoutException
+        return self._call(self._backend.RegQueryValueInto, (key, valueName, buffer))
+
+    def RegSetKeyValue(self, key, subKey, valueName, valueData, valueDataType=None):
+        return self._call(self._backend.RegSetKeyValue, (key, subKey, valueName, valueData, valueDataType))
+
+    def RegSetValueEx(self, key, valueName, valueData, valueDataType=None):
+        return self._call(self._backend.RegSetValueEx, (key, valueName, valueData, valueDataType))
+
+    def CreateTransaction(self, description=None, timeout=0):
+        return self._call(self._backend.CreateTransaction, (description, timeout), self._backend.CloseTransaction)
+
+    def CommitTransaction(self, transaction):
+        return self._call(self._backend.CommitTransaction, (transaction,))
+
+    def RollbackTransaction(self, transaction):
+        return self._call(self._backend.RollbackTransaction, (transaction,))
+
+    def CloseTransaction(self, transaction):
+        return self._call(self._backend.CloseTransaction, (transaction,))
+
+    def CreateEvent(self):
+        return self._call(self._backend.CreateEvent, (), self._backend.CloseEvent)
+
+    def SetEvent(self, event):
+        return self._call(self._backend.SetEvent, (event,))
+
+    def WaitForMultipleObjects(self, events, timeout=None):
+        # waiting is what the caller asked for, so it is not limited by the deadline
+        return self._backend.WaitForMultipleObjects(events, timeout)
+
+    def CloseEvent(self, event):
+        return self._call(self._backend.CloseEvent, (event,))
+
+__all__ = ('DeadlineBackend',)
@@ -0,0 +1,597 @@
+""" A pure-Python, thread-safe registry backend that keeps its keys and values in memory.
+
+It behaves like the interface module does on Windows, including the exceptions it raises,
+so the KeyStore and ValueStore code paths can be exercised, benchmarked and load-tested on any platform:
+>>> backend = InMemoryBackend()
+>>> backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\\Vendor', {'Version': u'1.0'})
+>>> LocalComputer(backend=backend).local_machine[r'SOFTWARE\\Vendor'].values_store['Version']
+
+Every remote computer name gets its own set of hives, created when it is first connected to.
+
+Change notifications are simulated as well: the events passed to RegNotifyChangeKeyValue are signaled
+by the changes made through the backend, including populate, and by the commits of transactions.
+
+Transactions are simulated: a transaction works on private copies of the keys it touches, and of their parents,
+so only its own transacted handles see its changes, and its changes are replayed on the hives when it is committed.
+The isolation is weaker than that of kernel transactions: a key is copied when the transaction first reaches it,
+so the transaction sees the changes made outside of it to the keys it has not reached yet, and does not see the
+ones made after it reached them. Conflicting changes are not detected either, and the last one to be written wins.
+"""
+
+import threading
+import time
+from ctypes import addressof, memmove, sizeof, string_at
+from .. import constants, errors, dtypes
+from .backends import RegistryBackend
+from ..value import RegistryValueFactory
+from . import NO_DEFAULT, check_predefined_key, get_registry_value, get_writable_byte_array
+
+PREDEFINED_KEYS = (constants.HKEY_CLASSES_ROOT, constants.HKEY_CURRENT_CONFIG, constants.HKEY_CURRENT_USER,
+                   constants.HKEY_LOCAL_MACHINE, constants.HKEY_USERS)
+
+def _normalize(name):
+    return name.lower()
+
+def _split_path(path):
+    if not path:
+        return []
+    return [item for item in path.split('\\') if item]
+
+def _normalize_machine_name(machineName):
+    if machineName is None:
+        return None
+    return _normalize(machineName.lstrip('\\'))
+
+class MemoryKey(object):
+    """ A node in the in-memory registry tree.
+    Subkeys and values are looked up case-insensitively, but keep the case they were created with.
+    """
+    __slots__ = ('name', 'parent', 'deleted', 'allowed_sam', '_subkeys', '_values', '_sorted_subkeys',
+                 '_value_names')
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.deleted = False
+        self.allowed_sam = None
+        self._subkeys = {}
+        self._values = {}
+        self._sorted_subkeys = None
+        self._value_names = None
+
+    def get_subkey(self, name):
+        return self._subkeys.get(_normalize(name))
+
+    def add_subkey(self, name):
+        subkey = self.get_subkey(name)
+        if subkey is None:
+            subkey = self._subkeys[_normalize(name)] = MemoryKey(name, self)
+            self._sorted_subkeys = None
+        return subkey
+
+    def remove_subkey(self, name):
+        subkey = self._subkeys.pop(_normalize(name))
+        self._sorted_subkeys = None
+        return subkey
+
+    def subkey_count(self):
+        return len(self._subkeys)
+
+    def sorted_subkeys(self):
+        # like the registry, subkeys are enumerated in case-insensitive alphabetical order
+        if self._sorted_subkeys is None:
+            self._sorted_subkeys = [self._subkeys[name] for name in sorted(self._subkeys)]
+        return self._sorted_subkeys
+
+    def get_value(self, name):
+        return self._values.get(_normalize(name))
+
+    def set_value(self, name, data_type, data):
+        normalized_name = _normalize(name)
+        if normalized_name not in self._values:
+            self._value_names = None
+        self._values[normalized_name] = (name, data_type, data)
+
+    def remove_value(self, name):
+        self._values.pop(_normalize(name))
+        self._value_names = None
+
+    def value_count(self):
+        return len(self._values)
+
+    def value_by_index(self, index):
+        # like the registry, values are enumerated in the order they were created
+        if self._value_names is None:
+            self._value_names = list(self._values)
+        return self._values[self._value_names[index]]
+
+    def iter_values(self):
+        return iter(self._values.values())
+
+    def get_path(self):
+        """ Returns the root of the tree of the key, and the names of the keys from the root to it
+        """
+        names, node = [], self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return node, names[::-1]
+
+    def clone(self, parent=None):
+        """ Returns a copy of the key, whose subkeys are shared with the key until they are copied by own_subkey
+        """
+        copy = MemoryKey(self.name, parent)
+        copy.allowed_sam = self.allowed_sam
+        copy._values = dict(self._values)
+        copy._subkeys = dict(self._subkeys)
+        return copy
+
+    def own_subkey(self, name):
+        """ Returns the subkey, or None if there is none. If the subkey is shared with the key that this one
+        is a copy of, it is copied first, so it can be changed without changing the other tree.
+        """
+        subkey = self.get_subkey(name)
+        if subkey is not None and subkey.parent is not self:
+            subkey = self._subkeys[_normalize(name)] = subkey.clone(self)
+            self._sorted_subkeys = None
+        return subkey
+
+class MemoryHandle(object):
+    __slots__ = ('key', 'sam', 'transaction')
+
+    def __init__(self, key, sam, transaction=None):
+        self.key = key
+        self.sam = sam
+        self.transaction = transaction
+
+class MemoryNotification(object):
+    __slots__ = ('key', 'subtree', 'filter', 'event', 'handle')
+
+    def __init__(self, key, subtree, filter, event, handle):
+        self.key = key
+        self.subtree = subtree
+        self.filter = filter
+        self.event = event
+        self.handle = handle
+
+class MemoryTransaction(object):
+    """ A simulated transaction: the private copies of the hives it touched, and the log of its changes.
+    Only the keys that the transaction reaches are copied, along with the keys on their paths from the root,
+    and the rest of the copy is shared with the hive, so the transaction sees the changes made to it meanwhile.
+    """
+    __slots__ = ('active', 'copies', 'roots', 'log')
+
+    def __init__(self):
+        self.active = True
+        self.copies = {}
+        self.roots = {}
+        self.log = []
+
+    def get_key(self, key):
+        """ Returns the copy of the key, copying it, and the keys on its path, when the transaction first touches it
+        """
+        root, names = key.get_path()
+        if id(root) in self.roots:
+            return key
+        if id(root) not in self.copies:
+            copy = self.copies[id(root)] = root.clone()
+            self.roots[id(copy)] = root
+        key = self.copies[id(root)]
+        for name in names:
+            key = key.own_subkey(name)
+            if key is None:
+                raise KeyError(name)
+        return key
+
+    def record(self, key, operation, *args):
+        root, names = key.get_path()
+        self.log.append((self.roots[id(root)], names, operation, args))
+
+class InMemoryBackend(RegistryBackend):
+    """ A registry backend that keeps a tree of MemoryKey objects per computer and predefined key.
+    All the functions are serialized by a single lock, so the backend can be shared between threads.
+    binary_type is how the binary values that are read are represented, see RegistryValueFactory.
+    """
+
+    def __init__(self, binary_type=tuple):
+        self._value_factory = RegistryValueFactory(binary_type)
+        self._lock = threading.RLock()
+        self._roots = {}
+        self._handles = {}
+        self._transactions = {}
+        self._events = {}
+        self._event_signaled = threading.Condition(self._lock)
+        self._notifications = []
+        self._next_handle = 4
+
+    @property
+    def open_handles(self):
+        """ The number of handles that were opened and not closed yet
+        """
+        return len(self._handles)
+
+    def _get_root(self, machineName, key):
+        root_key = (_normalize_machine_name(machineName), key)
+        if root_key not in self._roots:
+            self._roots[root_key] = MemoryKey(u'')
+        return self._roots[root_key]
+
+    def _new_handle(self, key, sam, transaction=None):
+        handle = self._next_handle
+        self._next_handle += 4
+        self._handles[handle] = MemoryHandle(key, sam, transaction)
+        return handle
+
+    def _get_handle(self, key, access=0):
+        if key in PREDEFINED_KEYS:
+            handle = MemoryHandle(self._get_root(None, key), constants.KEY_ALL_ACCESS)
+        else:
+            handle = self._handles.get(key)
+        if handle is None:
+            raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+        if handle.key.deleted:
+            raise errors.RegistryBaseException(constants.ERROR_KEY_DELETED, 'Illegal operation on a deleted key')
+        if handle.transaction is not None and not handle.transaction.active:
+            raise errors.TransactionFailed(constants.ERROR_TRANSACTION_NOT_ACTIVE, 'The transaction is not active')
+        if handle.sam & access != access:
+            raise errors.AccessDeniedException(constants.ERROR_ACCESS_DENIED)
+        return handle
+
+    def _find_key(self, key, subKey):
+        # subkeys are only shared by the copies of transactions, which must not reach the keys of the hive
+        for name in _split_path(subKey):
+            key = key.own_subkey(name)
+            if key is None:
+                raise KeyError(subKey)
+        return key
+
+    def _to_data(self, regvalue):
+        byte_array = regvalue.to_byte_array()
+        return string_at(addressof(byte_array), sizeof(byte_array))
+
+    def _to_registry_value(self, data_type, data):
+        byte_array = (dtypes.BYTE * len(data)).from_buffer_copy(data)
+        return self._value_factory.by_type(data_type)(byte_array)
+
+    def populate(self, key, path, values=None, machineName=None):
+        """ Creates the path, with all of its intermediate keys, under the predefined key of the given computer,
+        and sets the values in it. The values can be RegistryValue instances or Python objects.
+        This is a shortcut for setting up registry trees without going through handles.
+        """
+        with self._lock:
+            node = self._add_path(self._get_root(machineName, key), _split_path(path))
+            for name, value in (values or {}).items():
+                value = get_registry_value(value)
+                self._set_value(node, name, value.registry_type, self._to_data(value))
+
+    def restrict(self, key, path, allowed_sam, machineName=None):
+        """ Makes opening the existing key in path with more access rights than allowed_sam fail with
+        AccessDeniedException, as if its security descriptor denied them. Pass None to lift the restriction.
+        """
+        with self._lock:
+            self._find_key(self._get_root(machineName, key), path).allowed_sam = allowed_sam
+
+    def _new_handle_with_access(self, key, sam, transaction=None):
+        if key.allowed_sam is not None and sam & ~key.allowed_sam:
+            raise errors.AccessDeniedException(constants.ERROR_ACCESS_DENIED)
+        return self._new_handle(key, sam, transaction)
+
+    def _get_transaction(self, transaction):
+        state = self._transactions.get(transaction)
+        if state is None:
+            raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+        return state
+
+    def _get_transacted_handle(self, key, transaction, access=0):
+        state = self._get_transaction(transaction)
+        if not state.active:
+            raise errors.TransactionFailed(constants.ERROR_TRANSACTION_NOT_ACTIVE, 'The transaction is not active')
+        handle = self._get_handle(key, access)
+        return MemoryHandle(state.get_key(handle.key), handle.sam, state)
+
+    def _record(self, handle, key, operation, *args):
+        if handle.transaction is not None:
+            handle.transaction.record(key, operation, *args)
+
+    def _signal(self, event):
+        self._events[event] = True
+        self._event_signaled.notify_all()
+
+    def _notify(self, key, notify_filter, deleted=False):
+        """ Signals the notifications that the change to the key matches, and ends them
+        """
+        ancestors = set()
+        node = key.parent
+        while node is not None:
+            ancestors.add(id(node))
+            node = node.parent
+        remaining = []
+        for notification in self._notifications:
+            if notification.key is key:
+                matches = deleted or notification.filter & notify_filter
+            else:
+                matches = notification.subtree and id(notification.key) in ancestors and \
+                    notification.filter & notify_filter
+            if matches and notification.event in self._events:
+                self._signal(notification.event)
+            else:
+                remaining.append(notification)
+        self._notifications = remaining
+
+    def _add_path(self, node, names, notify=True):
+        for name in names:
+            subkey = node.own_subkey(name)
+            if subkey is None:
+                subkey = node.add_subkey(name)
+                if notify:
+                    self._notify(node, constants.REG_NOTIFY_CHANGE_NAME)
+            node = subkey
+        return node
+
+    def _remove_subkey(self, parent, subkey, notify=True):
+        parent.remove_subkey(subkey.name)
+        subkey.deleted = True
+        if notify:
+            self._notify(parent, constants.REG_NOTIFY_CHANGE_NAME)
+            self._notify(subkey, constants.REG_NOTIFY_CHANGE_NAME, deleted=True)
+
+    def _set_value(self, node, name, data_type, data, notify=True):
+        node.set_value(name, data_type, data)
+        if notify:
+            self._notify(node, constants.REG_NOTIFY_CHANGE_LAST_SET)
+
+    def _remove_value(self, node, name, notify=True):
+        node.remove_value(name)
+        if notify:
+            self._notify(node, constants.REG_NOTIFY_CHANGE_LAST_SET)
+
+    def _create_key(self, handle, subKey, samDesired):
+        node = self._add_path(handle.key, _split_path(subKey), handle.transaction is None)
+        self._record(handle, node, 'create')
+        return self._new_handle_with_access(node, samDesired, handle.transaction)
+
+    def _delete_key(self, handle, subKey):
+        names = _split_path(subKey)
+        if not names:
+            raise errors.InvalidParameterException(constants.ERROR_INVALID_PARAMETER)
+        parent = self._find_key(handle.key, '\\'.join(names[:-1]))
+        subkey = parent.own_subkey(names[-1])
+        if subkey is None:
+            raise KeyError(subKey)
+        if subkey.subkey_count():
+            raise errors.AccessDeniedException(constants.ERROR_ACCESS_DENIED)
+        self._record(handle, subkey, 'delete')
+        self._remove_subkey(parent, subkey, handle.transaction is None)
+
+    def _replay(self, root, names, operation, args):
+        if operation == 'delete':
+            parent = root
+            for name in names[:-1]:
+                parent = parent.get_subkey(name)
+                if parent is None:
+                    return
+            subkey = parent.get_subkey(names[-1])
+            if subkey is not None and not subkey.subkey_count():
+                self._remove_subkey(parent, subkey)
+            return
+        node = self._add_path(root, names)
+        if operation == 'set_value':
+            self._set_value(node, *args)
+        elif operation == 'delete_value' and node.get_value(args[0]) is not None:
+            self._remove_value(node, args[0])
+
+    def RegCloseKey(self, key):
+        with self._lock:
+            if key in PREDEFINED_KEYS:
+                return None
+            if self._handles.pop(key, None) is None:
+                raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+            # closing the handle ends its notifications, and signals them
+            for notification in [item for item in self._notifications if item.handle == key]:
+                self._notifications.remove(notification)
+                if notification.event in self._events:
+                    self._signal(notification.event)
+
+    def RegConnectRegistry(self, machineName, key):
+        check_predefined_key(machineName, key)
+        with self._lock:
+            return self._new_handle(self._get_root(machineName, key), constants.KEY_ALL_ACCESS)
+
+    def RegCreateKeyEx(self, key, subKey, samDesired=constants.KEY_ALL_ACCESS):
+        with self._lock:
+            return self._create_key(self._get_handle(key, constants.KEY_CREATE_SUB_KEY), subKey, samDesired)
+
+    def RegCreateKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        with self._lock:
+            handle = self._get_transacted_handle(key, transaction, constants.KEY_CREATE_SUB_KEY)
+            return self._create_key(handle, subKey, samDesired)
+
+    def RegDeleteKey(self, key, subKey):
+        if subKey is None:
+            raise errors.InvalidParameterException(constants.ERROR_INVALID_PARAMETER)
+        with self._lock:
+            self._delete_key(self._get_handle(key), subKey)
+
+    def RegDeleteKeyTransacted(self, key, subKey, transaction):
+        if subKey is None:
+            raise errors.InvalidParameterException(constants.ERROR_INVALID_PARAMETER)
+        with self._lock:
+            self._delete_key(self._get_transacted_handle(key, transaction), subKey)
+
+    def RegDeleteValue(self, key, valueName=None):
+        with self._lock:
+            handle = self._get_handle(key, constants.KEY_SET_VALUE)
+            if handle.key.get_value(valueName or u'') is None:
+                raise KeyError(valueName)
+            self._remove_value(handle.key, valueName or u'', handle.transaction is None)
+            self._record(handle, handle.key, 'delete_value', valueName or u'')
+
+    def RegEnumKeyEx(self, key, index):
+        with self._lock:
+            subkeys = self._get_handle(key, constants.KEY_ENUMERATE_SUB_KEYS).key.sorted_subkeys()
+            if index < 0 or index >= len(subkeys):
+                raise IndexError(index)
+            return subkeys[index].name
+
+    def RegEnumValue(self, key, index):
+        with self._lock:
+            node = self._get_handle(key, constants.KEY_QUERY_VALUE).key
+            if index < 0 or index >= node.value_count():
+                raise IndexError(index)
+            name, data_type, data = node.value_by_index(index)
+        return name, self._to_registry_value(data_type, data)
+
+    def RegEnumValues(self, key):
+        with self._lock:
+            values = list(self._get_handle(key, constants.KEY_QUERY_VALUE).key.iter_values())
+        for name, data_type, data in values:
+            yield name, self._to_registry_value(data_type, data)
+
+    def RegEnumValuesRaw(self, key):
+        with self._lock:
+            values = list(self._get_handle(key, constants.KEY_QUERY_VALUE).key.iter_values())
+        return iter(values)
+
+    def RegFlushKey(self, key):
+        with self._lock:
+            self._get_handle(key)
+
+    def RegGetValue(self, key, subKey, valueName=None):
+        with self._lock:
+            node = self._find_key(self._get_handle(key, constants.KEY_QUERY_VALUE).key, subKey)
+            value = node.get_value(valueName or u'')
+            if value is None:
+                raise KeyError(valueName)
+        name, data_type, data = value
+        return self._to_registry_value(data_type, data)
+
+    def RegNotifyChangeKeyValue(self, key, watchSubtree, notifyFilter, event):
+        with self._lock:
+            handle = self._get_handle(key, constants.KEY_NOTIFY)
+            if event not in self._events:
+                raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+            self._notifications.append(MemoryNotification(handle.key, watchSubtree, notifyFilter, event, key))
+
+    def RegOpenKeyEx(self, key, subKey=None, samDesired=constants.KEY_ALL_ACCESS):
+        with self._lock:
+            handle = self._get_handle(key)
+            node = self._find_key(handle.key, subKey)
+            return self._new_handle_with_access(node, samDesired, handle.transaction)
+
+    def RegOpenKeyTransacted(self, key, subKey, transaction, samDesired=constants.KEY_ALL_ACCESS):
+        with self._lock:
+            node = self._find_key(self._get_transacted_handle(key, transaction).key, subKey)
+            return self._new_handle_with_access(node, samDesired, self._transactions[transaction])
+
+    def RegQueryInfoKey(self, key):
+        with self._lock:
+            node = self._get_handle(key, constants.KEY_QUERY_VALUE).key
+            subkeys = node.sorted_subkeys()
+            max_subkey_length = max([len(subkey.name) for subkey in subkeys] or [0])
+            max_value_name_length, max_value_length = 0, 0
+            for name, data_type, data in node.iter_values():
+                max_value_name_length = max(max_value_name_length, len(name))
+                max_value_length = max(max_value_length, len(data))
+            return (len(subkeys), max_subkey_length, 0, node.value_count(), max_value_name_length, max_value_length)
+
+    def RegQueryValueEx(self, key, valueName=None, default=NO_DEFAULT):
+        with self._lock:
+            value = self._get_handle(key, constants.KEY_QUERY_VALUE).key.get_value(valueName or u'')
+            if value is None:
+                if default is not NO_DEFAULT:
+                    return default
+                raise KeyError(valueName)
+        name, data_type, data = value
+        return self._to_registry_value(data_type, data)
+
+    def RegQueryValueInto(self, key, valueName, buffer):
+        data = get_writable_byte_array(buffer)
+        with self._lock:
+            value = self._get_handle(key, constants.KEY_QUERY_VALUE).key.get_value(valueName or u'')
+            if value is None:
+                raise KeyError(valueName)
+        name, data_type, value_data = value
+        if len(value_data) > len(data):
+            raise errors.BufferTooSmallException(len(value_data), len(data))
+        memmove(data, value_data, len(value_data))
+        return data_type, len(value_data)
+
+    def RegSetKeyValue(self, key, subKey, valueName, valueData, valueDataType=None):
+        regvalue = get_registry_value(valueData, valueDataType)
+        data = self._to_data(regvalue)
+        with self._lock:
+            handle = self._get_handle(key, constants.KEY_SET_VALUE)
+            node = self._add_path(handle.key, _split_path(subKey), handle.transaction is None)
+            self._set_value(node, valueName or u'', regvalue.registry_type, data, handle.transaction is None)
+            self._record(handle, node, 'set_value', valueName or u'', regvalue.registry_type, data)
+
+    def RegSetValueEx(self, key, valueName, valueData, valueDataType=None):
+        regvalue = get_registry_value(valueData, valueDataType)
+        data = self._to_data(regvalue)
+        with self._lock:
+            handle = self._get_handle(key, constants.KEY_SET_VALUE)
+            self._set_value(handle.key, valueName or u'', regvalue.registry_type, data, handle.transaction is None)
+            self._record(handle, handle.key, 'set_value', valueName or u'', regvalue.registry_type, data)
+
+    def CreateTransaction(self, description=None, timeout=0):
+        with self._lock:
+            transaction = self._next_handle
+            self._next_handle += 4
+            self._transactions[transaction] = MemoryTransaction()
+            return transaction
+
+    def CommitTransaction(self, transaction):
+        with self._lock:
+            state = self._get_transaction(transaction)
+            if not state.active:
+                raise errors.TransactionFailed(constants.ERROR_TRANSACTION_NOT_ACTIVE, 'The transaction is not active')
+            for root, names, operation, args in state.log:
+                self._replay(root, names, operation, args)
+            state.active = False
+
+    def RollbackTransaction(self, transaction):
+        with self._lock:
+            state = self._get_transaction(transaction)
+            if not state.active:
+                raise errors.TransactionFailed(constants.ERROR_TRANSACTION_NOT_ACTIVE, 'The transaction is not active')
+            state.active = False
+
+    def CloseTransaction(self, transaction):
+        with self._lock:
+            self._get_transaction(transaction)
+            self._transactions.pop(transaction).active = False
+
+    def CreateEvent(self):
+        with self._lock:
+            event = self._next_handle
+            self._next_handle += 4
+            self._events[event] = False
+            return event
+
+    def SetEvent(self, event):
+        with self._lock:
+            if event not in self._events:
+                raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+            self._signal(event)
+
+    def WaitForMultipleObjects(self, events, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout / 1000.0
+        with self._lock:
+            while True:
+                for index, event in enumerate(events):
+                    if event not in self._events:
+                        raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+                    if self._events[event]:
+                        self._events[event] = False
+                        return index
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._event_signaled.wait(remaining)
+
+    def CloseEvent(self, event):
+        with self._lock:
+            if self._events.pop(event, None) is None:
+                raise errors.InvalidHandleException(constants.ERROR_INVALID_HANDLE)
+
+__all__ = ('InMemoryBackend', 'MemoryKey', 'MemoryTransaction')
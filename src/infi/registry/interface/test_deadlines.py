@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+import mock
+from .. import LocalComputer, constants, errors, interface
+from .backends import Advapi32Backend
+from .deadlines import DeadlineBackend
+from .memory import InMemoryBackend
+
+class DeadlineBackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.late_calls = 0
+        self.closed = []
+        self.backend = DeadlineBackend(Advapi32Backend(), timeout=0.05, max_workers=2)
+        patches = dict(RegConnectRegistry=mock.Mock(return_value=100), RegOpenKeyEx=mock.Mock(side_effect=self._open),
+                       RegQueryInfoKey=mock.Mock(return_value=(0, 0, 0, 0, 0, 0)),
+                       RegCloseKey=mock.Mock(side_effect=self.closed.append))
+        self.patcher = mock.patch.multiple(interface, **patches)
+        self.patcher.start()
+
+    def tearDown(self):
+        self._wait_for_late_calls()
+        self.patcher.stop()
+        self.backend.close()
+
+    def _open(self, key, subKey=None, samDesired=constants.KEY_ALL_ACCESS):
+        if subKey == 'Unreachable':
+            self.late_calls += 1
+            self.release.wait()
+        return 200
+
+    def _wait_for_late_calls(self):
+        self.release.set()
+        for _ in range(100):
+            if len(self.closed) >= self.late_calls:
+                break
+            time.sleep(0.01)
+
+    def test_calls_within_the_deadline(self):
+        self.assertEqual(100, self.backend.RegConnectRegistry(None, constants.HKEY_LOCAL_MACHINE))
+        self.assertEqual(200, self.backend.RegOpenKeyEx(100, 'Reachable'))
+        self.assertEqual(0, self.backend.timeouts)
+
+    def test_timeout_closes_the_late_handle(self):
+        start = time.time()
+        self.assertRaises(errors.TimeoutException, self.backend.RegOpenKeyEx, 100, 'Unreachable')
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual([], self.closed)
+        self._wait_for_late_calls()
+        self.assertEqual([200], self.closed)
+
+    def test_timeout_error(self):
+        try:
+            self.backend.RegOpenKeyEx(100, 'Unreachable')
+        except TimeoutError as error:
+            self.assertEqual(constants.ERROR_TIMEOUT, error.errno)
+        else:
+            self.fail('TimeoutError was not raised')
+
+    def test_stuck_workers_are_replaced(self):
+        for _ in range(3):
+            self.assertRaises(errors.TimeoutException, self.backend.RegOpenKeyEx, 100, 'Unreachable')
+        self.assertEqual(200, self.backend.RegOpenKeyEx(100, 'Reachable'))
+        self.assertEqual(3, self.backend.timeouts)
+
+    def test_deadline_spans_calls(self):
+        backend = DeadlineBackend(Advapi32Backend())
+        self.assertEqual(200, backend.RegOpenKeyEx(100, 'Reachable'))
+        with backend.deadline(0.05):
+            with backend.deadline(10):
+                self.assertRaises(errors.TimeoutException, backend.RegOpenKeyEx, 100, 'Unreachable')
+            self.assertRaises(errors.TimeoutException, backend.RegQueryInfoKey, 200)
+        backend.close()
+
+    def test_errors_are_raised_by_the_caller(self):
+        interface.RegQueryInfoKey.side_effect = errors.AccessDeniedException(constants.ERROR_ACCESS_DENIED)
+        self.assertRaises(errors.AccessDeniedException, self.backend.RegQueryInfoKey, 200)
+
+class DeadlineKeyStoreTestCase(unittest.TestCase):
+    def test_key_store_under_deadline(self):
+        memory = InMemoryBackend()
+        memory.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor', {u'Version': u'1.0'})
+        backend = DeadlineBackend(memory, timeout=1)
+        key = LocalComputer(backend=backend).local_machine[r'SOFTWARE\Vendor']
+        self.assertEqual([(u'Version', u'1.0')],
+                         [(name, value.to_python_object()) for name, value in key.values_store.iteritems()])
+        del key
+        self.assertEqual(0, memory.open_handles)
+        backend.close()
@@ -0,0 +1,196 @@
+import threading
+import unittest
+import mock
+from .. import constants, errors
+from .memory import InMemoryBackend, MemoryKey
+
+class InMemoryBackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.key = self.backend.RegConnectRegistry(None, constants.HKEY_LOCAL_MACHINE)
+
+    def tearDown(self):
+        self.backend.RegCloseKey(self.key)
+
+    def test_open_missing_key(self):
+        self.assertRaises(KeyError, self.backend.RegOpenKeyEx, self.key, 'DoesNotExist')
+
+    def test_invalid_handle(self):
+        self.assertRaises(errors.InvalidHandleException, self.backend.RegQueryInfoKey, 4000)
+        self.assertRaises(errors.InvalidHandleException, self.backend.RegCloseKey, 0)
+
+    def test_invalid_predefined_key(self):
+        self.assertRaises(ValueError, self.backend.RegConnectRegistry, r'\\remote', constants.HKEY_CURRENT_USER)
+
+    def test_enumeration_out_of_range(self):
+        self.assertRaises(IndexError, self.backend.RegEnumKeyEx, self.key, 0)
+        self.assertRaises(IndexError, self.backend.RegEnumValue, self.key, -1)
+
+    def test_subkeys_are_sorted(self):
+        for name in ('b', 'C', 'a'):
+            self.backend.RegCloseKey(self.backend.RegCreateKeyEx(self.key, name))
+        names = [self.backend.RegEnumKeyEx(self.key, index) for index in range(3)]
+        self.assertEqual(['a', 'b', 'C'], names)
+
+    def test_query_info_key(self):
+        subkey = self.backend.RegCreateKeyEx(self.key, r'SOFTWARE\Vendor')
+        self.backend.RegSetValueEx(subkey, 'Name', 2 ** 40)
+        self.backend.RegSetValueEx(subkey, 'Counter', 5)
+        self.assertEqual((0, 0, 0, 2, 7, 8), self.backend.RegQueryInfoKey(subkey))
+        self.backend.RegCloseKey(subkey)
+
+    def test_binary_type(self):
+        self.backend.RegSetValueEx(self.key, 'Blob', b'\x01\x02')
+        self.assertEqual((1, 2), self.backend.RegQueryValueEx(self.key, 'Blob').to_python_object())
+        backend = InMemoryBackend(binary_type=bytes)
+        backend.populate(constants.HKEY_LOCAL_MACHINE, 'Key', {'Blob': b'\x01\x02'})
+        value = backend.RegGetValue(constants.HKEY_LOCAL_MACHINE, 'Key', 'Blob')
+        self.assertEqual(b'\x01\x02', value.to_python_object())
+        self.assertEqual((1, 2), self.backend.RegQueryValueEx(self.key, 'Blob').to_python_object())
+
+    def test_big_endian_dword(self):
+        self.backend.RegSetValueEx(self.key, 'Counter', 258, constants.REG_DWORD_BIG_ENDIAN)
+        self.assertEqual([('Counter', constants.REG_DWORD_BIG_ENDIAN, 258)],
+                         [(name, value.registry_type, value.to_python_object())
+                          for name, value in self.backend.RegEnumValues(self.key)])
+
+    def test_delete_key_with_subkeys(self):
+        self.backend.RegCloseKey(self.backend.RegCreateKeyEx(self.key, r'Parent\Child'))
+        self.assertRaises(errors.AccessDeniedException, self.backend.RegDeleteKey, self.key, 'Parent')
+        self.backend.RegDeleteKey(self.key, r'Parent\Child')
+        self.backend.RegDeleteKey(self.key, 'Parent')
+        self.assertRaises(KeyError, self.backend.RegDeleteKey, self.key, 'Parent')
+
+    def test_handle_to_deleted_key(self):
+        subkey = self.backend.RegCreateKeyEx(self.key, 'Deleted')
+        self.backend.RegDeleteKey(self.key, 'Deleted')
+        self.assertRaises(errors.RegistryBaseException, self.backend.RegQueryInfoKey, subkey)
+        self.backend.RegCloseKey(subkey)
+
+    def test_restricted_key(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Secure\Child')
+        self.backend.restrict(constants.HKEY_LOCAL_MACHINE, 'Secure', constants.KEY_QUERY_VALUE)
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(self.key, 'Secure', constants.KEY_QUERY_VALUE))
+        self.assertRaises(errors.AccessDeniedException, self.backend.RegOpenKeyEx, self.key, 'Secure',
+                          constants.KEY_READ)
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(self.key, r'Secure\Child', constants.KEY_READ))
+        self.backend.restrict(constants.HKEY_LOCAL_MACHINE, 'Secure', None)
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(self.key, 'Secure', constants.KEY_READ))
+
+    def test_remote_computers_are_isolated(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, 'Remote', machineName=r'\\Host')
+        remote = self.backend.RegConnectRegistry('host', constants.HKEY_LOCAL_MACHINE)
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(remote, 'Remote'))
+        self.assertRaises(KeyError, self.backend.RegOpenKeyEx, self.key, 'Remote')
+        self.backend.RegCloseKey(remote)
+
+    def test_concurrent_writes(self):
+        def _write(thread_index):
+            key = self.backend.RegCreateKeyEx(self.key, 'Thread%d' % thread_index)
+            for index in range(100):
+                self.backend.RegSetValueEx(key, 'value%d' % index, index)
+            self.backend.RegCloseKey(key)
+        threads = [threading.Thread(target=_write, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8, self.backend.RegQueryInfoKey(self.key)[0])
+        self.assertEqual(1, self.backend.open_handles)
+
+    def test_transaction_commit(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, 'Existing', {'Old': 1})
+        transaction = self.backend.CreateTransaction()
+        key = self.backend.RegCreateKeyTransacted(self.key, r'New\Child', transaction)
+        self.backend.RegSetValueEx(key, 'Name', u'value')
+        existing = self.backend.RegOpenKeyTransacted(self.key, 'Existing', transaction)
+        self.backend.RegDeleteValue(existing, 'Old')
+        self.assertRaises(KeyError, self.backend.RegOpenKeyEx, self.key, 'New')
+        self.assertEqual(1, self.backend.RegGetValue(self.key, 'Existing', 'Old').to_python_object())
+        self.backend.RegCloseKey(key)
+        self.backend.RegCloseKey(existing)
+        self.backend.CommitTransaction(transaction)
+        self.backend.CloseTransaction(transaction)
+        self.assertEqual(u'value', self.backend.RegGetValue(self.key, r'New\Child', 'Name').to_python_object())
+        self.assertRaises(KeyError, self.backend.RegGetValue, self.key, 'Existing', 'Old')
+        self.assertEqual(1, self.backend.open_handles)
+
+    def test_transaction_rollback(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\Child')
+        transaction = self.backend.CreateTransaction()
+        self.backend.RegDeleteKeyTransacted(self.key, r'Parent\Child', transaction)
+        self.assertRaises(KeyError, self.backend.RegOpenKeyTransacted, self.key, r'Parent\Child', transaction)
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(self.key, r'Parent\Child'))
+        self.backend.RollbackTransaction(transaction)
+        self.backend.CloseTransaction(transaction)
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(self.key, r'Parent\Child'))
+
+    def test_transaction_copies_only_the_keys_it_touches(self):
+        for index in range(100):
+            self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Other\Key%d' % index, {'Name': index})
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\Child\Leaf', {'Name': 1})
+        transaction = self.backend.CreateTransaction()
+        with mock.patch.object(MemoryKey, 'clone', autospec=True, side_effect=MemoryKey.clone) as clone:
+            key = self.backend.RegOpenKeyTransacted(self.key, r'Parent\Child', transaction)
+            leaf = self.backend.RegCreateKeyTransacted(key, 'Leaf', transaction)
+            self.backend.RegSetValueEx(leaf, 'Name', 2)
+            self.backend.RegDeleteKeyTransacted(self.key, r'Other\Key0', transaction)
+        self.assertEqual(6, clone.call_count)
+        self.assertEqual(1, self.backend.RegGetValue(self.key, r'Parent\Child\Leaf', 'Name').to_python_object())
+        self.backend.RegCloseKey(self.backend.RegOpenKeyEx(self.key, r'Other\Key0'))
+        self.backend.RegCloseKey(leaf)
+        self.backend.RegCloseKey(key)
+        self.backend.CommitTransaction(transaction)
+        self.backend.CloseTransaction(transaction)
+        self.assertEqual(2, self.backend.RegGetValue(self.key, r'Parent\Child\Leaf', 'Name').to_python_object())
+        self.assertRaises(KeyError, self.backend.RegOpenKeyEx, self.key, r'Other\Key0')
+        self.assertEqual(1, self.backend.RegGetValue(self.key, r'Other\Key1', 'Name').to_python_object())
+
+    def test_transaction_sees_outside_changes_until_it_reaches_a_key(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\Reached', {'Name': 1})
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\Unreached', {'Name': 1})
+        transaction = self.backend.CreateTransaction()
+        reached = self.backend.RegOpenKeyTransacted(self.key, r'Parent\Reached', transaction)
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\Reached', {'Name': 2})
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\Unreached', {'Name': 2})
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Parent\New')
+        unreached = self.backend.RegOpenKeyTransacted(self.key, r'Parent\Unreached', transaction)
+        self.assertEqual(1, self.backend.RegQueryValueEx(reached, 'Name').to_python_object())
+        self.assertEqual(2, self.backend.RegQueryValueEx(unreached, 'Name').to_python_object())
+        # Parent was copied on the way to Reached, before New was created
+        self.assertRaises(KeyError, self.backend.RegOpenKeyTransacted, self.key, r'Parent\New', transaction)
+        self.backend.RegCloseKey(reached)
+        self.backend.RegCloseKey(unreached)
+        self.backend.RollbackTransaction(transaction)
+        self.backend.CloseTransaction(transaction)
+
+    def test_handle_of_ended_transaction(self):
+        transaction = self.backend.CreateTransaction()
+        key = self.backend.RegCreateKeyTransacted(self.key, 'New', transaction)
+        self.backend.CommitTransaction(transaction)
+        self.assertRaises(errors.TransactionFailed, self.backend.RegSetValueEx, key, 'Name', 1)
+        self.assertRaises(errors.TransactionFailed, self.backend.CommitTransaction, transaction)
+        self.backend.RegCloseKey(key)
+        self.backend.CloseTransaction(transaction)
+        self.assertRaises(errors.InvalidHandleException, self.backend.RollbackTransaction, transaction)
+
+    def test_change_notifications(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Watched\Child')
+        watched = self.backend.RegOpenKeyEx(self.key, 'Watched', constants.KEY_NOTIFY)
+        event, other = self.backend.CreateEvent(), self.backend.CreateEvent()
+        self.backend.RegNotifyChangeKeyValue(watched, True, constants.REG_NOTIFY_CHANGE_LAST_SET, event)
+        self.assertIsNone(self.backend.WaitForMultipleObjects([other, event], 0))
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Watched\Child\New')
+        self.assertIsNone(self.backend.WaitForMultipleObjects([other, event], 0))
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Watched\Child', {'Name': 1})
+        self.assertEqual(1, self.backend.WaitForMultipleObjects([other, event], 0))
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'Watched\Child', {'Name': 2})
+        self.assertIsNone(self.backend.WaitForMultipleObjects([other, event], 0))
+        self.backend.RegNotifyChangeKeyValue(watched, False, constants.REG_NOTIFY_CHANGE_NAME, event)
+        self.backend.SetEvent(other)
+        self.backend.RegCloseKey(watched)
+        self.assertEqual(0, self.backend.WaitForMultipleObjects([other, event], 0))
+        self.assertEqual(1, self.backend.WaitForMultipleObjects([other, event], 0))
+        self.backend.CloseEvent(event)
+        self.backend.CloseEvent(other)
+        self.assertRaises(errors.InvalidHandleException, self.backend.WaitForMultipleObjects, [event], 0)
@@ -7,6 +7,7 @@ import mock
 import os
 from .. import interface, constants, dtypes, errors, funcs, c_api
 from ..dtypes import LPWSTR, LPCWSTR
+from ctypes import memmove
 
 
 class BaseTestCase(unittest.TestCase):
@@ -452,3 +453,162 @@ class RegSetValueEx(TestCaseLocalMachine):
         kwargs = {'key':-1, 'valueName':'m0she', 'valueData':1}
         self._test_base_exception(kwargs, errors.RegistryBaseException)
 
+
+def windows_error(winerror):
+    exception = errors.WindowsError(None, 'error', None, winerror)
+    exception.winerror = winerror
+    return exception
+
+class RegEnumValues(unittest.TestCase):
+    def _enum_value(self, values):
+        def side_effect(key, index, name, nameLength, data, dataLength):
+            value_name, value_data = values[index]
+            if len(value_name) >= nameLength.value or len(value_data) > dataLength.value:
+                dataLength.value = len(value_data)
+                raise windows_error(constants.ERROR_MORE_DATA)
+            name.value = value_name
+            nameLength.value = len(value_name)
+            memmove(data, value_data, len(value_data))
+            dataLength.value = len(value_data)
+            return name, nameLength.value, constants.REG_BINARY, data, dataLength.value
+        return side_effect
+
+    @mock.patch("infi.registry.c_api.RegEnumValueW")
+    @mock.patch("infi.registry.c_api.RegQueryInfoKeyW")
+    def test_single_call_per_value(self, query_info_key, enum_value):
+        values = [(u'value%d' % index, b'\x01\x02' * index) for index in range(100)]
+        query_info_key.return_value = (None, 0, 0, 0, 0, 100, 7, 198, 0, 0)
+        enum_value.side_effect = self._enum_value(values)
+        result = [(name, value.to_python_object()) for name, value in interface.RegEnumValues(1)]
+        self.assertEqual([(name, tuple(bytearray(data))) for name, data in values], result)
+        self.assertEqual(1, query_info_key.call_count)
+        self.assertEqual(100, enum_value.call_count)
+        buffers = set((id(call[1]['name']), id(call[1]['data'])) for call in enum_value.call_args_list)
+        self.assertEqual(1, len(buffers))
+
+    @mock.patch("infi.registry.c_api.RegEnumValueW")
+    @mock.patch("infi.registry.c_api.RegQueryInfoKeyW")
+    def test_buffers_grow_on_more_data(self, query_info_key, enum_value):
+        values = [(u'small', b'\x01'), (u'a_value_that_grew', b'\x02' * 10), (u'small', b'\x03')]
+        query_info_key.return_value = (None, 0, 0, 0, 0, 3, 5, 1, 0, 0)
+        enum_value.side_effect = self._enum_value(values)
+        result = [(name, value.to_python_object()) for name, value in interface.RegEnumValues(1)]
+        self.assertEqual([(name, tuple(bytearray(data))) for name, data in values], result)
+        self.assertEqual(6, enum_value.call_count)
+
+    @mock.patch("infi.registry.c_api.RegEnumValueW")
+    @mock.patch("infi.registry.c_api.RegQueryInfoKeyW")
+    def test_raw_values(self, query_info_key, enum_value):
+        values = [(u'small', b'\x01'), (u'large', b'\x02' * 10)]
+        query_info_key.return_value = (None, 0, 0, 0, 0, 2, 5, 10, 0, 0)
+        enum_value.side_effect = self._enum_value(values)
+        self.assertEqual([(name, constants.REG_BINARY, data) for name, data in values],
+                         list(interface.RegEnumValuesRaw(1)))
+
+    @mock.patch("infi.registry.c_api.RegEnumValueW")
+    @mock.patch("infi.registry.c_api.RegQueryInfoKeyW")
+    def test_values_deleted_during_enumeration(self, query_info_key, enum_value):
+        query_info_key.return_value = (None, 0, 0, 0, 0, 3, 5, 1, 0, 0)
+        enum_value.side_effect = windows_error(constants.ERROR_NO_MORE_ITEMS)
+        self.assertEqual([], list(interface.RegEnumValues(1)))
+
+class RegGetValue(unittest.TestCase):
+    def _get_value(self, value_data):
+        def side_effect(key, subKey, valueName, flags, data, dataLength):
+            if len(value_data) > dataLength.value:
+                dataLength.value = len(value_data)
+                raise windows_error(constants.ERROR_MORE_DATA)
+            memmove(data, value_data, len(value_data))
+            dataLength.value = len(value_data)
+            return constants.REG_BINARY, data, dataLength.value
+        return side_effect
+
+    @mock.patch("infi.registry.c_api.RegGetValueW")
+    def test_small_value_single_call(self, get_value):
+        get_value.side_effect = self._get_value(b'\x01\x02')
+        self.assertEqual((1, 2), interface.RegGetValue(1, u'SOFTWARE', u'name').to_python_object())
+        self.assertEqual(1, get_value.call_count)
+        self.assertEqual(constants.RRF_RT_ANY | constants.RRF_NOEXPAND, get_value.call_args[0][3])
+
+    @mock.patch("infi.registry.c_api.RegGetValueW")
+    def test_large_value(self, get_value):
+        get_value.side_effect = self._get_value(b'\x01' * 4096)
+        self.assertEqual((1,) * 4096, interface.RegGetValue(1, u'SOFTWARE', u'name').to_python_object())
+        self.assertEqual(2, get_value.call_count)
+
+    @mock.patch("infi.registry.c_api.RegGetValueW")
+    def test_missing_value(self, get_value):
+        get_value.side_effect = windows_error(constants.ERROR_FILE_NOT_FOUND)
+        self.assertRaises(KeyError, interface.RegGetValue, 1, u'SOFTWARE', u'name')
+
+class GeneralErrors(unittest.TestCase):
+    def test_mapping(self):
+        for winerror, exception_class in [(constants.ERROR_INVALID_HANDLE, errors.InvalidHandleException),
+                                          (constants.RPC_S_INVALID_NET_ADDR, errors.RemoteRegistryConnectionFailed),
+                                          (constants.ERROR_ACCESS_DENIED, errors.AccessDeniedException),
+                                          (constants.ERROR_FILE_NOT_FOUND, KeyError),
+                                          (constants.ERROR_NO_MORE_ITEMS, IndexError)]:
+            self.assertRaises(exception_class, errors.catch_and_raise_general_errors, windows_error(winerror))
+        self.assertIsNone(errors.catch_and_raise_general_errors(windows_error(constants.ERROR_MORE_DATA)))
+
+    @mock.patch("ctypes.WinError", create=True)
+    def test_errcheck_does_not_format_general_errors(self, win_error):
+        with self.assertRaises(errors.WindowsError) as context:
+            funcs.raise_exception_if_necessary(constants.ERROR_FILE_NOT_FOUND, None, ())
+        self.assertEqual(constants.ERROR_FILE_NOT_FOUND, context.exception.winerror)
+        self.assertFalse(win_error.called)
+        self.assertEqual((1,), funcs.raise_exception_if_necessary(constants.ERROR_SUCCESS, None, (1,)))
+
+class RegQueryValueExDefault(unittest.TestCase):
+    @mock.patch("infi.registry.c_api.RegQueryValueExW")
+    def test_missing_value_returns_default(self, query_value):
+        query_value.side_effect = windows_error(constants.ERROR_FILE_NOT_FOUND)
+        with mock.patch.object(logging, 'exception') as log_exception:
+            self.assertIsNone(interface.RegQueryValueEx(1, u'name', None))
+            self.assertRaises(KeyError, interface.RegQueryValueEx, 1, u'name')
+        self.assertFalse(log_exception.called)
+
+    @mock.patch("infi.registry.c_api.RegQueryValueExW")
+    def test_other_errors_are_raised(self, query_value):
+        query_value.side_effect = windows_error(constants.ERROR_ACCESS_DENIED)
+        self.assertRaises(errors.AccessDeniedException, interface.RegQueryValueEx, 1, u'name', None)
+
+class RegQueryValueInto(unittest.TestCase):
+    def _query_value(self, value_data):
+        def side_effect(key, name, data, dataLength):
+            if len(value_data) > dataLength.value:
+                dataLength.value = len(value_data)
+                raise windows_error(constants.ERROR_MORE_DATA)
+            memmove(data, value_data, len(value_data))
+            dataLength.value = len(value_data)
+            return constants.REG_BINARY, data, dataLength
+        return side_effect
+
+    @mock.patch("infi.registry.c_api.RegQueryValueExW")
+    def test_reads_into_the_buffer(self, query_value):
+        query_value.side_effect = self._query_value(b'\x01\x02\x03')
+        buffer = bytearray(8)
+        self.assertEqual((constants.REG_BINARY, 3), interface.RegQueryValueInto(1, u'name', buffer))
+        self.assertEqual(b'\x01\x02\x03', bytes(buffer[:3]))
+        self.assertEqual(1, query_value.call_count)
+
+    @mock.patch("infi.registry.c_api.RegQueryValueExW")
+    def test_buffer_too_small(self, query_value):
+        query_value.side_effect = self._query_value(b'\x01' * 100)
+        with self.assertRaises(errors.BufferTooSmallException) as context:
+            interface.RegQueryValueInto(1, u'name', bytearray(8))
+        self.assertEqual(100, context.exception.required_size)
+
+class RegSetKeyValue(unittest.TestCase):
+    @mock.patch("infi.registry.c_api.RegSetKeyValueW")
+    def test_single_call(self, set_key_value):
+        interface.RegSetKeyValue(1, u'SOFTWARE\\Vendor', u'name', 5)
+        self.assertEqual(1, set_key_value.call_count)
+        kwargs = set_key_value.call_args[1]
+        self.assertEqual((u'SOFTWARE\\Vendor', u'name', constants.REG_DWORD, 4),
+                         (kwargs['subKey'], kwargs['valueName'], kwargs['dataType'], kwargs['dataLength']))
+
+    @mock.patch("infi.registry.c_api.RegSetKeyValueW")
+    def test_access_denied(self, set_key_value):
+        set_key_value.side_effect = windows_error(constants.ERROR_ACCESS_DENIED)
+        self.assertRaises(errors.AccessDeniedException, interface.RegSetKeyValue, 1, u'SOFTWARE', u'name', 5)
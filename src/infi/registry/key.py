@@ -1,7 +1,14 @@
 
+import contextlib
 import logging
+from collections import OrderedDict
+from ctypes import addressof, sizeof, string_at
+from six.moves.collections_abc import Mapping
 from . import funcs, errors, constants, dtypes, interface
 from .value import RegistryValueFactory, RegistryValue
+from .interface.backends import get_default_backend
+from .cache import MISSING
+from .watch import DEFAULT_FILTER, get_default_watcher
 
 ITER_KEYS = 0
 ITER_VALUES = 1
@@ -59,13 +66,14 @@ class DictLikeInterface(object):
         return False
 
     def pop(self, key, default=Null):
-        if self.has_key(key):
-            default = self.__getitem__(key)
-            self.__delitem__(key)
+        try:
+            value = self.__getitem__(key)
+        except KeyError:
+            if default is Null:
+                raise
             return default
-        if default is Null:
-            raise KeyError
-        return default
+        self.__delitem__(key)
+        return value
 
     def clear(self):
         for key in self.keys():
@@ -86,16 +94,67 @@ class DictLikeInterface(object):
     def viewvalues(self):
         raise NotImplementedError #pragma: no cover
 
+def _get_data(regvalue):
+    byte_array = regvalue.to_byte_array()
+    return regvalue.registry_type, string_at(addressof(byte_array), sizeof(byte_array))
+
+class ValueSnapshot(Mapping):
+    """ An immutable mapping of value names to RegistryValue objects, as they were read from a key in one pass.
+    Names are looked up case-insensitively, like they are in the registry, and keep their case when iterated.
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, items):
+        self._values = OrderedDict((name.lower(), (name, value)) for name, value in items)
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name.lower()][1]
+        except KeyError:
+            raise KeyError(name)
+
+    def __iter__(self):
+        return (name for name, value in self._values.values())
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return '<ValueSnapshot %r>' % ([name for name in self],)
+
+_READ_RAW_INITIAL_BUFFER_SIZE = 512
+
 class ValueStore(DictLikeInterface):
     def __init__(self, key_store):
         self._key_store = key_store
 
     def __len__(self):
-        return self._query_info_about_key(3)
+        return self._key_store._query_info_about_key(3)
 
     def __getitem__(self, item):
         return self._key_store._getitem_registry_value(item)
 
+    def get(self, key, default_value=None):
+        # a missing value is returned as None by the backend, instead of being raised through the frames below
+        try:
+            value = self._key_store._getitem_registry_value(key, None)
+        except KeyError:
+            # the key itself does not exist
+            return default_value
+        return default_value if value is None else value
+
+    def has_key(self, key):
+        return self.get(key) is not None
+
+    def pop(self, key, default=Null):
+        value = self.get(key)
+        if value is None:
+            if default is Null:
+                raise KeyError(key)
+            return default
+        self.__delitem__(key)
+        return value
+
     def __setitem__(self, item, value):
         if isinstance(value, (RegistryValue,)):
             self._key_store._write_registry_value(item, value)
@@ -106,132 +165,622 @@ class ValueStore(DictLikeInterface):
         self._key_store._delete_registry_value(item)
 
     def iteritems(self):
-        for index in range(0, self._key_store._query_info_about_key(3)):
-            name, value = interface.RegEnumValue(self._key_store._handle, index)
-            yield name, value
+        return self._key_store._backend.RegEnumValues(self._key_store._handle)
+
+    def iterraw(self):
+        """ Yields a tuple of the name, the type and the data, as bytes, of each value,
+        without building RegistryValue objects, for callers that only need the names, types or sizes,
+        or that pass the data on as it is.
+        """
+        return self._key_store._backend.RegEnumValuesRaw(self._key_store._handle)
+
+    def setdefault(self, key, default_value=None):
+        try:
+            return self.__getitem__(key)
+        except KeyError:
+            pass
+        if not isinstance(default_value, RegistryValue):
+            default_value = RegistryValueFactory().by_value(default_value)
+        self.__setitem__(key, default_value)
+        return default_value
+
+    def copy(self):
+        return dict(self.iteritems())
+
+    def popitem(self):
+        for name, value in self.iteritems():
+            self.__delitem__(name)
+            return name, value
+        raise KeyError('popitem(): the key has no values')
+
+    def update(self, other=(), **kwargs):
+        """ Writes the values of other, which is a dict or an iterable of (name, value) tuples, and of kwargs.
+        The values can be RegistryValue objects or Python objects, which are converted once by RegistryValueFactory.
+        They are compared with the current values of the key, which are read in one enumeration pass,
+        and only the values that changed are written. If any value was written, the key is flushed once at the end,
+        unless it is written in a transaction, which is flushed when it is committed.
+        """
+        items = list(other.items() if hasattr(other, 'items') else other) + list(kwargs.items())
+        factory = RegistryValueFactory()
+        new_values = OrderedDict()
+        for name, value in items:
+            if not isinstance(value, RegistryValue):
+                value = factory.by_value(value)
+            new_values[name.lower()] = (name, value)
+        if not new_values:
+            return
+        current = self.snapshot()
+        written = False
+        for name, value in new_values.values():
+            if name in current and _get_data(current[name]) == _get_data(value):
+                continue
+            self._key_store._write_registry_value(name, value)
+            written = True
+        if written and self._key_store._hive._transaction is None:
+            self._key_store._backend.RegFlushKey(self._key_store._handle)
+
+    def snapshot(self):
+        """ Returns a ValueSnapshot of all the values in the key, read in one enumeration pass
+        """
+        return ValueSnapshot(self.iteritems())
+
+    def get_many(self, names, default=None):
+        """ Returns a dict of {name: RegistryValue} for the value names, with default in place of the missing ones.
+        The values are read by enumerating the key if it does not have many more values than the names,
+        and by querying each name otherwise.
+        """
+        names = list(names)
+        if not names:
+            return {}
+        # a query costs two calls, one to probe the size of the value and one to read it,
+        # and an enumeration costs about one call per value in the key
+        if len(self) <= 2 * len(set(name.lower() for name in names)):
+            snapshot = self.snapshot()
+            return dict((name, snapshot.get(name, default)) for name in names)
+        return dict((name, self.get(name, default)) for name in names)
+
+    def readinto(self, name, buffer):
+        """ Reads the data of the value name directly into buffer, a writable object that supports the buffer protocol,
+        such as bytearray, mmap or a numpy array, and returns a tuple of the value's type and its length in bytes.
+        Raises errors.BufferTooSmallException, whose required_size is the length of the value, if it does not fit.
+        The value is always read from the registry, and not from the value cache.
+        """
+        return self._key_store._backend.RegQueryValueInto(self._key_store._handle, name, buffer)
+
+    def read_raw(self, name):
+        """ Returns a tuple of the type and the data of the value name, as bytes, without converting it
+        into a RegistryValue. A small value is read in a single call, and a larger one in two.
+        """
+        buffer = bytearray(_READ_RAW_INITIAL_BUFFER_SIZE)
+        while True:
+            try:
+                value_type, length = self.readinto(name, buffer)
+                break
+            except errors.BufferTooSmallException as error:
+                buffer = bytearray(error.required_size)
+        return value_type, bytes(memoryview(buffer)[:length])
 
     def iterkeys(self):
-        for index in range(0, self._key_store._query_info_about_key(3)):
-            name, value = interface.RegEnumValue(self._key_store._handle, index)
+        for name, value in self.iteritems():
             yield name
 
     def itervalues(self):
-        for index in range(0, self._key_store._query_info_about_key(3)):
-            name, value = interface.RegEnumValue(self._key_store._handle, index)
+        for name, value in self.iteritems():
             yield value
 
 class KeyStore(DictLikeInterface):
     def __init__(self, parent=None, path=None, sam=None):
-        self._parent = parent
         self._relapath = path
         self._abspath = '\\'.join([parent._abspath if parent is not None else '',
                                    path if path is not None else '']).strip('\\')
-        self._sam = sam if sam else self._parent._sam
-        self._handle = self._get_handle()
+        self._sam = sam if sam else parent._sam
+        self._hive = parent._hive
+        self._parent = None if self._hive._detached_keys else parent
+        self._backend = parent._backend
+        self._handle_cache = parent._handle_cache
+        self._value_cache = parent._value_cache
+        self._opened_handle = None
 
     @property
     def values_store(self):
         return ValueStore(self)
 
+    @property
+    def _handle(self):
+        transaction = self._hive._transaction
+        if transaction is not None:
+            return transaction.get_key_handle(self._abspath, self._sam)
+        return self.open()._opened_handle
+
+    def open(self):
+        """ Opens the handle to the key, if it is not open yet, and returns self.
+        The handle is opened by the first operation that needs it, so keys that are yielded by iteritems and
+        itervalues do not cost a call into the registry unless they are used.
+        Inside a transaction of the hive, the key is opened in the transaction instead.
+        Raises KeyError if the key does not exist.
+        """
+        transaction = self._hive._transaction
+        if transaction is not None:
+            transaction.get_key_handle(self._abspath, self._sam)
+        elif self._opened_handle is None:
+            self._opened_handle = self._acquire_handle()
+        return self
+
+    def close(self):
+        """ Closes the handle to the key, if it is open. The next operation that needs it opens it again.
+        """
+        handle, self._opened_handle = self._opened_handle, None
+        if handle is not None:
+            self._release_handle(handle)
+
+    def exists(self):
+        """ Returns True if the key exists and can be opened
+        """
+        try:
+            self.open()
+        except KeyError:
+            return False
+        return True
+
     def _get_handle(self):
-        return interface.RegOpenKeyEx(self._parent._handle, self._relapath, self._sam)
+        if self._parent is not None:
+            return self._backend.RegOpenKeyEx(self._parent._handle, self._relapath, self._sam)
+        # detached keys are opened relative to their nearest ancestor with a cached handle, or to the hive
+        names = self._abspath.split('\\')
+        if self._handle_cache is not None:
+            for depth in range(len(names) - 1, 0, -1):
+                handle = self._handle_cache.lookup(self._get_cache_key('\\'.join(names[:depth])))
+                if handle is None:
+                    continue
+                try:
+                    return self._backend.RegOpenKeyEx(handle, '\\'.join(names[depth:]), self._sam)
+                finally:
+                    self._handle_cache.release(handle)
+        return self._backend.RegOpenKeyEx(self._hive._handle, self._abspath, self._sam)
+
+    def _get_cache_key(self, path):
+        return (self._hive._computer_name, self._hive._key, path.lower(), self._sam)
+
+    def _acquire_handle(self):
+        if self._handle_cache is None:
+            return self._get_handle()
+        return self._handle_cache.acquire(self._get_cache_key(self._abspath), self._get_handle, self._backend)
+
+    def _release_handle(self, handle):
+        if self._handle_cache is None:
+            self._backend.RegCloseKey(handle)
+        else:
+            self._handle_cache.release(handle)
+
+    def _invalidate_cached_handles(self, path):
+        if self._handle_cache is not None:
+            self._handle_cache.invalidate(self._hive._computer_name, self._hive._key, path)
+
+    def _get_value_cache(self):
+        # reads inside a transaction see changes that others do not see yet, so they are not cached
+        if self._hive._transaction is not None:
+            return None
+        return self._value_cache
+
+    def _get_value_cache_key(self, path, name):
+        return (self._hive._computer_name, self._hive._key, path.lower(), (name or u'').lower())
+
+    def _get_key_cache_key(self, path):
+        return (self._hive._computer_name, self._hive._key, path.lower(), None)
+
+    def _invalidate_cached_value(self, path, name):
+        if self._value_cache is not None:
+            self._value_cache.invalidate_value(*self._get_value_cache_key(path, name))
+
+    def _invalidate_cached_values(self, path):
+        if self._value_cache is not None:
+            self._value_cache.invalidate(self._hive._computer_name, self._hive._key, path)
 
     def change_permissions(self, sam):
         old_sam = self._sam
         self._sam = sam
+        self._invalidate_cached_handles(self._abspath)
         try:
-            new_handle = self._get_handle()
+            new_handle = self._acquire_handle()
         except:
             self._sam = old_sam
             raise
-        interface.RegCloseKey(self._handle)
-        self._handle = new_handle
+        old_handle, self._opened_handle = self._opened_handle, new_handle
+        if old_handle is not None:
+            self._release_handle(old_handle)
 
     def _query_info_about_key(self, return_index_from_result):
-        result = interface.RegQueryInfoKey(self._handle)
+        result = self._backend.RegQueryInfoKey(self._handle)
         return result[return_index_from_result]
 
     def __len__(self):
         return self._query_info_about_key(0)
 
-    def _getitem_registry_value(self, item):
-        return interface.RegQueryValueEx(self._handle, item)
+    def _getitem_registry_value(self, item, default=interface.NO_DEFAULT):
+        cache = self._get_value_cache()
+        if cache is None:
+            return self._backend.RegQueryValueEx(self._handle, item, default)
+        cache_key = self._get_value_cache_key(self._abspath, item)
+        value = cache.lookup(cache_key)
+        if value is MISSING:
+            if default is not interface.NO_DEFAULT:
+                return default
+            raise KeyError(item)
+        if value is not None:
+            return value
+        try:
+            handle = self._handle
+        except KeyError:
+            cache.store(self._get_key_cache_key(self._abspath), MISSING)
+            raise
+        value = self._backend.RegQueryValueEx(handle, item, MISSING)
+        cache.store(cache_key, value)
+        if value is MISSING:
+            if default is not interface.NO_DEFAULT:
+                return default
+            raise KeyError(item)
+        return value
 
     def _getitem_registry_key(self, item):
-        return KeyStore(self, path=funcs.item_to_unicode(item), sam=self._sam)
+        key = KeyStore(self, path=funcs.item_to_unicode(item), sam=self._sam)
+        cache = self._get_value_cache()
+        if cache is None:
+            return key.open()
+        cache_key = self._get_key_cache_key(key._abspath)
+        if cache.is_missing(cache_key):
+            raise KeyError(item)
+        try:
+            return key.open()
+        except KeyError:
+            cache.store(cache_key, MISSING)
+            raise
 
     def __getitem__(self, item):
         return self._getitem_registry_key(item)
 
     def _create_registry_subkey(self, key):
-        subkey_handle = interface.RegCreateKeyEx(self._handle, key, self._sam)
+        transaction = self._hive._transaction
+        if transaction is None:
+            subkey_handle = self._backend.RegCreateKeyEx(self._handle, key, self._sam)
+        else:
+            subkey_handle = self._backend.RegCreateKeyTransacted(self._handle, key, transaction.handle, self._sam)
+        self._backend.RegCloseKey(subkey_handle)
+        names = funcs.item_to_unicode(key).strip('\\').split('\\')
+        self._invalidate_cached_values('\\'.join([self._abspath, names[0]]).strip('\\'))
 
     def _write_registry_value(self, key, value):
-        interface.RegSetValueEx(self._handle, key, value.to_python_object(), value.registry_type)
+        self._backend.RegSetValueEx(self._handle, key, value)
+        self._invalidate_cached_value(self._abspath, key)
 
     def __setitem__(self, item, value=None):
         self._create_registry_subkey(item)
 
     def _delete_registry_key(self, item):
-        interface.RegDeleteKey(self._handle, funcs.item_to_unicode(item))
+        item = funcs.item_to_unicode(item)
+        path = '\\'.join([self._abspath, item]).strip('\\')
+        transaction = self._hive._transaction
+        if transaction is None:
+            self._backend.RegDeleteKey(self._handle, item)
+        else:
+            self._backend.RegDeleteKeyTransacted(self._handle, item, transaction.handle)
+            transaction.discard_key_handles(path)
+        self._invalidate_cached_handles(path)
+        self._invalidate_cached_values(path)
 
     def _delete_registry_value(self, item):
-        interface.RegDeleteValue(self._handle, funcs.item_to_unicode(item))
+        self._backend.RegDeleteValue(self._handle, funcs.item_to_unicode(item))
+        self._invalidate_cached_value(self._abspath, item)
 
     def __delitem__(self, item):
         self._delete_registry_key(item)
 
     def __del__(self):
-        if not hasattr(self, '_handle'):
-            return
-        interface.RegCloseKey(self._handle)
+        handle = getattr(self, '_opened_handle', None)
+        if handle is not None:
+            self._release_handle(handle)
 
     def iteritems(self):
         for index in range(0, self._query_info_about_key(0)):
-            name = interface.RegEnumKeyEx(self._handle, index)
+            name = self._backend.RegEnumKeyEx(self._handle, index)
             value = KeyStore(self, name, self._sam)
             yield name, value
 
     def iterkeys(self):
         for index in range(0, self._query_info_about_key(0)):
-            name = interface.RegEnumKeyEx(self._handle, index)
+            name = self._backend.RegEnumKeyEx(self._handle, index)
             yield name
 
     def itervalues(self):
         for index in range(0, self._query_info_about_key(0)):
-            name = interface.RegEnumKeyEx(self._handle, index)
+            name = self._backend.RegEnumKeyEx(self._handle, index)
             value = KeyStore(self, name, self._sam)
             yield value
 
+    def watch(self, subtree=True, filter=DEFAULT_FILTER, callback=None, watcher=None):
+        """ Watches the key, and its subkeys if subtree is True, for the changes in filter, a combination of the
+        REG_NOTIFY_CHANGE_* constants, instead of polling it. Returns a watch.Watch, which yields a KeyChange for
+        every change when iterated, and calls callback with it, if given.
+        The key is watched by the watcher that is passed, or by a watcher that is shared by all the keys of the backend.
+        """
+        if watcher is None:
+            watcher = get_default_watcher(self._hive._unguarded_backend)
+        return watcher.watch(self, subtree, filter, callback)
+
+    def walk(self, topdown=True, max_depth=None, onerror=None, prune=None):
+        """ Walks the key and its subkeys, like os.walk does with directories.
+        Yields a (path, subkey_names, values) tuple for every key, where path is relative to the hive,
+        subkey_names is a list of the names of its subkeys, and values is a list of (name, RegistryValue) tuples.
+        If topdown is True, a key is yielded before its subkeys, and removing names from subkey_names in place
+        skips their subtrees. Otherwise, a key is yielded after its subkeys.
+        Subkeys more than max_depth levels below this key are not walked.
+        If prune is given, it is called with the path of every subkey, and the subkey is skipped if it returns True.
+        Errors raised while opening or enumerating a key, such as AccessDeniedException, are raised,
+        unless onerror is given: then it is called with the exception and the key is skipped.
+        The walk holds one open key for each level it is in, and the names and values of the keys on the way.
+        """
+        def read_level(key):
+            try:
+                return list(key.iterkeys()), list(key.values_store.iteritems())
+            except (errors.RegistryBaseException, KeyError) as error:
+                if onerror is None:
+                    raise
+                onerror(error)
+                return None
+
+        level = read_level(self)
+        if level is None:
+            return
+        subkey_names, values = level
+        if topdown:
+            yield self._abspath, subkey_names, values
+            values = None
+        stack = [[self, self._abspath, subkey_names, values, 0]]
+        while stack:
+            frame = stack[-1]
+            key, path, subkey_names, values, index = frame
+            if index < len(subkey_names) and (max_depth is None or len(stack) <= max_depth):
+                frame[4] += 1
+                name = subkey_names[index]
+                subpath = u'\\'.join([path, name]) if path else name
+                if prune is not None and prune(subpath):
+                    continue
+                subkey = KeyStore(key, name, key._sam)
+                level = read_level(subkey)
+                if level is None:
+                    continue
+                subkey_names, values = level
+                if topdown:
+                    yield subpath, subkey_names, values
+                    values = None
+                stack.append([subkey, subpath, subkey_names, values, 0])
+                continue
+            stack.pop()
+            if not topdown:
+                yield path, subkey_names, values
+
+class Transaction(object):
+    """ A transaction on the keys of a hive, see RegistryHive.transaction.
+    The keys are opened in the transaction once for every path and access mask, and stay open until it ends.
+    """
+
+    def __init__(self, hive, description=None, timeout=0):
+        self._hive = hive
+        self._backend = hive._backend
+        self._hive_handle = hive.open()._opened_handle
+        self._key_handles = {}
+        self.handle = self._backend.CreateTransaction(description, timeout)
+
+    def get_key_handle(self, path, sam):
+        cache_key = (path.lower(), sam)
+        handle = self._key_handles.get(cache_key)
+        if handle is None:
+            handle = self._backend.RegOpenKeyTransacted(self._hive_handle, path or None, self.handle, sam)
+            self._key_handles[cache_key] = handle
+        return handle
+
+    def discard_key_handles(self, path):
+        """ Closes the handles to the key in path and to its subkeys, after it is deleted
+        """
+        path = path.lower()
+        for cache_key in list(self._key_handles):
+            if cache_key[0] == path or cache_key[0].startswith(path + '\\'):
+                self._backend.RegCloseKey(self._key_handles.pop(cache_key))
+
+    def _close_key_handles(self):
+        handles, self._key_handles = list(self._key_handles.values()), {}
+        for handle in handles:
+            self._backend.RegCloseKey(handle)
+
+    def _end(self, function):
+        try:
+            self._close_key_handles()
+            function(self.handle)
+        finally:
+            self._backend.CloseTransaction(self.handle)
+
+    def commit(self):
+        """ Makes all the changes of the transaction visible at once.
+        Raises TransactionFailed if they could not be written, and then none of them is.
+        """
+        self._end(self._backend.CommitTransaction)
+
+    def rollback(self):
+        """ Discards all the changes of the transaction
+        """
+        self._end(self._backend.RollbackTransaction)
+
 class RegistryHive(KeyStore):
-    def __init__(self, computer_name, key, sam):
+    def __init__(self, computer_name, key, sam, backend=None, handle_cache=None, detached_keys=False,
+                 connection_pool=None, value_cache=None):
         self._computer_name = computer_name
         self._key = key
         self._sam = sam
+        self._backend = backend if backend is not None else get_default_backend()
+        self._unguarded_backend = self._backend
+        if connection_pool is not None:
+            self._backend = connection_pool.guard(self._backend)
+        self._handle_cache = handle_cache
+        self._value_cache = value_cache
+        self._detached_keys = detached_keys
+        self._connection_pool = connection_pool
         self._relapath = u''
         self._abspath = u''
-        self._handle = self._get_handle()
+        self._opened_handle = None
+        self._transaction = None
+        self.open()
+
+    @property
+    def _hive(self):
+        return self
+
+    @contextlib.contextmanager
+    def transaction(self, description=None, timeout=0):
+        """ Makes all the changes to the keys and values of this hive inside the block a single transaction,
+        which is committed when the block ends, or rolled back if it raises. Yields the Transaction.
+        Inside the block, the keys of the hive see the changes of the transaction, and nobody else does until it
+        is committed. A timeout, in milliseconds, makes the transaction roll back if it is not committed in time.
+        A block inside another one joins the transaction of the outer block.
+        """
+        if self._transaction is not None:
+            yield self._transaction
+            return
+        transaction = self._transaction = Transaction(self, description, timeout)
+        try:
+            yield transaction
+        except:
+            self._transaction = None
+            transaction.rollback()
+            raise
+        self._transaction = None
+        transaction.commit()
+        # the values that were written in the transaction may have been cached meanwhile by others
+        self._invalidate_cached_values(u'')
 
     def _get_handle(self):
-        key_without_sam = interface.RegConnectRegistry(self._computer_name, self._key)
-        return interface.RegOpenKeyEx(key_without_sam, None, self._sam)
+        key_without_sam = self._backend.RegConnectRegistry(self._computer_name, self._key)
+        try:
+            return self._backend.RegOpenKeyEx(key_without_sam, None, self._sam)
+        finally:
+            self._backend.RegCloseKey(key_without_sam)
+
+    def _acquire_handle(self):
+        if self._connection_pool is None:
+            return super(RegistryHive, self)._acquire_handle()
+        computer_name = self._computer_name.strip('\\').lower() if self._computer_name else None
+        return self._connection_pool.acquire((computer_name, self._key, u'', self._sam), self._get_handle,
+                                             self._unguarded_backend)
+
+    def _release_handle(self, handle):
+        if self._connection_pool is None:
+            super(RegistryHive, self)._release_handle(handle)
+        else:
+            self._connection_pool.release(handle)
+
+    def read_value(self, path, name):
+        """ Returns the RegistryValue of the value name under the path, relative to the hive.
+        The value is read directly, without opening a handle to the key, or the keys leading to it.
+        Raises KeyError if the key or the value do not exist.
+        """
+        path = funcs.item_to_unicode(path)
+        cache = self._get_value_cache()
+        if cache is None:
+            return self._backend.RegGetValue(self._handle, path, name)
+        cache_key = self._get_value_cache_key(path.strip('\\'), name)
+        value = cache.lookup(cache_key)
+        if value is MISSING:
+            raise KeyError(name)
+        if value is not None:
+            return value
+        try:
+            value = self._backend.RegGetValue(self._handle, path, name)
+        except KeyError:
+            cache.store(cache_key, MISSING)
+            raise
+        cache.store(cache_key, value)
+        return value
+
+    def read_values(self, items, default=None):
+        """ Reads many values, given as an iterable of (path, name) tuples, the same way read_value does.
+        Returns a list of RegistryValue objects, in the same order, with default in place of the missing ones.
+        """
+        values = []
+        for path, name in items:
+            try:
+                values.append(self.read_value(path, name))
+            except KeyError:
+                values.append(default)
+        return values
+
+    def write_values(self, values):
+        """ Writes many values, given as a dict of {(path, name): value}, where the paths are relative to the hive.
+        The values can be RegistryValue objects or Python objects, which are converted once by RegistryValueFactory.
+        Missing keys are created. The values are grouped by their key:
+        a key with a single value is written without opening a handle to it,
+        and a key with several values is opened once for all of them.
+        """
+        groups = {}
+        for (path, name), value in values.items():
+            path = funcs.item_to_unicode(path)
+            if not isinstance(value, RegistryValue):
+                value = RegistryValueFactory().by_value(value)
+            groups.setdefault(path.lower(), (path, []))[1].append((name, value))
+        for path, group in groups.values():
+            try:
+                self._write_group(path, group)
+            finally:
+                for name, value in group:
+                    self._invalidate_cached_value(path.strip('\\'), name)
+
+    def _write_group(self, path, group):
+        if self._transaction is not None:
+            # RegSetKeyValue opens the key by itself, outside of the transaction
+            handle = self._backend.RegCreateKeyTransacted(self._handle, path, self._transaction.handle,
+                                                          constants.KEY_SET_VALUE)
+        elif len(group) == 1:
+            name, value = group[0]
+            self._backend.RegSetKeyValue(self._handle, path, name, value)
+            return
+        else:
+            handle = self._backend.RegCreateKeyEx(self._handle, path, constants.KEY_SET_VALUE)
+        try:
+            for name, value in group:
+                self._backend.RegSetValueEx(handle, name, value)
+        finally:
+            self._backend.RegCloseKey(handle)
 
 class RegistryComputer(object):
     """ This is the base class holds the registry hives that are common to remote and local computers:
     HKEY_LOCAL_MACHINE, which is access by 'local_machine' property,
     and HKEY_USERS is similarly accessed by the 'users' property'
     """
-    def __init__(self, computer_name, sam):
+    def __init__(self, computer_name, sam, backend=None, handle_cache=None, detached_keys=False,
+                 connection_pool=None, value_cache=None):
         """ Constructor method for accessing the registry.
         If you wish to connect to a remote computer, pass its name.
         The computer_name argument accepts r'\\computername' as valid parameters.
         Hand in the required permission scheme into the sam argument
+        The registry is accessed through the Windows API, unless a different backend is passed,
+        for example an InMemoryBackend instance from the interface.memory module.
+        To share open handles between the KeyStore objects of the same keys, pass a cache.HandleCache instance.
+        By default, keys hold a reference to their parent key, which keeps the parent and its handle alive.
+        If detached_keys is True, keys only reference their hive and path, and are opened relative to their nearest
+        ancestor with a cached handle, so deep walks do not hold on to the keys and handles of every level.
+        To reuse the connections to the hives across accesses, and across computers, pass a cache.ConnectionPool
+        instance. Pooled connections are health-checked, reconnected and closed when idle by the pool.
+        To answer repeated reads of the same values, and of missing ones, from memory, pass a cache.ValueCache
+        instance.
         """
         self._computer_name = computer_name
         self._sam = sam
+        self._backend = backend if backend is not None else get_default_backend()
+        self._handle_cache = handle_cache
+        self._detached_keys = detached_keys
+        self._connection_pool = connection_pool
+        self._value_cache = value_cache
 
     def _get_registry_hive(self, key):
-        return RegistryHive(self._computer_name, key, self._sam)
+        return RegistryHive(self._computer_name, key, self._sam, self._backend, self._handle_cache,
+                            self._detached_keys, self._connection_pool, self._value_cache)
 
     @property
     def local_machine(self):
@@ -250,14 +799,16 @@ class LocalComputer(RegistryComputer):
     HKEY_CURRENT_USER, which is represented by 'current_user', and similarly others.
     """
 
-    def __init__(self, sam=constants.KEY_ALL_ACCESS):
+    def __init__(self, sam=constants.KEY_ALL_ACCESS, backend=None, handle_cache=None, detached_keys=False,
+                 connection_pool=None, value_cache=None):
         """ Constrcuctor method for the Registry of the local machine
         By default, the registry is being access with "full control" permissions.
         If you wish to work with a different set of permissions,
         pass them through the sam paramater.
         You can find the available permissions under the constants module.
         """
-        RegistryComputer.__init__(self, None, sam)
+        RegistryComputer.__init__(self, None, sam, backend, handle_cache, detached_keys, connection_pool,
+                                  value_cache)
 
     @property
     def current_user(self):
@@ -277,4 +828,5 @@ class LocalComputer(RegistryComputer):
         """
         return self._get_registry_hive(constants.HKEY_CURRENT_CONFIG)
 
-__all__ = ('KeyStore', 'ValueStore', 'RegistryHive', 'RegistryComputer', 'LocalMachine',)
+__all__ = ('KeyStore', 'ValueStore', 'ValueSnapshot', 'RegistryHive', 'Transaction', 'RegistryComputer',
+           'LocalMachine',)
@@ -0,0 +1,135 @@
+""" Walking registry trees with a pool of threads.
+
+The calls into advapi32 release the GIL, so reading the subtrees of a key at the same time,
+each in its own thread and through its own handles, is faster than walking them one after the other,
+especially on remote or busy computers.
+"""
+
+import threading
+from six.moves import queue
+from .key import KeyStore, RegistryHive
+
+_PUT_TIMEOUT = 0.1
+
+class _Subtree(object):
+    __slots__ = ('path', 'results')
+
+    def __init__(self, path, results):
+        self.path = path
+        self.results = results
+
+class _Done(object):
+    pass
+
+class _Failure(object):
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+def _get_depth(key, path):
+    if path == key._abspath:
+        return 0
+    return path[len(key._abspath):].strip('\\').count('\\') + 1
+
+def _put(results, item, stopped):
+    while not stopped.is_set():
+        try:
+            results.put(item, timeout=_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _open_hive(key):
+    # every worker has its own hive object, so the threads do not share KeyStore objects,
+    # but they share the caches and the connection pool of the hive of the key
+    hive = key._hive
+    return RegistryHive(hive._computer_name, hive._key, key._sam, hive._unguarded_backend, hive._handle_cache,
+                        hive._detached_keys, hive._connection_pool, hive._value_cache)
+
+def _worker(key, tasks, stopped, max_depth, onerror, prune):
+    hive = None
+    try:
+        while not stopped.is_set():
+            try:
+                subtree = tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if hive is None:
+                    hive = _open_hive(key)
+                for item in KeyStore(hive, subtree.path, key._sam).walk(max_depth=max_depth, onerror=onerror,
+                                                                         prune=prune):
+                    if not _put(subtree.results, item, stopped):
+                        return
+            except Exception as error:
+                _put(subtree.results, _Failure(error), stopped)
+            _put(subtree.results, _Done, stopped)
+    finally:
+        if hive is not None:
+            hive.close()
+
+def _drain(results, subtrees):
+    done = 0
+    while done < subtrees:
+        item = results.get()
+        if item is _Done:
+            done += 1
+        elif isinstance(item, _Failure):
+            raise item.error
+        else:
+            yield item
+
+def parallel_walk(key, workers=4, ordered=True, split_depth=1, queue_size=256, max_depth=None, onerror=None,
+                  prune=None):
+    """ Walks the key and its subkeys like KeyStore.walk does with topdown=True, and yields the same tuples.
+    The keys up to split_depth levels below the key are read first, and the subtrees under them are read by a pool
+    of worker threads, each with its own handles.
+    If ordered is True, the keys are yielded in the same order KeyStore.walk yields them. Otherwise, they are yielded
+    as soon as they are read, and the subtrees are interleaved.
+    Workers stop reading ahead when queue_size keys are waiting to be yielded, per subtree if the walk is ordered.
+    onerror and prune are called from the worker threads. Removing names from subkey_names does not skip their
+    subtrees, which may be read already, so use prune instead.
+    """
+    top_depth = split_depth - 1 if max_depth is None else min(split_depth - 1, max_depth)
+    subtree_max_depth = None if max_depth is None else max_depth - split_depth
+    shared_results = None if ordered else queue.Queue(queue_size)
+    plan, subtrees = [], []
+    for path, subkey_names, values in key.walk(max_depth=top_depth, onerror=onerror, prune=prune):
+        plan.append((path, subkey_names, values))
+        if _get_depth(key, path) < top_depth or top_depth == max_depth:
+            continue
+        for name in subkey_names:
+            subpath = u'\\'.join([path, name]) if path else name
+            if prune is not None and prune(subpath):
+                continue
+            subtree = _Subtree(subpath, queue.Queue(queue_size) if ordered else shared_results)
+            plan.append(subtree)
+            subtrees.append(subtree)
+
+    tasks = queue.Queue()
+    for subtree in subtrees:
+        tasks.put(subtree)
+    stopped = threading.Event()
+    threads = [threading.Thread(target=_worker, args=(key, tasks, stopped, subtree_max_depth, onerror, prune))
+               for _ in range(min(workers, len(subtrees)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        for item in plan:
+            if not isinstance(item, _Subtree):
+                yield item
+            elif ordered:
+                for result in _drain(item.results, 1):
+                    yield result
+        if not ordered:
+            for result in _drain(shared_results, len(subtrees)):
+                yield result
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
+
+__all__ = ('parallel_walk',)
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import unittest
+import mock
+from . import KeyStore, LocalComputer, constants
+from .aio import AsyncRegistryComputer, AsyncKeyStore
+from .interface.memory import InMemoryBackend
+
+class AsyncRegistryComputerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor\Product',
+                              {u'Version': u'1.0', u'Build': 7})
+        for index in range(100):
+            self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor\Key%03d' % index)
+        self.computer = AsyncRegistryComputer(LocalComputer(backend=self.backend), max_workers=2)
+
+    def tearDown(self):
+        self.computer.close()
+
+    def _run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_read_values(self):
+        async def read():
+            hive = await self.computer.local_machine
+            key = await hive[r'SOFTWARE\Vendor\Product']
+            values = key.values_store
+            items = [(name, value.to_python_object()) async for name, value in values]
+            return items, (await values[u'Build']).to_python_object(), await values.get(u'Missing', 5)
+        items, build, missing = self._run(read())
+        self.assertEqual([(u'Version', u'1.0'), (u'Build', 7)], items)
+        self.assertEqual((7, 5), (build, missing))
+
+    def test_write_and_delete(self):
+        async def write():
+            hive = await self.computer.local_machine
+            vendor = await hive[r'SOFTWARE\Vendor']
+            await vendor.create(u'New')
+            new = await vendor[u'New']
+            await new.values_store.set(u'Value', 3)
+            count = await new.values_store.count()
+            await new.close()
+            await vendor.delete(u'New')
+            return count, await vendor.get(u'New')
+        self.assertEqual((1, None), self._run(write()))
+
+    def test_iterate_keys(self):
+        async def iterate():
+            vendor = await (await self.computer.local_machine)[r'SOFTWARE\Vendor']
+            names = [name async for name in vendor.iterkeys()]
+            items = [item async for item in vendor]
+            return names, items, await vendor.count()
+        names, items, count = self._run(iterate())
+        self.assertEqual(101, count)
+        self.assertEqual(names, [name for name, key in items])
+        self.assertIsInstance(items[0][1], AsyncKeyStore)
+
+    def test_calls_do_not_run_on_the_event_loop(self):
+        threads = []
+
+        def get_hive():
+            threads.append(threading.current_thread())
+            return LocalComputer(backend=self.backend).local_machine
+        self.computer._computer = type('Computer', (object,), {'local_machine': property(lambda self: get_hive())})()
+        self._run(self.computer.local_machine)
+        self.assertNotEqual(threading.current_thread(), threads[0])
+
+    def test_iteration_does_not_call_the_backend_on_the_event_loop(self):
+        loop_calls = []
+
+        def record(name, function):
+            def wrapper(*args, **kwargs):
+                if threading.current_thread() is threading.main_thread():
+                    loop_calls.append(name)
+                return function(*args, **kwargs)
+            return wrapper
+        for name in dir(self.backend):
+            if name.startswith('Reg'):
+                setattr(self.backend, name, record(name, getattr(self.backend, name)))
+
+        async def iterate():
+            vendor = await (await self.computer.local_machine)[r'SOFTWARE\Vendor']
+            names = [name async for name in vendor.iterkeys()]
+            async for name, key in vendor:
+                names.extend([value_name async for value_name in key.values_store.iterkeys()])
+            return names
+        self.assertEqual(103, len(self._run(iterate())))
+        self.assertEqual([], loop_calls)
+
+    def test_cancelled_call_closes_handles(self):
+        started, release = threading.Event(), threading.Event()
+        original = self.backend.RegOpenKeyEx
+
+        def slow_open_key(*args):
+            started.set()
+            release.wait()
+            return original(*args)
+
+        async def cancel():
+            hive = await self.computer.local_machine
+            self.backend.RegOpenKeyEx = slow_open_key
+            task = asyncio.ensure_future(hive[r'SOFTWARE\Vendor'])
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            release.set()
+            return hive
+        with mock.patch.object(KeyStore, 'close', autospec=True, side_effect=KeyStore.close) as close:
+            hive = self._run(cancel())
+            self.computer._executor.shutdown(wait=True)
+        self.assertEqual(1, close.call_count)
+        self.assertEqual(1, self.backend.open_handles)
+        del hive
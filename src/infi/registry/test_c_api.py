@@ -0,0 +1,82 @@
+import threading
+import unittest
+import mock
+from . import c_api, constants, funcs
+
+class WrappedFunctionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.patcher = mock.patch('infi.registry.funcs.wrap_advapi32_function')
+        self.wrap = self.patcher.start()
+        self.function = self.wrap.return_value
+        self.last_error_patcher = mock.patch('infi.registry.funcs.wrap_last_error_function')
+        self.wrap_last_error = self.last_error_patcher.start()
+        self._unbind_all()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.last_error_patcher.stop()
+        self._unbind_all()
+
+    def _unbind_all(self):
+        for cls in c_api.WrappedFunction.__subclasses__():
+            if '_binding' in cls.__dict__:
+                del cls._binding
+
+    def test_function_is_bound_once(self):
+        for index in range(10):
+            c_api.RegCloseKey(index)
+        self.assertEqual(1, self.wrap.call_count)
+        self.assertEqual(10, self.function.call_count)
+
+    def test_warm_up_binds_all_functions(self):
+        c_api.warm_up()
+        self.assertEqual(len(c_api.WrappedFunction.__subclasses__()),
+                         self.wrap.call_count + self.wrap_last_error.call_count)
+        c_api.RegEnumKeyExW(key=1, index=0)
+        self.assertEqual(len(c_api.WrappedFunction.__subclasses__()),
+                         self.wrap.call_count + self.wrap_last_error.call_count)
+
+    def test_warm_up_skips_dlls_that_cannot_be_loaded(self):
+        self.wrap_last_error.side_effect = ImportError("cannot import name 'WinDLL'")
+        c_api.warm_up()
+        self.assertFalse(c_api.CreateTransaction.is_available_on_this_platform())
+        self.assertTrue(c_api.RegCloseKey.is_available_on_this_platform())
+
+    def test_functions_of_other_dlls(self):
+        c_api.CreateTransaction(description=u'test')
+        c_api.CloseHandle(1)
+        self.assertEqual(['ktmw32', 'kernel32'], [call[0][0] for call in self.wrap_last_error.call_args_list])
+        self.assertFalse(self.wrap.called)
+
+    def test_errcheck_of_wait_functions(self):
+        c_api.WaitForMultipleObjects(1, None, False, 0)
+        self.assertIs(funcs.raise_last_error_if_wait_failed, self.wrap_last_error.call_args[0][4])
+
+    def test_defaults_are_not_bound_into_the_prototype(self):
+        c_api.RegEnumKeyExW(key=1, index=0)
+        name, return_value, parameters = self.wrap.call_args[0]
+        self.assertEqual('RegEnumKeyExW', name)
+        self.assertEqual([3, 3, 4, 3, 3, 3], [len(parameter) for parameter in parameters[2:]])
+
+    def test_fresh_defaults_on_every_call(self):
+        c_api.RegEnumKeyExW(key=1, index=0)
+        c_api.RegEnumKeyExW(key=1, index=1)
+        first, second = [call[1] for call in self.function.call_args_list]
+        self.assertIsNot(first['nameSize'], second['nameSize'])
+        self.assertEqual(constants.MAX_KEYNAME_LENGTH, second['nameSize'].value)
+
+    def test_scratch_buffers_are_reused_per_thread(self):
+        c_api.RegEnumKeyExW(key=1, index=0)
+        c_api.RegEnumKeyExW(key=1, index=1)
+        thread = threading.Thread(target=c_api.RegEnumKeyExW, kwargs=dict(key=1, index=2))
+        thread.start()
+        thread.join()
+        first, second, third = [call[1]['name'] for call in self.function.call_args_list]
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+
+    def test_supplied_arguments_are_not_replaced(self):
+        c_api.RegQueryValueExW(1, u'name', dataLength=5)
+        self.assertEqual(5, self.function.call_args[1]['dataLength'])
+        c_api.RegQueryValueExW(1, u'name', None, None, 6)
+        self.assertNotIn('dataLength', self.function.call_args[1])
@@ -0,0 +1,274 @@
+import threading
+import unittest
+import mock
+from . import LocalComputer, RegistryComputer, constants, errors
+from .cache import HandleCache, ConnectionPool, ValueCache
+from .interface.memory import InMemoryBackend
+
+class HandleCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        for index in range(5):
+            self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Key%d\Subkey' % index)
+        self.cache = HandleCache(maxsize=4)
+        self.computer = LocalComputer(backend=self.backend, handle_cache=self.cache)
+
+    def test_shared_handles(self):
+        hive = self.computer.local_machine
+        first, second = hive[r'SOFTWARE\Key0'], hive[r'software\key0']
+        self.assertEqual(first._handle, second._handle)
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+        self.assertEqual(first._handle, self.computer.local_machine[r'SOFTWARE\Key0']._handle)
+        self.assertEqual((3, 2), (self.cache.hits, self.cache.misses))
+
+    def test_different_sam_is_not_shared(self):
+        key = self.computer.local_machine[r'SOFTWARE\Key0']
+        read_only = LocalComputer(constants.KEY_READ, self.backend, self.cache).local_machine[r'SOFTWARE\Key0']
+        self.assertNotEqual(key._handle, read_only._handle)
+
+    def test_least_recently_used_is_evicted(self):
+        hive = self.computer.local_machine
+        for index in range(3):
+            hive[r'SOFTWARE\Key%d' % index]
+        hive[r'SOFTWARE\Key0']
+        hive[r'SOFTWARE\Key3']
+        self.assertEqual(1, self.cache.evictions)
+        self.assertEqual(4, len(self.cache))
+        handles = self.backend.open_handles
+        hive[r'SOFTWARE\Key0']
+        self.assertEqual(handles, self.backend.open_handles)
+        self.assertEqual(5, self.cache.misses)
+
+    def test_evicted_handles_in_use_are_closed_on_release(self):
+        hive = self.computer.local_machine
+        keys = [hive[r'SOFTWARE\Key%d' % index] for index in range(5)]
+        self.assertEqual(2, self.cache.evictions)
+        self.assertEqual(6, self.backend.open_handles)
+        del keys
+        self.assertEqual(5, self.backend.open_handles)
+        self.cache.clear()
+        self.assertEqual(1, self.backend.open_handles)
+        del hive
+        self.assertEqual(0, self.backend.open_handles)
+
+    def test_delete_invalidates_subkeys(self):
+        hive = self.computer.local_machine
+        subkey = hive[r'SOFTWARE\Key0\Subkey']
+        del subkey
+        self.assertEqual(2, len(self.cache))
+        del hive[r'SOFTWARE\Key0\Subkey']
+        self.assertEqual(1, len(self.cache))
+        self.assertRaises(KeyError, hive.__getitem__, r'SOFTWARE\Key0\Subkey')
+
+    def test_change_permissions_invalidates(self):
+        key = self.computer.local_machine[r'SOFTWARE\Key0']
+        other = self.computer.local_machine[r'SOFTWARE\Key0']
+        key.change_permissions(constants.KEY_READ)
+        self.assertNotEqual(key._handle, other._handle)
+        self.assertNotEqual(other._handle, self.computer.local_machine[r'SOFTWARE\Key0']._handle)
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Key', machineName=r'\\host')
+        self.now = 0
+        self.pool = ConnectionPool(maxsize=2, idle_timeout=300, health_check_interval=60, clock=lambda: self.now)
+        self.computer = RegistryComputer(r'\\host', constants.KEY_ALL_ACCESS, self.backend,
+                                         connection_pool=self.pool)
+
+    def test_hive_connections_are_reused(self):
+        with mock.patch.object(self.backend, 'RegConnectRegistry', wraps=self.backend.RegConnectRegistry) as connect:
+            for _ in range(3):
+                self.assertEqual(1, len(self.computer.local_machine[r'SOFTWARE']))
+            other = RegistryComputer('HOST', constants.KEY_ALL_ACCESS, self.backend, connection_pool=self.pool)
+            other.local_machine
+        self.assertEqual(1, connect.call_count)
+        self.assertEqual((3, 1), (self.pool.hits, self.pool.misses))
+        self.assertEqual(1, self.backend.open_handles)
+        self.pool.clear()
+        self.assertEqual(0, self.backend.open_handles)
+
+    def test_idle_connections_expire(self):
+        self.computer.local_machine
+        self.now = 299
+        self.pool.expire_idle()
+        self.assertEqual(1, len(self.pool))
+        self.now = 600
+        hive = self.computer.users
+        self.assertEqual(1, self.pool.expirations)
+        self.assertEqual(1, len(self.pool))
+        self.now = 1000
+        self.pool.expire_idle()
+        self.assertEqual(1, len(self.pool))
+        del hive
+        self.pool.expire_idle()
+        self.assertEqual(1, len(self.pool))
+        self.now = 1300
+        self.pool.expire_idle()
+        self.assertEqual(0, len(self.pool))
+        self.assertEqual(0, self.backend.open_handles)
+
+    def test_broken_connection_is_reconnected(self):
+        hive = self.computer.local_machine
+        self.now = 30
+        self.computer.local_machine
+        self.now = 60
+        failure = errors.RemoteRegistryConnectionFailed()
+        with mock.patch.object(self.backend, 'RegQueryInfoKey', side_effect=failure):
+            reconnected = self.computer.local_machine
+        self.assertEqual(1, self.pool.reconnects)
+        self.assertNotEqual(hive._handle, reconnected._handle)
+        del hive
+        self.assertEqual(1, self.backend.open_handles)
+
+    def test_connection_that_a_call_fails_on_is_discarded(self):
+        hive = self.computer.local_machine
+        failure = errors.RemoteRegistryConnectionFailed()
+        with mock.patch.object(self.backend, 'RegOpenKeyEx', side_effect=failure):
+            self.assertRaises(errors.RemoteRegistryConnectionFailed, hive.__getitem__, 'SOFTWARE')
+        self.assertEqual(0, len(self.pool))
+        reconnected = self.computer.local_machine
+        self.assertNotEqual(hive._handle, reconnected._handle)
+        self.assertEqual(1, len(reconnected[r'SOFTWARE']))
+        del hive
+        self.assertEqual(1, self.backend.open_handles)
+
+    def test_key_not_found_does_not_discard_the_connection(self):
+        hive = self.computer.local_machine
+        self.assertRaises(KeyError, hive.__getitem__, 'MISSING')
+        self.assertEqual(hive._handle, self.computer.local_machine._handle)
+
+    def test_idle_connections_are_looked_for_once_per_interval(self):
+        with mock.patch.object(self.pool, 'expire_idle', wraps=self.pool.expire_idle) as expire_idle:
+            for self.now in range(0, 60):
+                self.computer.local_machine
+        self.assertEqual(2, expire_idle.call_count)
+
+    def test_access_denied_connection_is_healthy(self):
+        hive = self.computer.local_machine
+        self.now = 60
+        with mock.patch.object(self.backend, 'RegQueryInfoKey', side_effect=errors.AccessDeniedException()):
+            self.assertEqual(hive._handle, self.computer.local_machine._handle)
+        self.assertEqual(0, self.pool.reconnects)
+
+    def test_failed_connection_is_retried(self):
+        failures = [errors.RemoteRegistryConnectionFailed()]
+        connect = self.backend.RegConnectRegistry
+
+        def flaky_connect(*args):
+            if failures:
+                raise failures.pop()
+            return connect(*args)
+        with mock.patch.object(self.backend, 'RegConnectRegistry', side_effect=flaky_connect):
+            self.computer.local_machine
+        self.assertEqual(1, self.pool.reconnects)
+        failures.extend([errors.RemoteRegistryConnectionFailed()] * 2)
+        with mock.patch.object(self.backend, 'RegConnectRegistry', side_effect=flaky_connect):
+            self.assertRaises(errors.RemoteRegistryConnectionFailed, getattr, self.computer, 'users')
+
+    def test_new_connection_is_shared_while_it_is_acquired(self):
+        self.now = 100
+        close = self.pool._close
+        started, results = [], []
+
+        def acquire_concurrently(entries):
+            # runs right after the new connection is added to the pool, before acquire returns it
+            if self.pool._entries and not started:
+                started.append(True)
+                thread = threading.Thread(target=lambda: results.append(self.computer.local_machine._handle))
+                thread.start()
+                thread.join()
+            close(entries)
+        with mock.patch.object(self.pool, '_close', side_effect=acquire_concurrently):
+            hive = self.computer.local_machine
+        self.assertEqual([hive._handle], results)
+        self.assertEqual(0, self.pool.reconnects)
+
+    def test_pool_size_is_limited(self):
+        hives = [RegistryComputer(r'\\host', sam, self.backend, connection_pool=self.pool).local_machine
+                 for sam in (constants.KEY_READ, constants.KEY_WRITE, constants.KEY_ALL_ACCESS)]
+        self.assertEqual((2, 1), (len(self.pool), self.pool.evictions))
+        self.assertEqual(3, self.backend.open_handles)
+        del hives
+        self.assertEqual(2, self.backend.open_handles)
+
+class ValueCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Key', {u'Name': u'value'})
+        self.now = 0
+        self.cache = ValueCache(maxsize=4, ttl=10, negative_ttl=1, clock=lambda: self.now)
+        self.hive = LocalComputer(backend=self.backend, value_cache=self.cache).local_machine
+        self.values_store = self.hive[r'SOFTWARE\Key'].values_store
+
+    def test_values_are_cached(self):
+        with mock.patch.object(self.backend, 'RegQueryValueEx', wraps=self.backend.RegQueryValueEx) as query:
+            for _ in range(3):
+                self.assertEqual(u'value', self.values_store[u'name'].to_python_object())
+            self.assertEqual(u'value', self.hive[r'SOFTWARE\Key'].values_store.get(u'NAME').to_python_object())
+        self.assertEqual(1, query.call_count)
+        self.assertEqual((3, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(0.75, self.cache.hit_ratio)
+
+    def test_missing_values_and_keys_are_cached(self):
+        with mock.patch.object(self.backend, 'RegQueryValueEx', wraps=self.backend.RegQueryValueEx) as query, \
+                mock.patch.object(self.backend, 'RegOpenKeyEx', wraps=self.backend.RegOpenKeyEx) as open_key:
+            for _ in range(3):
+                self.assertIsNone(self.values_store.get(u'Missing'))
+                self.assertRaises(KeyError, self.hive.__getitem__, r'SOFTWARE\Missing')
+                self.assertRaises(KeyError, self.hive.read_value, r'SOFTWARE\Missing', u'Name')
+        self.assertEqual((1, 1), (query.call_count, open_key.call_count))
+        self.assertEqual(7, self.cache.negative_hits)
+
+    def test_entries_expire(self):
+        self.values_store.get(u'Name')
+        self.values_store.get(u'Missing')
+        self.now = 5
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Key', {u'Name': u'other', u'Missing': 1})
+        self.assertEqual(u'value', self.values_store[u'Name'].to_python_object())
+        self.assertEqual(1, self.values_store[u'Missing'].to_python_object())
+        self.now = 10
+        self.assertEqual(u'other', self.values_store[u'Name'].to_python_object())
+        self.assertEqual(2, self.cache.expirations)
+
+    def test_writes_invalidate(self):
+        self.values_store.get(u'Name')
+        self.values_store.get(u'New')
+        self.assertRaises(KeyError, self.hive.__getitem__, r'SOFTWARE\Key\Sub\Deep')
+        self.values_store[u'NAME'] = u'written'
+        self.values_store.update(New=1)
+        self.hive.write_values({(r'SOFTWARE\Key\Sub\Deep', u'Name'): u'deep'})
+        self.assertEqual(u'written', self.values_store[u'Name'].to_python_object())
+        self.assertEqual(1, self.values_store[u'New'].to_python_object())
+        self.assertEqual(u'deep', self.hive[r'SOFTWARE\Key\Sub\Deep'].values_store[u'Name'].to_python_object())
+        del self.values_store[u'Name']
+        self.assertIsNone(self.values_store.get(u'Name'))
+
+    def test_key_changes_invalidate(self):
+        self.assertRaises(KeyError, self.hive.__getitem__, r'SOFTWARE\Key\Sub')
+        self.hive[r'SOFTWARE\Key'][r'Sub\Deep'] = None
+        self.hive[r'SOFTWARE\Key\Sub\Deep'].values_store[u'Name'] = u'deep'
+        self.hive[r'SOFTWARE\Key\Sub\Deep'].values_store.get(u'Name')
+        del self.hive[r'SOFTWARE\Key\Sub'][u'Deep']
+        self.assertRaises(KeyError, self.hive.__getitem__, r'SOFTWARE\Key\Sub\Deep')
+        self.assertRaises(KeyError, self.hive.read_value, r'SOFTWARE\Key\Sub\Deep', u'Name')
+
+    def test_transactions_bypass_and_invalidate(self):
+        hive = LocalComputer(backend=self.backend, value_cache=self.cache).local_machine
+        with hive.transaction():
+            hive[r'SOFTWARE\Key'].values_store[u'Name'] = u'transacted'
+            self.assertEqual(u'transacted', hive[r'SOFTWARE\Key'].values_store[u'Name'].to_python_object())
+            self.assertEqual(u'value', self.values_store[u'Name'].to_python_object())
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(u'transacted', self.values_store[u'Name'].to_python_object())
+
+    def test_least_recently_used_are_evicted(self):
+        for index in range(4):
+            self.values_store.get(u'Value%d' % index)
+        self.values_store.get(u'Value0')
+        self.values_store.get(u'Value4')
+        self.assertEqual(1, self.cache.evictions)
+        misses = self.cache.misses
+        self.values_store.get(u'Value0')
+        self.values_store.get(u'Value1')
+        self.assertEqual(misses + 1, self.cache.misses)
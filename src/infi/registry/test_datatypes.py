@@ -37,6 +37,17 @@ class BaseTestCase(unittest.TestCase):
             actual = RegistryValueFactory().by_value(value).registry_type
             self.assertEqual(expected, actual)
 
+class LazyDecoding(unittest.TestCase):
+    def test_decoded_once_when_asked_for(self):
+        byte_array = RegistryValueFactory().by_value([u'a', u'b']).to_byte_array()
+        with mock.patch.object(value, 'decode_multi_sz', wraps=value.decode_multi_sz) as decode:
+            regvalue = RegistryValueFactory().by_type(constants.REG_MULTI_SZ)(byte_array)
+            self.assertIs(byte_array, regvalue.to_byte_array())
+            self.assertFalse(decode.called)
+            self.assertEqual([u'a', u'b'], regvalue.to_python_object())
+            self.assertIs(regvalue.to_python_object(), regvalue.to_python_object())
+        self.assertEqual(1, decode.call_count)
+
 class RegSz(BaseTestCase):
     _regtype = constants.REG_SZ
 
@@ -55,6 +66,12 @@ class RegSz(BaseTestCase):
     def test_unicode_characters(self):
         self._test_value_bidirectional(u'\xe2\x9f\xb2')
 
+    def test_decode_without_terminator(self):
+        data = value.encode_sz(u'abc')
+        self.assertEqual(u'abc', value.decode_sz(data))
+        self.assertEqual(u'abc', value.decode_sz(memoryview(data)[:-value.INTERVAL]))
+        self.assertEqual(u'abc', value.decode_sz(data + b'\x00'))
+
     def test_detect_type(self):
         self._test_detected_type('fooBar')
 
@@ -88,6 +105,14 @@ class RegMultiSz(BaseTestCase):
     def test_long_list(self):
         self._test_value_bidirectional(['a', 'b', 'c'] * 1024)
 
+    def test_strings_with_line_breaks(self):
+        self._test_value_bidirectional([u'a\r\nb', u'c\n'])
+
+    def test_decode_skips_empty_strings(self):
+        data = value.encode_sz(u'a\x00\x00b\x00')
+        self.assertEqual([u'a', u'b'], value.decode_multi_sz(bytearray(data)))
+        self.assertEqual(value.encode_multi_sz([u'a', u'b']), value.encode_multi_sz([u'', u'a', u'b', u'']))
+
     def test_detect_type(self):
         self._test_detected_type(['foo', 'bar'])
 
@@ -113,6 +138,44 @@ class RegDword(BaseTestCase):
     def test_detect_type(self):
         self._test_detected_type(1024)
 
+class RegDwordBigEndian(BaseTestCase):
+    _regtype = constants.REG_DWORD_BIG_ENDIAN
+
+    def test_range(self):
+        for i in (0, 1, 2 ** 16, 2 ** 32 - 1):
+            self._test_value_bidirectional(i)
+
+    def test_byte_order(self):
+        self.assertEqual([0, 0, 1, 2], list(self._get_factory()(258).to_byte_array()))
+
+class RegQword(BaseTestCase):
+    _regtype = constants.REG_QWORD
+
+    def test_large_number(self):
+        self._test_value_bidirectional(2 ** 64 - 1)
+
+    def test_negative_number(self):
+        self._test_value_bidirectional(-1, 2 ** 64 - 1)
+
+class DecodeMany(unittest.TestCase):
+    def test_fixed_width_payloads(self):
+        factory = RegistryValueFactory()
+        payloads = [factory.by_value(index).to_byte_array() for index in range(1000)]
+        with mock.patch.object(value.RegDword, 'from_byte_array') as from_byte_array:
+            self.assertEqual(list(range(1000)), factory.decode_many(constants.REG_DWORD, payloads))
+        self.assertFalse(from_byte_array.called)
+        qwords = [b'\x01' + b'\x00' * 7, b'\x00' * 5 + b'\x01\x00\x00']
+        self.assertEqual([1, 2 ** 40], factory.decode_many(constants.REG_QWORD, qwords))
+        self.assertEqual([258], factory.decode_many(constants.REG_DWORD_BIG_ENDIAN, [b'\x00\x00\x01\x02']))
+        self.assertEqual([], factory.decode_many(constants.REG_DWORD, []))
+
+    def test_other_payloads(self):
+        factory = RegistryValueFactory()
+        dwords = [b'\x01\x00\x00\x00', b'\x02\x00\x00\x00\x00']
+        self.assertEqual([1, 2], factory.decode_many(constants.REG_DWORD, dwords))
+        payloads = [value.encode_sz(u'a'), value.encode_sz(u'bc')]
+        self.assertEqual([u'a', u'bc'], factory.decode_many(constants.REG_SZ, payloads))
+
 class RegBinary(BaseTestCase):
     _regtype = constants.REG_BINARY
 
@@ -127,3 +190,34 @@ class RegBinary(BaseTestCase):
 
     def test_detect_invalid_type(self):
         self._test_detected_type(('hi', 'bye'), True)
+
+class RegBinaryBytes(BaseTestCase):
+    _regtype = constants.REG_BINARY
+
+    def _get_factory(self):
+        return RegistryValueFactory(bytes).by_type(self._regtype)
+
+    def test_bytes(self):
+        self._test_value_bidirectional(b'\x00\x01\xff' * 100)
+
+    def test_from_tuple(self):
+        self._test_value_bidirectional((1, 2, 3), b'\x01\x02\x03')
+
+    def test_memoryview(self):
+        factory = RegistryValueFactory(memoryview).by_type(constants.REG_NONE)
+        self.assertEqual('RegNoneMemoryview', factory.__name__)
+        regvalue = factory(RegistryValueFactory().by_value(bytearray(b'abc')).to_byte_array())
+        view = regvalue.to_python_object()
+        self.assertTrue(view.readonly)
+        self.assertEqual(b'abc', view.tobytes())
+        self.assertEqual((97, 98, 99), RegistryValueFactory().by_type(constants.REG_NONE)(regvalue.to_byte_array())
+                         .to_python_object())
+
+    def test_writable_buffers_are_not_copied(self):
+        data = bytearray(b'abc')
+        byte_array = RegistryValueFactory().by_value(data).to_byte_array()
+        data[0] = ord('x')
+        self.assertEqual(ord('x'), byte_array[0])
+
+    def test_unknown_binary_type(self):
+        self.assertRaises(ValueError, RegistryValueFactory, list)
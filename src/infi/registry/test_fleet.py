@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+from . import constants, errors
+from .fleet import Query, query_fleet
+from .interface.memory import InMemoryBackend
+
+CURRENT_VERSION = r'SOFTWARE\Microsoft\Windows NT\CurrentVersion'
+
+class FleetBackend(InMemoryBackend):
+    def __init__(self, unreachable=()):
+        super(FleetBackend, self).__init__()
+        self.unreachable = set(unreachable)
+        self.running = {}
+        self.max_running = {}
+        self.max_running_total = 0
+        self.delay = 0.001
+        self.calls = 0
+        self._counters_lock = threading.Lock()
+
+    def RegConnectRegistry(self, machineName, key):
+        if machineName in self.unreachable:
+            raise errors.RemoteRegistryConnectionFailed(53, 'The network path was not found')
+        return super(FleetBackend, self).RegConnectRegistry(machineName, key)
+
+    def RegGetValue(self, key, subKey, valueName=None):
+        self.calls += 1
+        machine = self._handles[key].key
+        with self._counters_lock:
+            self.running[machine] = self.running.get(machine, 0) + 1
+            self.max_running[machine] = max(self.max_running.get(machine, 0), self.running[machine])
+            self.max_running_total = max(self.max_running_total, sum(self.running.values()))
+        try:
+            time.sleep(self.delay)
+            return super(FleetBackend, self).RegGetValue(key, subKey, valueName)
+        finally:
+            with self._counters_lock:
+                self.running[machine] -= 1
+
+class QueryFleetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.hosts = [r'\\host%d' % index for index in range(10)]
+        self.backend = FleetBackend(unreachable=[r'\\host3'])
+        for index, host in enumerate(self.hosts):
+            self.backend.populate(constants.HKEY_LOCAL_MACHINE, CURRENT_VERSION,
+                                  {u'CurrentBuild': u'%d' % index, u'CurrentVersion': u'6.3'}, machineName=host)
+            for name in range(4):
+                self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor%d' % name, {u'Name': name},
+                                      machineName=host)
+        self.backend.restrict(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor0', 0, machineName=r'\\host5')
+
+    def test_results_and_errors_per_host(self):
+        queries = [Query(constants.HKEY_LOCAL_MACHINE, CURRENT_VERSION, [u'CurrentBuild', u'Missing']),
+                   Query(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor0')]
+        results = dict((result.computer_name, result) for result in query_fleet(self.hosts, queries,
+                                                                                backend=self.backend))
+        self.assertEqual(sorted(self.hosts), sorted(results))
+        build = results[r'\\host7'].values[(constants.HKEY_LOCAL_MACHINE, CURRENT_VERSION, u'CurrentBuild')]
+        self.assertEqual(u'7', build.to_python_object())
+        self.assertIsNone(results[r'\\host7'].values[(constants.HKEY_LOCAL_MACHINE, CURRENT_VERSION, u'Missing')])
+        self.assertEqual(0, results[r'\\host7'].values[(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor0',
+                                                        u'Name')].to_python_object())
+        self.assertEqual([errors.RemoteRegistryConnectionFailed] * 2,
+                         [type(error) for error in results[r'\\host3'].errors.values()])
+        self.assertEqual({(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor0'): errors.AccessDeniedException},
+                         dict((key, type(error)) for key, error in results[r'\\host5'].errors.items()))
+        self.assertEqual(8, len([result for result in results.values() if result.ok]))
+
+    def test_concurrency_limits(self):
+        queries = [Query(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor%d' % name, [u'Name']) for name in range(4)]
+        results = list(query_fleet(self.hosts, queries, max_workers=6, max_per_host=2, backend=self.backend))
+        self.assertEqual(10, len(results))
+        self.assertLessEqual(max(self.backend.max_running.values()), 2)
+        self.assertLessEqual(self.backend.max_running_total, 6)
+
+    def test_closing_stops_the_queries(self):
+        self.backend.delay = 0.05
+        queries = [Query(constants.HKEY_LOCAL_MACHINE, CURRENT_VERSION, [u'CurrentBuild'])] * 10
+        threads = threading.active_count()
+        results = query_fleet(self.hosts, queries, max_workers=4, max_per_host=1, backend=self.backend)
+        next(results)
+        start = time.time()
+        results.close()
+        self.assertLess(time.time() - start, 0.05)
+        deadline = time.time() + 5
+        while threading.active_count() > threads and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(threads, threading.active_count())
+        # the unreachable computer finishes first, and the lanes of the others stop after their current query
+        self.assertLess(self.backend.calls, len(queries))
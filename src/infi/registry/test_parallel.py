@@ -0,0 +1,75 @@
+import threading
+import unittest
+import mock
+from . import LocalComputer, RegistryComputer, constants, errors
+from .cache import ConnectionPool
+from .interface.memory import InMemoryBackend
+from .parallel import parallel_walk
+
+class ParallelWalkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        for vendor in range(4):
+            for product in range(3):
+                for component in range(2):
+                    path = r'SOFTWARE\Vendor%d\Product%d\Component%d' % (vendor, product, component)
+                    self.backend.populate(constants.HKEY_LOCAL_MACHINE, path, {u'Path': path})
+        self.computer = LocalComputer(sam=constants.KEY_READ, backend=self.backend)
+        self.key = self.computer.local_machine[r'SOFTWARE']
+
+    def _paths(self, items):
+        return [path for path, subkey_names, values in items]
+
+    def test_ordered_walk_is_like_walk(self):
+        expected = [(path, subkey_names, [(name, value.to_python_object()) for name, value in values])
+                    for path, subkey_names, values in self.key.walk()]
+        for split_depth in (1, 2, 3):
+            walked = [(path, subkey_names, [(name, value.to_python_object()) for name, value in values])
+                      for path, subkey_names, values in parallel_walk(self.key, split_depth=split_depth)]
+            self.assertEqual(expected, walked)
+
+    def test_unordered_walk(self):
+        expected = self._paths(self.key.walk())
+        walked = self._paths(parallel_walk(self.key, workers=3, ordered=False, queue_size=2))
+        self.assertEqual(sorted(expected), sorted(walked))
+
+    def test_max_depth_and_prune(self):
+        for max_depth in (0, 1, 2):
+            self.assertEqual(self._paths(self.key.walk(max_depth=max_depth)),
+                             self._paths(parallel_walk(self.key, max_depth=max_depth, split_depth=2)))
+
+        def prune(path):
+            return path.endswith('Product1') or path.endswith('Vendor2')
+        self.assertEqual(self._paths(self.key.walk(prune=prune)), self._paths(parallel_walk(self.key, prune=prune)))
+
+    def test_errors(self):
+        self.backend.restrict(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor1\Product2', 0)
+        self.assertRaises(errors.AccessDeniedException, list, parallel_walk(self.key))
+        denied = []
+        paths = self._paths(parallel_walk(self.key, onerror=denied.append))
+        self.assertEqual(self._paths(self.key.walk(onerror=lambda error: None)), paths)
+        self.assertEqual(1, len(denied))
+
+    def test_workers_stop_when_the_walk_is_closed(self):
+        threads = threading.active_count()
+        walk = parallel_walk(self.key, workers=4, queue_size=1)
+        next(walk)
+        walk.close()
+        self.assertEqual(threads, threading.active_count())
+        del walk
+        # only the handles of the hive and of SOFTWARE are left
+        self.assertEqual(2, self.backend.open_handles)
+
+    def test_workers_share_the_connection_pool(self):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor0\Product0', machineName=r'\\host')
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor1\Product0', machineName=r'\\host')
+        pool = ConnectionPool()
+        computer = RegistryComputer(r'\\host', constants.KEY_READ, self.backend, connection_pool=pool)
+        handles = self.backend.open_handles
+        with mock.patch.object(self.backend, 'RegConnectRegistry', wraps=self.backend.RegConnectRegistry) as connect:
+            key = computer.local_machine[r'SOFTWARE']
+            self.assertEqual(5, len(list(parallel_walk(key, workers=2))))
+        self.assertEqual(1, connect.call_count)
+        del key
+        # the pooled connection is the only handle left, so the hives of the workers were closed
+        self.assertEqual(handles + 1, self.backend.open_handles)
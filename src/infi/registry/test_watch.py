@@ -0,0 +1,133 @@
+import gc
+import threading
+import unittest
+import mock
+from . import LocalComputer, constants, errors, watch as watch_module
+from .interface.memory import InMemoryBackend
+from .watch import KeyChange, Watcher, get_default_watcher
+
+TIMEOUT = 5
+
+class WatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        for index in range(8):
+            self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor\Product%d\Settings' % index)
+        self.hive = LocalComputer(backend=self.backend).local_machine
+        self.handles = self.backend.open_handles
+        self.watcher = Watcher(self.backend)
+
+    def tearDown(self):
+        self.watcher.close()
+        gc.collect()
+        self.assertEqual(self.handles, self.backend.open_handles)
+
+    def _set_value(self, path, name=u'Name', value=u'value'):
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, path, {name: value})
+
+    def test_changes_are_yielded(self):
+        key = self.hive[r'SOFTWARE\Vendor\Product0']
+        watch = self.watcher.watch(key)
+        self._set_value(r'SOFTWARE\Vendor\Product0')
+        self.assertEqual(KeyChange(key, r'SOFTWARE\Vendor\Product0'), watch.get(TIMEOUT))
+        self._set_value(r'SOFTWARE\Vendor\Product0\Settings')
+        self.assertEqual(r'SOFTWARE\Vendor\Product0', watch.get(TIMEOUT).path)
+        watch.close()
+        self.assertEqual([], list(watch))
+
+    def test_callback(self):
+        changes = []
+        changed = threading.Event()
+
+        def callback(change):
+            changes.append(change.path)
+            changed.set()
+        self.hive[r'SOFTWARE\Vendor'].watch(callback=callback, watcher=self.watcher)
+        self.hive[r'SOFTWARE\Vendor\Product1\Settings'].values_store[u'Name'] = u'value'
+        self.assertTrue(changed.wait(TIMEOUT))
+        self.assertEqual([r'SOFTWARE\Vendor'], changes)
+
+    def test_failing_callback_does_not_stop_the_watcher(self):
+        def callback(change):
+            raise ZeroDivisionError()
+        watch = self.watcher.watch(self.hive[r'SOFTWARE\Vendor\Product0'], callback=callback)
+        with mock.patch.object(watch_module.logger, 'exception') as exception:
+            for _ in range(2):
+                self._set_value(r'SOFTWARE\Vendor\Product0')
+                self.assertIsNotNone(watch.get(TIMEOUT))
+        self.assertEqual(2, exception.call_count)
+
+    def test_subtree_and_filter(self):
+        key = self.hive[r'SOFTWARE\Vendor\Product0']
+        values_only = self.watcher.watch(key, subtree=False, filter=constants.REG_NOTIFY_CHANGE_LAST_SET)
+        names_only = self.watcher.watch(key, subtree=False, filter=constants.REG_NOTIFY_CHANGE_NAME)
+        self._set_value(r'SOFTWARE\Vendor\Product0\Settings')
+        self.backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Vendor\Product0\New')
+        self.assertIsNotNone(names_only.get(TIMEOUT))
+        self.assertIsNone(values_only.get(0.1))
+        self._set_value(r'SOFTWARE\Vendor\Product0')
+        self.assertIsNotNone(values_only.get(TIMEOUT))
+        self.assertIsNone(names_only.get(0.1))
+
+    def test_many_keys_on_one_thread(self):
+        self.watcher = Watcher(self.backend, batch_size=3)
+        threads = threading.active_count()
+        watches = [self.watcher.watch(self.hive[r'SOFTWARE\Vendor\Product%d' % index]) for index in range(8)]
+        self.assertEqual(threads + 1, threading.active_count())
+        for index in reversed(range(8)):
+            self._set_value(r'SOFTWARE\Vendor\Product%d\Settings' % index)
+        for index, watch in enumerate(watches):
+            self.assertEqual(r'SOFTWARE\Vendor\Product%d' % index, watch.get(TIMEOUT).path)
+        self.assertEqual(8, self.watcher.changes)
+
+    def test_busy_key_does_not_starve_other_batches(self):
+        self.watcher = Watcher(self.backend, batch_size=1, slice=0.05)
+        busy, quiet = [self.watcher.watch(self.hive[r'SOFTWARE\Vendor\Product%d' % index]) for index in range(2)]
+        stopped = threading.Event()
+
+        def change_busy_key():
+            while not stopped.is_set():
+                self._set_value(r'SOFTWARE\Vendor\Product0')
+                stopped.wait(0.005)
+        thread = threading.Thread(target=change_busy_key)
+        thread.start()
+        try:
+            self.assertIsNotNone(busy.get(TIMEOUT))
+            self._set_value(r'SOFTWARE\Vendor\Product1')
+            self.assertEqual(r'SOFTWARE\Vendor\Product1', quiet.get(1).path)
+        finally:
+            stopped.set()
+            thread.join()
+
+    def test_deleted_key_ends_the_watch(self):
+        watch = self.watcher.watch(self.hive[r'SOFTWARE\Vendor\Product0\Settings'])
+        del self.hive[r'SOFTWARE\Vendor\Product0'][u'Settings']
+        self.assertEqual([r'SOFTWARE\Vendor\Product0\Settings'], [change.path for change in watch])
+        self.assertTrue(watch.closed)
+        self.assertIsInstance(watch.error, errors.RegistryBaseException)
+
+    def test_thread_stops_when_nothing_is_watched(self):
+        watch = self.watcher.watch(self.hive[r'SOFTWARE\Vendor'])
+        thread = self.watcher._thread
+        watch.close()
+        thread.join(TIMEOUT)
+        self.assertFalse(thread.is_alive())
+        with self.watcher.watch(self.hive[r'SOFTWARE\Vendor']) as watch:
+            self._set_value(r'SOFTWARE\Vendor')
+            self.assertIsNotNone(watch.get(TIMEOUT))
+        self.assertIsNone(watch.get())
+
+    def test_default_watcher(self):
+        self.assertIs(get_default_watcher(self.backend), get_default_watcher(self.backend))
+        watch = self.hive[r'SOFTWARE\Vendor'].watch()
+        self.assertIs(get_default_watcher(self.backend), watch._watcher)
+        watch.close()
+        get_default_watcher(self.backend).close()
+
+    def test_default_watcher_is_dropped_with_its_backend(self):
+        backend = InMemoryBackend()
+        get_default_watcher(backend)
+        watchers = len(watch_module._default_watchers)
+        del backend
+        gc.collect()
+        self.assertEqual(watchers - 1, len(watch_module._default_watchers))
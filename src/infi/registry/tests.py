@@ -1,5 +1,6 @@
 from six import text_type
 import logging
+import operator
 import unittest
 import mock
 from munch import Munch
@@ -11,6 +12,7 @@ from . import LocalComputer
 from .key import KeyStore, ValueStore, RegistryHive
 from .value import RegistryValueFactory, RegistryValue
 from . import constants, errors, dtypes
+from .interface.memory import InMemoryBackend
 
 class MockedInterface(object):
     def __init__(self, func_name):
@@ -58,21 +60,13 @@ class LocalMachineTestCase(TestCase):
         self.assertIsInstance(reg[r'SOFTWARE\Microsoft\Windows'], KeyStore)
         self.assertIsInstance(reg[r'SOFTWARE\Microsoft\Windows NT'], KeyStore)
 
-    def _walk_on_key(self, key, level=0):
-        logging.debug('%s%s' % ('.' * level, key._relapath,))
-        try:
-            for subkey in key.itervalues():
-                try:
-                    self._walk_on_key(subkey, level + 1)
-                except (errors.AccessDeniedException, KeyError):
-                    pass
-        except errors.AccessDeniedException:
-            pass
-        try:
-            for value in key.values_store.itervalues():
-                pass
-        except errors.AccessDeniedException:
-            pass
+    def _ignore_missing_and_denied_keys(self, error):
+        if not isinstance(error, (errors.AccessDeniedException, KeyError)):
+            raise error
+
+    def _walk_on_key(self, key):
+        for path, subkey_names, values in key.walk(onerror=self._ignore_missing_and_denied_keys):
+            logging.debug(path)
 
     def test_walk_1(self):
         hive = self._get_computer(constants.KEY_READ).local_machine
@@ -103,18 +97,18 @@ class LocalMachineTestCase(TestCase):
     def test_iterkeys(self):
         key = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion']
         for item in key.iterkeys():
-            self.assertEqual(type(item), unicode)
+            self.assertEqual(type(item), text_type)
             self.assertGreater(len(item), 0)
         for item in key.iterkeys():
-            self.assertEqual(type(item), unicode)
+            self.assertEqual(type(item), text_type)
             self.assertGreater(len(item), 0)
 
     def test_keys(self):
         key = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion']
         self.assertEqual(len(key.keys()), len([item for item in key.iterkeys()]))
-        self.assertIsInstance(key.keys()[0], unicode)
+        self.assertIsInstance(key.keys()[0], text_type)
         self.assertEqual(len(key.values_store.keys()), len([item for item in key.values_store.iterkeys()]))
-        self.assertIsInstance(key.values_store.keys()[0], unicode)
+        self.assertIsInstance(key.values_store.keys()[0], text_type)
 
     def test_itervalues(self):
         key = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion']
@@ -192,6 +186,7 @@ class MockLocalMachineTestCase(LocalMachineTestCase):
         self._mocks.query_info_key = MockedInterface('RegQueryInfoKey')
         self._mocks.enum_key = MockedInterface('RegEnumKeyEx')
         self._mocks.enum_value = MockedInterface('RegEnumValue')
+        self._mocks.enum_values = MockedInterface('RegEnumValues')
 
     def _start_all_mocks(self):
         for mock in self._mocks.itervalues():
@@ -246,6 +241,7 @@ class MockLocalMachineTestCase(LocalMachineTestCase):
         value = RegistryValueFactory().by_value(u'someValue')
         self._mocks.enum_key.mock.return_value = u'someKey'
         self._mocks.enum_value.mock.return_value = u'someName', value
+        self._mocks.enum_values.mock.side_effect = lambda key: iter([(u'someName', value)] * 10)
 
     def test_iteritems(self):
         self._prepare_mocks_for_iteration_tests()
@@ -272,3 +268,325 @@ class MockLocalMachineTestCase(LocalMachineTestCase):
         LocalMachineTestCase.test_values(self)
 
     # TODO add tests that check the dict-wrap
+
+class InMemoryLocalMachineTestCase(LocalMachineTestCase):
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    def setUp(self):
+        self._backend = InMemoryBackend()
+        self._populate_backend()
+        LocalMachineTestCase.setUp(self)
+
+    def _populate_backend(self):
+        current_version = r'SOFTWARE\Microsoft\Windows NT\CurrentVersion'
+        self._backend.populate(constants.HKEY_LOCAL_MACHINE, current_version,
+                               {u'CurrentVersion': u'6.3', u'CurrentBuild': u'9600',
+                                u'SystemRoot': u'C:\\WINDOWS', u'InstallDate': 1400000000})
+        for name in (u'Fonts', u'Terminal Server', u'Winlogon'):
+            self._backend.populate(constants.HKEY_LOCAL_MACHINE, '\\'.join([current_version, name]))
+        self._backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows\CurrentVersion')
+        self._backend.populate(constants.HKEY_LOCAL_MACHINE, r'SYSTEM\CurrentControlSet\Services\Netlogon',
+                               {u'ObjectName': u'LocalSystem', u'Start': 3})
+
+    def _get_computer(self, sam=constants.KEY_READ):
+        return LocalComputer(sam=sam, backend=self._backend)
+
+    def test_getitem_for_missing_key(self):
+        self.assertRaises(KeyError, self._computer.local_machine.__getitem__, r'SOFTWARE\DoesNotExist')
+
+    def test_write_with_read_only_permissions(self):
+        key = self._computer.local_machine[r'SYSTEM\CurrentControlSet\Services\Netlogon']
+        self.assertRaises(errors.AccessDeniedException, key.values_store.__setitem__, u'Start', 4)
+        self.assertEqual(3, key.values_store[u'Start'].to_python_object())
+
+    def test_case_insensitive_lookups(self):
+        key = self._computer.local_machine[r'system\currentcontrolset\services\NETLOGON']
+        self.assertEqual(u'LocalSystem', key.values_store[u'objectname'].to_python_object())
+        self.assertEqual([u'Netlogon'], self._computer.local_machine[r'SYSTEM\CurrentControlSet\SERVICES'].keys())
+
+    def test_handles_are_closed(self):
+        key = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion']
+        self.assertGreater(self._backend.open_handles, 0)
+        key.items()
+        del key
+        self.assertEqual(0, self._backend.open_handles)
+
+    def test_read_value(self):
+        hive = self._computer.local_machine
+        handles = self._backend.open_handles
+        value = hive.read_value(r'SYSTEM\CurrentControlSet\Services\Netlogon', u'ObjectName')
+        self.assertEqual(u'LocalSystem', value.to_python_object())
+        self.assertEqual(handles, self._backend.open_handles)
+        self.assertRaises(KeyError, hive.read_value, r'SYSTEM\CurrentControlSet\Services\Netlogon', u'Missing')
+        self.assertRaises(KeyError, hive.read_value, r'SYSTEM\DoesNotExist', u'ObjectName')
+
+    def test_read_values(self):
+        values = self._computer.local_machine.read_values([(r'SYSTEM\CurrentControlSet\Services\Netlogon', u'Start'),
+                                                           (r'SYSTEM\DoesNotExist', u'Start'),
+                                                           (r'SOFTWARE\Microsoft\Windows NT\CurrentVersion',
+                                                            u'CurrentBuild')])
+        self.assertEqual([3, None, u'9600'], [value and value.to_python_object() for value in values])
+
+    def test_write_values(self):
+        hive = self._get_computer(constants.KEY_ALL_ACCESS).local_machine
+        values = {(r'SOFTWARE\Vendor\Product', u'Name'): u'product',
+                  (r'SOFTWARE\Vendor\Product', u'Version'): RegistryValueFactory().by_type(constants.REG_QWORD)(1),
+                  (r'SOFTWARE\Vendor\Other', u'Name'): u'other'}
+        with mock.patch.object(self._backend, 'RegCreateKeyEx', wraps=self._backend.RegCreateKeyEx) as create_key:
+            hive.write_values(values)
+        self.assertEqual(1, create_key.call_count)
+        for (path, name), value in values.items():
+            expected = value.to_python_object() if isinstance(value, RegistryValue) else value
+            self.assertEqual(expected, hive.read_value(path, name).to_python_object())
+        self.assertEqual(constants.REG_QWORD, hive.read_value(r'SOFTWARE\Vendor\Product', u'Version').registry_type)
+        del hive
+        self.assertEqual(0, self._backend.open_handles)
+
+    def test_write_values_read_only(self):
+        hive = self._computer.local_machine
+        self.assertRaises(errors.AccessDeniedException, hive.write_values, {(r'SOFTWARE\Vendor', u'Name'): u'x'})
+
+    def test_enumerated_keys_are_opened_lazily(self):
+        for index in range(100):
+            self._backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Uninstall\Product%d' % index,
+                                   {u'DisplayName': u'Product %d' % index})
+        uninstall = self._computer.local_machine[r'SOFTWARE\Uninstall']
+        with mock.patch.object(self._backend, 'RegOpenKeyEx', wraps=self._backend.RegOpenKeyEx) as open_key:
+            names = [key.values_store[u'DisplayName'].to_python_object()
+                     for name, key in uninstall.iteritems() if name.endswith('7')]
+        self.assertEqual(10, len(names))
+        self.assertEqual(10, open_key.call_count)
+
+    def test_exists_and_open(self):
+        software = self._computer.local_machine[r'SOFTWARE']
+        self.assertTrue(KeyStore(software, u'Microsoft').exists())
+        missing = KeyStore(software, u'DoesNotExist')
+        self.assertFalse(missing.exists())
+        self.assertRaises(KeyError, missing.open)
+        self.assertRaises(KeyError, len, missing)
+
+    def _populate_deep_key(self, depth):
+        self._backend.populate(constants.HKEY_LOCAL_MACHINE,
+                               '\\'.join([u'SOFTWARE', u'Deep'] + [u'Level%d' % index for index in range(depth)]))
+
+    def _walk_to_deepest_key(self, computer, depth):
+        key = computer.local_machine[r'SOFTWARE\Deep']
+        for index in range(depth):
+            key = next(key.itervalues()).open()
+        return key
+
+    def test_detached_keys_do_not_hold_ancestor_handles(self):
+        self._populate_deep_key(50)
+        key = self._walk_to_deepest_key(self._get_computer(), 50)
+        self.assertEqual(52, self._backend.open_handles)
+        del key
+        key = self._walk_to_deepest_key(LocalComputer(sam=constants.KEY_READ, backend=self._backend,
+                                                      detached_keys=True), 50)
+        self.assertEqual(2, self._backend.open_handles)
+        self.assertEqual(u'SOFTWARE\\Deep\\' + u'\\'.join(u'Level%d' % index for index in range(50)), key._abspath)
+        self.assertEqual(0, len(key.keys()))
+
+    def test_detached_keys_do_not_hold_ancestor_objects(self):
+        import gc
+        import tracemalloc
+        retained = []
+        for detached_keys in (False, True):
+            computer = LocalComputer(sam=constants.KEY_READ, backend=InMemoryBackend(), detached_keys=detached_keys)
+            self._backend = computer._backend
+            self._populate_deep_key(200)
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            key = self._walk_to_deepest_key(computer, 200)
+            gc.collect()
+            retained.append(tracemalloc.get_traced_memory()[0] - before)
+            tracemalloc.stop()
+            del key
+        self.assertLess(retained[1] * 2, retained[0])
+
+    def test_detached_keys_open_from_cached_ancestor(self):
+        from .cache import HandleCache
+        computer = LocalComputer(sam=constants.KEY_READ, backend=self._backend, handle_cache=HandleCache(),
+                                 detached_keys=True)
+        current_version = computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion']
+        with mock.patch.object(self._backend, 'RegOpenKeyEx', wraps=self._backend.RegOpenKeyEx) as open_key:
+            current_version[u'Fonts']
+        open_key.assert_called_once_with(current_version._handle, u'Fonts', constants.KEY_READ)
+
+    def _walk_paths(self, key, **kwargs):
+        return [path for path, subkey_names, values in key.walk(**kwargs)]
+
+    def test_walk_top_down(self):
+        key = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT']
+        walked = list(key.walk())
+        self.assertEqual([r'SOFTWARE\Microsoft\Windows NT', r'SOFTWARE\Microsoft\Windows NT\CurrentVersion',
+                          r'SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts',
+                          r'SOFTWARE\Microsoft\Windows NT\CurrentVersion\Terminal Server',
+                          r'SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon'], [item[0] for item in walked])
+        path, subkey_names, values = walked[1]
+        self.assertEqual([u'Fonts', u'Terminal Server', u'Winlogon'], subkey_names)
+        self.assertEqual(u'6.3', dict(values)[u'CurrentVersion'].to_python_object())
+
+    def test_walk_bottom_up(self):
+        paths = self._walk_paths(self._computer.local_machine[r'SYSTEM'], topdown=False)
+        self.assertEqual([r'SYSTEM\CurrentControlSet\Services\Netlogon', r'SYSTEM\CurrentControlSet\Services',
+                          r'SYSTEM\CurrentControlSet', r'SYSTEM'], paths)
+
+    def test_walk_max_depth_and_prune(self):
+        hive = self._computer.local_machine
+        self.assertEqual([u'', u'SOFTWARE', u'SYSTEM'], self._walk_paths(hive, max_depth=1))
+        self.assertEqual([u''], self._walk_paths(hive, max_depth=0))
+        paths = self._walk_paths(hive, prune=lambda path: path.lower() == 'software')
+        self.assertEqual([u'', u'SYSTEM', r'SYSTEM\CurrentControlSet', r'SYSTEM\CurrentControlSet\Services',
+                          r'SYSTEM\CurrentControlSet\Services\Netlogon'], paths)
+
+    def test_walk_skips_removed_subkey_names(self):
+        paths = []
+        for path, subkey_names, values in self._computer.local_machine.walk():
+            paths.append(path)
+            if u'Microsoft' in subkey_names:
+                subkey_names.remove(u'Microsoft')
+        self.assertEqual([u'', u'SOFTWARE', u'SYSTEM'], paths[:3])
+        self.assertEqual(6, len(paths))
+
+    def test_walk_access_denied(self):
+        self._backend.restrict(constants.HKEY_LOCAL_MACHINE, r'SYSTEM\CurrentControlSet', 0)
+        hive = self._computer.local_machine
+        self.assertRaises(errors.AccessDeniedException, list, hive.walk())
+        denied = []
+        paths = self._walk_paths(hive, onerror=denied.append)
+        self.assertEqual(11, len(paths))
+        self.assertNotIn(r'SYSTEM\CurrentControlSet', paths)
+        self.assertEqual([errors.AccessDeniedException], [type(error) for error in denied])
+
+    def test_walk_holds_a_handle_per_level(self):
+        # the hive, and the five levels down to SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts
+        handles = []
+        for path, subkey_names, values in self._computer.local_machine.walk():
+            handles.append(self._backend.open_handles)
+        self.assertEqual(6, max(handles))
+
+    def test_values_snapshot(self):
+        values_store = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion'].values_store
+        snapshot = values_store.snapshot()
+        self.assertEqual(4, len(snapshot))
+        self.assertEqual([u'CurrentVersion', u'CurrentBuild', u'SystemRoot', u'InstallDate'], list(snapshot))
+        self.assertEqual(u'6.3', snapshot[u'currentversion'].to_python_object())
+        self.assertRaises(KeyError, snapshot.__getitem__, u'Missing')
+        self.assertRaises(TypeError, operator.setitem, snapshot, u'CurrentVersion', u'10.0')
+
+    def test_get_many_enumerates_small_keys(self):
+        values_store = self._computer.local_machine[r'SOFTWARE\Microsoft\Windows NT\CurrentVersion'].values_store
+        with mock.patch.object(self._backend, 'RegQueryValueEx', wraps=self._backend.RegQueryValueEx) as query:
+            values = values_store.get_many([u'CurrentVersion', u'Missing'], default=0)
+        self.assertFalse(query.called)
+        self.assertEqual(u'6.3', values[u'CurrentVersion'].to_python_object())
+        self.assertEqual(0, values[u'Missing'])
+
+    def test_get_many_queries_large_keys(self):
+        self._backend.populate(constants.HKEY_LOCAL_MACHINE, r'SOFTWARE\Large',
+                               dict((u'Value%d' % index, index) for index in range(10)))
+        values_store = self._computer.local_machine[r'SOFTWARE\Large'].values_store
+        with mock.patch.object(self._backend, 'RegEnumValues', wraps=self._backend.RegEnumValues) as enum_values:
+            values = values_store.get_many([u'value3', u'Missing'])
+        self.assertFalse(enum_values.called)
+        self.assertEqual({u'value3': 3, u'Missing': None},
+                         dict((name, value and value.to_python_object()) for name, value in values.items()))
+        self.assertEqual({}, values_store.get_many([]))
+
+    def _get_netlogon_values(self, sam=constants.KEY_ALL_ACCESS):
+        return self._get_computer(sam).local_machine[r'SYSTEM\CurrentControlSet\Services\Netlogon'].values_store
+
+    def test_update_writes_only_changed_values(self):
+        values_store = self._get_netlogon_values()
+        with mock.patch.object(self._backend, 'RegSetValueEx', wraps=self._backend.RegSetValueEx) as set_value, \
+                mock.patch.object(self._backend, 'RegFlushKey', wraps=self._backend.RegFlushKey) as flush_key:
+            values_store.update({u'objectname': u'LocalSystem', u'Start': 2}, Type=32)
+            values_store.update([(u'Start', RegistryValueFactory().by_value(2))])
+        self.assertEqual([u'Start', u'Type'], [call[0][1] for call in set_value.call_args_list])
+        self.assertEqual(1, flush_key.call_count)
+        self.assertEqual(2, values_store[u'Start'].to_python_object())
+        self.assertEqual(32, values_store[u'Type'].to_python_object())
+
+    def test_update_with_another_type_is_written(self):
+        values_store = self._get_netlogon_values()
+        values_store.update({u'Start': RegistryValueFactory().by_type(constants.REG_QWORD)(3)})
+        self.assertEqual(constants.REG_QWORD, values_store[u'Start'].registry_type)
+
+    def test_setdefault_copy_and_popitem(self):
+        values_store = self._get_netlogon_values()
+        self.assertEqual(3, values_store.setdefault(u'Start', 4).to_python_object())
+        self.assertEqual(u'x', values_store.setdefault(u'New', u'x').to_python_object())
+        self.assertEqual([u'LocalSystem', 3, u'x'],
+                         [value.to_python_object() for value in values_store.copy().values()])
+        popped = [values_store.popitem()[0] for _ in range(3)]
+        self.assertEqual([u'ObjectName', u'Start', u'New'], popped)
+        self.assertRaises(KeyError, values_store.popitem)
+
+    def test_iterraw(self):
+        values_store = self._get_netlogon_values()
+        with mock.patch.object(RegistryValue, '__init__') as init:
+            raw = list(values_store.iterraw())
+        self.assertFalse(init.called)
+        self.assertEqual([(u'ObjectName', constants.REG_SZ), (u'Start', constants.REG_DWORD)],
+                         [(name, value_type) for name, value_type, data in raw])
+        self.assertEqual(b'\x03\x00\x00\x00', raw[1][2])
+
+    def test_readinto_and_read_raw(self):
+        values_store = self._get_netlogon_values()
+        values_store[u'Blob'] = b'\x01\x02' * 1000
+        buffer = bytearray(4000)
+        self.assertEqual((constants.REG_BINARY, 2000), values_store.readinto(u'Blob', buffer))
+        self.assertEqual(b'\x01\x02' * 1000, bytes(buffer[:2000]))
+        with self.assertRaises(errors.BufferTooSmallException) as context:
+            values_store.readinto(u'Blob', bytearray(10))
+        self.assertEqual((2000, 10), (context.exception.required_size, context.exception.size))
+        self.assertIn('2000 bytes', str(context.exception))
+        self.assertRaises(TypeError, values_store.readinto, u'Blob', b'read-only')
+        self.assertRaises(KeyError, values_store.readinto, u'Missing', buffer)
+        self.assertEqual((constants.REG_BINARY, b'\x01\x02' * 1000), values_store.read_raw(u'Blob'))
+        self.assertEqual((constants.REG_DWORD, b'\x03\x00\x00\x00'), values_store.read_raw(u'Start'))
+
+    def test_missing_values_are_not_raised(self):
+        values_store = self._get_netlogon_values()
+        with mock.patch.object(self._backend, 'RegQueryValueEx', wraps=self._backend.RegQueryValueEx) as query:
+            self.assertEqual(0, values_store.get(u'Missing', 0))
+            self.assertNotIn(u'Missing', values_store)
+            self.assertIn(u'start', values_store)
+            self.assertEqual(3, values_store.pop(u'Start').to_python_object())
+            self.assertEqual(None, values_store.pop(u'Start', None))
+        self.assertEqual(5, query.call_count)
+        self.assertTrue(all(call[0][2] is None for call in query.call_args_list))
+        self.assertRaises(KeyError, values_store.pop, u'Start')
+        missing_key = KeyStore(self._get_computer().local_machine, path=u'SOFTWARE\\Missing')
+        self.assertEqual(0, ValueStore(missing_key).get(u'Name', 0))
+
+    def test_transaction_commit(self):
+        hive = self._get_computer(constants.KEY_ALL_ACCESS).local_machine
+        other_hive = self._get_computer().local_machine
+        with hive.transaction():
+            hive[u'SOFTWARE'][u'Vendor'] = None
+            hive[r'SOFTWARE\Vendor'].values_store.update(Name=u'product', Version=2)
+            hive.write_values({(r'SOFTWARE\Vendor\Product', u'Name'): u'other'})
+            del hive[r'SYSTEM\CurrentControlSet\Services\Netlogon']
+            self.assertEqual(2, hive[r'SOFTWARE\Vendor'].values_store[u'Version'].to_python_object())
+            self.assertEqual([], hive[r'SYSTEM\CurrentControlSet\Services'].keys())
+            self.assertRaises(KeyError, other_hive.__getitem__, r'SOFTWARE\Vendor')
+            self.assertEqual([u'Netlogon'], other_hive[r'SYSTEM\CurrentControlSet\Services'].keys())
+        self.assertEqual(u'product', other_hive.read_value(r'SOFTWARE\Vendor', u'Name').to_python_object())
+        self.assertEqual(u'other', other_hive.read_value(r'SOFTWARE\Vendor\Product', u'Name').to_python_object())
+        self.assertEqual([], other_hive[r'SYSTEM\CurrentControlSet\Services'].keys())
+
+    def test_transaction_rollback(self):
+        hive = self._get_computer(constants.KEY_ALL_ACCESS).local_machine
+        with self.assertRaises(ZeroDivisionError):
+            with hive.transaction():
+                hive[r'SYSTEM\CurrentControlSet\Services\Netlogon'].values_store[u'Start'] = 4
+                hive[u'SOFTWARE'][u'Vendor'] = None
+                1 / 0
+        self.assertEqual(3, hive.read_value(r'SYSTEM\CurrentControlSet\Services\Netlogon', u'Start').to_python_object())
+        self.assertRaises(KeyError, hive.__getitem__, r'SOFTWARE\Vendor')
+        del hive
+        self.assertEqual(0, self._backend.open_handles)
@@ -1,12 +1,56 @@
 from six import integer_types, string_types
+import codecs
 import logging
-from ctypes import addressof, sizeof, c_wchar, create_unicode_buffer
+import struct
+from ctypes import Array, sizeof, c_wchar
 from ctypes import c_byte as BYTE
 from . import constants
 
 
 INTERVAL = sizeof(c_wchar)
 
+# strings are stored as wide characters, which are UTF-16 on Windows
+WCHAR_ENCODING = 'utf-16-le' if INTERVAL == 2 else 'utf-32-le'
+_decode_wchars = codecs.getdecoder(WCHAR_ENCODING)
+_encode_wchars = codecs.getencoder(WCHAR_ENCODING)
+
+def decode_sz(data):
+    """ Decodes data, a bytes-like object of wide characters, in one step, without copying it first.
+    A terminating NUL is removed, and trailing bytes that do not make a whole character are ignored.
+    """
+    view = memoryview(data)
+    value = _decode_wchars(view[:len(view) - len(view) % INTERVAL])[0]
+    return value[:-1] if value.endswith(u'\x00') else value
+
+def decode_multi_sz(data):
+    """ Decodes data, a bytes-like object of NUL-terminated wide character strings, into a list of the strings.
+    Empty strings, including the one that terminates the list, are left out.
+    """
+    return [string for string in decode_sz(data).split(u'\x00') if string]
+
+def encode_sz(value):
+    """ Returns the bytes of value as a NUL-terminated wide character string
+    """
+    return _encode_wchars(value + u'\x00')[0]
+
+def encode_multi_sz(strings):
+    """ Returns the bytes of the non-empty strings as NUL-terminated wide character strings,
+    followed by the NUL that terminates the list
+    """
+    return _encode_wchars(u''.join(string + u'\x00' for string in strings if string) + u'\x00')[0]
+
+def _to_byte_array(data):
+    return (BYTE * len(data)).from_buffer_copy(data)
+
+def _buffer_to_byte_array(data):
+    # writable buffers are shared with the array, but ctypes cannot share read-only ones, such as bytes,
+    # so they are copied once
+    view = memoryview(data)
+    factory = BYTE * view.nbytes
+    return factory.from_buffer_copy(view) if view.readonly else factory.from_buffer(view)
+
+_NOT_DECODED = object()
+
 class RegistryValue(object):
     """ A registry value can store data in various formats.
     This class and its sub-class helps translate registry values and their Python objects.
@@ -16,18 +60,26 @@ class RegistryValue(object):
     -------------------------------------------------|-------|
     | REG_BINARY             | (int, )               | 32bit |
     | REG_DWORD              | int                   |       |
+    | REG_DWORD_BIG_ENDIAN   | int                   |       |
     | REG_EXPAND_SZ          | unicode               |       |
     | REG_LINK               | unicode               |       |
     | REG_MULTI_SZ           | [unicode, ]           |       |
     | REG_QWORD              | (int, )               | 64bit |
     | REG_SZ                 | unicode               |       |
+
+    Binary values can be read as bytes or memoryview instead of tuples, see RegistryValueFactory.
     """
 
     def __init__(self, value):
-        from ctypes import Array
-        self._value = self.from_byte_array(value) if isinstance(value, Array) else value
+        if isinstance(value, Array):
+            # the data is decoded the first time the Python object is asked for, and is written back as it is
+            self._byte_array, self._value = value, _NOT_DECODED
+        else:
+            self._byte_array, self._value = None, value
 
     def to_python_object(self):
+        if self._value is _NOT_DECODED:
+            self._value = self.from_byte_array(self._byte_array)
         return self._value
 
     @property
@@ -35,6 +87,11 @@ class RegistryValue(object):
         raise NotImplementedError # pragma: no cover
 
     def to_byte_array(self):
+        if self._byte_array is not None:
+            return self._byte_array
+        return self._encode()
+
+    def _encode(self):
         raise NotImplementedError # pragma: no cover
 
     def from_byte_array(self, byte_array):
@@ -45,17 +102,11 @@ class RegSz(RegistryValue):
     def registry_type(self):
         return constants.REG_SZ
 
-    def to_byte_array(self):
-        c_unicode_string = create_unicode_buffer(self._value)
-        factory = BYTE * sizeof(c_unicode_string)
-        byte_array = factory.from_buffer_copy(factory.from_address(addressof(c_unicode_string)))
-        return byte_array
+    def _encode(self):
+        return _to_byte_array(encode_sz(self._value))
 
     def from_byte_array(self, byte_array):
-        value = u''
-        for index in range(0, sizeof(byte_array) - INTERVAL, INTERVAL):
-            value += c_wchar.from_address(addressof(byte_array) + index).value
-        return value
+        return decode_sz(byte_array)
 
 class RegExpandSz(RegSz):
     @property
@@ -72,52 +123,40 @@ class RegMultiSz(RegistryValue):
     def registry_type(self):
         return constants.REG_MULTI_SZ
 
-    def to_byte_array(self):
-        strings = [x for x in self._value if len(x)]
-        value = (u'\x00'.join(strings) + u'\x00') if len(strings) else ''
-        c_unicode_string = create_unicode_buffer(value)
-        factory = BYTE * sizeof(c_unicode_string)
-        byte_array = factory.from_address(addressof(c_unicode_string))
-        return factory.from_buffer_copy(byte_array)
+    def _encode(self):
+        return _to_byte_array(encode_multi_sz(self._value))
 
     def from_byte_array(self, byte_array):
-        value = u''
-        for index in range(0, sizeof(byte_array) - INTERVAL, INTERVAL):
-            wide_character = c_wchar.from_address(addressof(byte_array) + index).value
-            value += wide_character
-        result = value.replace('\x00', u'\n').splitlines()
-        while u'' in result:
-            result.remove(u'')
-        return result
+        return decode_multi_sz(byte_array)
 
 class RegDword(RegistryValue):
-    _size_in_bytes = 4
+    _byte_order = '<'
+    _format = 'I'
+    _struct = struct.Struct(_byte_order + _format)
+    _mask = 2 ** 32 - 1
 
     @property
     def registry_type(self):
         return constants.REG_DWORD
 
-    def to_byte_array(self):
-        from ctypes import c_ubyte
-        ubyte_array = (c_ubyte * self._size_in_bytes)()
-        for index in range (0, self._size_in_bytes):
-            byte = (self._value >> index * 8) & 0xff
-            ubyte_array[index] = byte
-        factory = BYTE * self._size_in_bytes
-        return factory.from_buffer_copy(ubyte_array)
+    def _encode(self):
+        return _to_byte_array(self._struct.pack(self._value & self._mask))
 
     def from_byte_array(self, byte_array):
-        from ctypes import c_ubyte
-        factory = c_ubyte * self._size_in_bytes
-        ubyte_array = factory.from_buffer_copy(byte_array)
-        offset, number = (0, 0,)
-        for byte in ubyte_array:
-            number += byte << (offset * 8)
-            offset += 1
-        return number
+        return self._struct.unpack_from(byte_array)[0]
+
+class RegDwordBigEndian(RegDword):
+    _byte_order = '>'
+    _struct = struct.Struct(_byte_order + RegDword._format)
+
+    @property
+    def registry_type(self):
+        return constants.REG_DWORD_BIG_ENDIAN
 
 class RegQword(RegDword):
-    _size_in_bytes = 8
+    _format = 'Q'
+    _struct = struct.Struct(RegDword._byte_order + _format)
+    _mask = 2 ** 64 - 1
 
     @property
     def registry_type(self):
@@ -128,19 +167,14 @@ class RegBinary(RegistryValue):
     def registry_type(self):
         return constants.REG_BINARY
 
-    def to_byte_array(self):
-        from ctypes import c_ubyte
-        array_length = len(self._value)
-        ubyte_array = (c_ubyte * array_length)()
-        for index in range(0, array_length):
-            ubyte_array[index] = self._value[index]
-        factory = BYTE * sizeof(ubyte_array)
-        return factory.from_buffer_copy(ubyte_array)
+    def _encode(self):
+        value = self._value
+        if isinstance(value, (tuple, list)):
+            value = bytearray(value)
+        return _buffer_to_byte_array(value)
 
     def from_byte_array(self, byte_array):
-        from ctypes import c_ubyte
-        factory = c_ubyte * sizeof(byte_array)
-        return tuple([byte for byte in factory.from_buffer_copy(byte_array)])
+        return tuple(bytearray(memoryview(byte_array)))
 
 class RegNone(RegBinary):
     @property
@@ -162,13 +196,34 @@ class RegResourceRequirementsList(RegBinary):
     def registry_type(self):
         return constants.REG_RESOURCE_REQUIREMENTS_LIST
 
+class _AsBytes(object):
+    def from_byte_array(self, byte_array):
+        return bytes(memoryview(byte_array))
+
+class _AsMemoryview(object):
+    def from_byte_array(self, byte_array):
+        # the view keeps the array that the value was read into alive, instead of copying it
+        return memoryview(byte_array).cast('B').toreadonly()
+
+# the binary value classes, with their data read as bytes or memoryview instead of as tuples
+def _binary_classes(factory_dict, representation, suffix):
+    return dict((value_type, type(cls.__name__ + suffix, (representation, cls), {}))
+                for value_type, cls in factory_dict.items() if issubclass(cls, RegBinary))
 
 class RegistryValueFactory(object):
+    """ Makes RegistryValue objects by registry type, or by the type of a Python object.
+    binary_type is how binary values that are read are represented: tuple, a tuple of ints, which is the default,
+    bytes, or memoryview, a read-only view of the buffer that the value was read into.
+    Binary values can be written from any of them, or from any other object that supports the buffer protocol.
+    Writable buffers, such as bytearray, are written without being copied, and read-only ones, such as bytes,
+    are copied once.
+    """
     _FACTORY_DICT = {
         constants.REG_SZ: RegSz,
         constants.REG_EXPAND_SZ: RegExpandSz,
         constants.REG_MULTI_SZ: RegMultiSz,
         constants.REG_DWORD: RegDword,
+        constants.REG_DWORD_BIG_ENDIAN: RegDwordBigEndian,
         constants.REG_QWORD: RegQword,
         constants.REG_LINK: RegLink,
         constants.REG_BINARY: RegBinary,
@@ -177,13 +232,35 @@ class RegistryValueFactory(object):
         constants.REG_RESOURCE_LIST: RegResourcelist,
         constants.REG_RESOURCE_REQUIREMENTS_LIST: RegResourceRequirementsList, }
 
+    _BINARY_FACTORY_DICTS = {
+        tuple: {},
+        bytes: _binary_classes(_FACTORY_DICT, _AsBytes, 'Bytes'),
+        memoryview: _binary_classes(_FACTORY_DICT, _AsMemoryview, 'Memoryview'), }
+
+    def __init__(self, binary_type=tuple):
+        if binary_type not in self._BINARY_FACTORY_DICTS:
+            raise ValueError('binary_type must be tuple, bytes or memoryview')
+        self._binary_factory_dict = self._BINARY_FACTORY_DICTS[binary_type]
+
     def by_type(self, value_type, value=None):
         from ctypes import Array
-        factory = self._FACTORY_DICT[value_type]
+        factory = self._binary_factory_dict.get(value_type) or self._FACTORY_DICT[value_type]
         if value is None or isinstance(value, Array):
             return factory
         return factory(value)
 
+    def decode_many(self, value_type, payloads):
+        """ Returns a list of the Python objects of payloads, the data of values of value_type as bytes-like objects,
+        such as the ones that ValueStore.iterraw yields.
+        The payloads of fixed-width types, such as REG_DWORD, are decoded together, by a single struct call.
+        """
+        factory = self.by_type(value_type)
+        payloads = list(payloads)
+        if issubclass(factory, RegDword) and all(len(payload) == factory._struct.size for payload in payloads):
+            codec = struct.Struct('%s%d%s' % (factory._byte_order, len(payloads), factory._format))
+            return list(codec.unpack(b''.join(payloads)))
+        return [factory(_to_byte_array(payload)).to_python_object() for payload in payloads]
+
     def by_value(self, value, return_instance_instead_of_class=True):
         cls = None
         if isinstance(value, string_types):
@@ -196,6 +273,8 @@ class RegistryValueFactory(object):
                 if not isinstance(item, int):
                     raise TypeError
             cls = self.by_type(constants.REG_BINARY)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            cls = self.by_type(constants.REG_BINARY)
         elif isinstance(value, (list,)):
             for item in value:
                 if not isinstance(item, string_types):
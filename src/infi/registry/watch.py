@@ -0,0 +1,253 @@
+""" Watching keys for changes, instead of polling them.
+
+A Watcher waits for the change notifications of many keys on a single thread:
+>>> watcher = Watcher()
+>>> watch = watcher.watch(LocalComputer().local_machine[r'SOFTWARE\\Vendor'], callback=print)
+>>> for change in watch:
+...     print(change.path, 'changed')
+
+The thread waits on the events of up to MAXIMUM_WAIT_OBJECTS - 1 keys in a single call. When more keys are watched,
+it waits on them in batches, a short slice of time for every batch, so a change is noticed within a slice per batch.
+The thread starts when the first key is watched, and stops when no key is watched anymore.
+The notifications come from the backend, so the in-memory one can be used to run watchers on any platform.
+"""
+
+import logging
+import threading
+import weakref
+from collections import namedtuple
+from six.moves import queue
+from . import constants, errors
+from .interface.backends import get_default_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILTER = constants.REG_NOTIFY_CHANGE_NAME | constants.REG_NOTIFY_CHANGE_LAST_SET
+
+class KeyChange(namedtuple('KeyChange', ('key', 'path'))):
+    """ A change to the watched KeyStore in key, whose path is relative to the hive, or to one of its subkeys.
+    The notifications do not tell what changed, so read the key to find out.
+    """
+    __slots__ = ()
+
+class _Closed(object):
+    pass
+
+class Watch(object):
+    """ A key that is watched by a Watcher. Iterating it yields a KeyChange for every change, until it is closed.
+    If the watch ends by itself, for example because the key was deleted, the exception that ended it is in error.
+    """
+
+    def __init__(self, watcher, key, subtree, notify_filter, callback, handle, event):
+        self.key = key
+        self.subtree = subtree
+        self.filter = notify_filter
+        self.callback = callback
+        self.closed = False
+        self.error = None
+        self._watcher = watcher
+        self._handle = handle
+        self._event = event
+        self._changes = queue.Queue()
+        self._started = threading.Event()
+
+    def _get(self, block, timeout):
+        try:
+            change = self._changes.get(block, timeout)
+        except queue.Empty:
+            return None
+        if change is _Closed:
+            # the other readers should see the end of the watch as well
+            self._changes.put(_Closed)
+            return None
+        return change
+
+    def get(self, timeout=None):
+        """ Returns the next KeyChange, or None if there was none within timeout seconds or the watch is closed
+        """
+        return self._get(True, timeout)
+
+    def __iter__(self):
+        while True:
+            change = self._get(True, None)
+            if change is None:
+                return
+            yield change
+
+    def close(self):
+        """ Stops watching the key. Iterating the changes that were already noticed ends with them.
+        """
+        self._watcher._remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class Watcher(object):
+    """ Waits for the changes of many keys on a single thread, through the backend that is passed,
+    or the default one. Every key is waited on along with batch_size - 1 others, for slice seconds at a time
+    if there are other batches.
+    """
+
+    def __init__(self, backend=None, batch_size=constants.MAXIMUM_WAIT_OBJECTS - 1, slice=0.05):
+        self._backend = backend if backend is not None else get_default_backend()
+        self._batch_size = batch_size
+        self._slice = slice
+        self._lock = threading.Lock()
+        self._watches = []
+        self._added = []
+        self._removed = []
+        self._closing = False
+        self._wakeup = None
+        self._thread = None
+        self.changes = 0
+
+    def watch(self, key, subtree=True, filter=DEFAULT_FILTER, callback=None):
+        """ Starts watching the KeyStore in key, and its subkeys if subtree is True, for the changes in filter,
+        a combination of the REG_NOTIFY_CHANGE_* constants. Returns a Watch, once the changes are being watched.
+        If callback is given, it is called with every KeyChange, on the thread of the watcher.
+        """
+        handle = self._backend.RegOpenKeyEx(key._handle, None, constants.KEY_NOTIFY)
+        try:
+            event = self._backend.CreateEvent()
+        except:
+            self._backend.RegCloseKey(handle)
+            raise
+        watch = Watch(self, key, subtree, filter, callback, handle, event)
+        with self._lock:
+            self._closing = False
+            self._added.append(watch)
+            if self._thread is None:
+                self._wakeup = self._backend.CreateEvent()
+                self._thread = threading.Thread(target=self._run, args=(self._wakeup,))
+                self._thread.daemon = True
+                self._thread.start()
+            else:
+                self._backend.SetEvent(self._wakeup)
+        watch._started.wait()
+        return watch
+
+    def close(self):
+        """ Stops watching all the keys, and waits for the thread to stop
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closing = True
+            self._backend.SetEvent(self._wakeup)
+        thread.join()
+
+    def _remove(self, watch):
+        with self._lock:
+            if self._thread is None or watch.closed:
+                return
+            self._removed.append(watch)
+            self._backend.SetEvent(self._wakeup)
+
+    def _register(self, watch):
+        try:
+            self._backend.RegNotifyChangeKeyValue(watch._handle, watch.subtree, watch.filter, watch._event)
+        except (errors.RegistryBaseException, KeyError) as error:
+            watch.error = error
+            return False
+        return True
+
+    def _deliver(self, watch):
+        change = KeyChange(watch.key, watch.key._abspath)
+        self.changes += 1
+        watch._changes.put(change)
+        if watch.callback is not None:
+            try:
+                watch.callback(change)
+            except Exception:
+                logger.exception('callback of watch on {!r} failed'.format(change.path))
+
+    def _end(self, watch):
+        if watch in self._watches:
+            self._watches.remove(watch)
+        watch.closed = True
+        try:
+            self._backend.RegCloseKey(watch._handle)
+        finally:
+            self._backend.CloseEvent(watch._event)
+            watch._changes.put(_Closed)
+
+    def _update(self):
+        with self._lock:
+            added, self._added = self._added, []
+            removed, self._removed = self._removed, []
+            if self._closing:
+                removed = list(self._watches) + added
+            if not added and not removed and not self._watches:
+                # nothing to watch, so the thread stops, and the next watch starts another one
+                self._thread = None
+                return False
+        for watch in added:
+            self._watches.append(watch)
+            if not self._register(watch):
+                self._end(watch)
+            watch._started.set()
+        for watch in removed:
+            if not watch.closed:
+                self._end(watch)
+        return True
+
+    def _run(self, wakeup):
+        batch = 0
+        try:
+            while self._update():
+                if not self._watches:
+                    continue
+                batches = [self._watches[index:index + self._batch_size]
+                           for index in range(0, len(self._watches), self._batch_size)]
+                batch %= len(batches)
+                watches = batches[batch]
+                timeout = None if len(batches) == 1 else int(self._slice * 1000)
+                index = self._backend.WaitForMultipleObjects([wakeup] + [watch._event for watch in watches], timeout)
+                if index != 0:
+                    # the next batch is waited on next, so a key that changes all the time does not starve the others
+                    batch += 1
+                if index:
+                    watch = watches[index - 1]
+                    # asking for the next change before delivering this one, so no change is missed meanwhile
+                    registered = self._register(watch)
+                    self._deliver(watch)
+                    if not registered:
+                        self._end(watch)
+        except Exception as error:
+            logger.exception('watcher failed')
+            self._fail(error)
+        finally:
+            self._backend.CloseEvent(wakeup)
+
+    def _fail(self, error):
+        with self._lock:
+            self._thread = None
+            watches, self._added, self._removed = self._watches + self._added, [], []
+        for watch in watches:
+            watch.error = error
+            watch._started.set()
+            try:
+                self._end(watch)
+            except Exception:
+                logger.exception('closing watch on {!r} failed'.format(watch.key._abspath))
+
+_default_watchers = weakref.WeakKeyDictionary()
+_default_watchers_lock = threading.Lock()
+
+def get_default_watcher(backend=None):
+    """ Returns the Watcher that KeyStore.watch uses for the keys of the backend, or of the default backend.
+    The watcher references the backend weakly, so it is dropped along with the backend.
+    """
+    backend = backend if backend is not None else get_default_backend()
+    with _default_watchers_lock:
+        watcher = _default_watchers.get(backend)
+        if watcher is None:
+            # the keys that are watched hold the backend while the thread of the watcher runs
+            watcher = _default_watchers[backend] = Watcher(weakref.proxy(backend))
+        return watcher
+
+__all__ = ('KeyChange', 'Watch', 'Watcher', 'get_default_watcher')